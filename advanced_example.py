@@ -3,16 +3,25 @@ Advanced Platform Game Example
 Demonstrates additional features that can be added to the basic platformer
 
 This file shows examples of:
-- Moving platforms
+- Moving and crumbling platforms, with separate static/dynamic collisions
 - Simple enemies
 - Multiple levels
 - Power-ups
 - Particle effects
+
+These classes draw straight from their own fields, not from a render
+state (render.py) the way main.Game does, so they can't be drawn on the
+other core with DUAL_CORE (dualcore.py) as they are.
 """
 
 import picosystem
 import math
 import random
+from controls import Controls, LEFT_BIT, RIGHT_BIT
+from navigation import JUMP
+from occupancy import Occupancy
+from kernels import rect_collision, update_particles
+from timers import TimerWheel
 
 # Enhanced game constants
 SCREEN_WIDTH = 120
@@ -21,6 +30,8 @@ GRAVITY = 0.5
 JUMP_STRENGTH = -8
 PLAYER_SPEED = 2
 MAX_LEVELS = 3
+MAX_PARTICLES = 64  # Most particles alive (the quality governor may lower it)
+COLUMN_WIDTH = 20   # Width of the static platform index columns
 
 # Colors
 BLACK = (0, 0, 0)
@@ -34,8 +45,50 @@ BROWN = (139, 69, 19)
 PURPLE = (128, 0, 128)
 ORANGE = (255, 165, 0)
 
+# Power-up kinds: PowerUp.kind and AdvancedPlayer.effects are indexes into
+# POWERUPS. A new power-up is a new row - nothing else needs to change.
+POWER_SPEED = 0
+POWER_JUMP = 1
+POWER_INVINCIBLE = 2
+
+# Columns of a POWERUPS row
+POWER_COLOR = 0     # Pickup color, and the player's while it lasts
+POWER_SPRITE = 1    # Indicator pixels, as (dx, dy) from the pickup center
+POWER_DURATION = 2  # Ticks the effect lasts
+POWER_SPEED_X = 3   # Multiplies the player's speed
+POWER_JUMP_X = 4    # Multiplies the player's jump strength
+POWER_SHIELD = 5    # Enemies can't hurt the player
+POWER_FLASH = 6     # The player flashes while it lasts
+
+POWERUPS = (
+    (GREEN, ((-1, 0), (1, 0)), 300, 2, 1, False, False),
+    (PURPLE, ((0, -1), (0, 1)), 300, 1, 1.5, False, False),
+    (ORANGE, ((0, 0),), 600, 1, 1, True, True),
+)
+HURT_TICKS = 120    # Invincibility after being hit
+FLASH_TICKS = 5     # Ticks shown, then hidden, while flashing
+
+# Enemy kinds: Enemy.kind indexes ENEMIES
+ENEMY_WALKER = 0
+ENEMY_CHASER = 1
+
+# Columns of an ENEMIES row
+ENEMY_COLOR = 0
+ENEMY_WIDTH = 1
+ENEMY_HEIGHT = 2
+ENEMY_DAMAGE = 3    # Lives lost when it touches the player
+
+ENEMIES = (
+    (RED, 8, 8, 1),
+    (RED, 8, 8, 1),
+)
+
 class Particle:
-    """Simple particle for visual effects"""
+    """Simple particle for visual effects
+    
+    update_particles(particles, occupancy) (kernels.py) updates a whole
+    list the same way, compiled, and drops the dead ones.
+    """
     
     def __init__(self, x, y, vel_x, vel_y, color, life):
         self.x = x
@@ -46,10 +99,17 @@ class Particle:
         self.life = life
         self.max_life = life
     
-    def update(self):
-        """Update particle physics"""
-        self.x += self.vel_x
-        self.y += self.vel_y
+    def update(self, occupancy=None):
+        """Update particle physics, stopping on static platforms if given"""
+        x = self.x + self.vel_x
+        y = self.y + self.vel_y
+        if occupancy and occupancy.solid(x, y):
+            # Hit a platform: come to rest just outside it
+            self.vel_x = 0
+            self.vel_y = 0
+        else:
+            self.x = x
+            self.y = y
         self.vel_y += 0.1  # Light gravity
         self.life -= 1
         return self.life > 0
@@ -74,6 +134,8 @@ class MovingPlatform:
         self.color = color
         self.direction = 1
         self.x = x
+        self.dx = 0         # How far a rider gets carried this tick
+        self.solid = True
     
     def update(self):
         """Update platform movement"""
@@ -84,15 +146,22 @@ class MovingPlatform:
             self.direction = 1
         elif self.x >= self.start_x + self.move_range:
             self.direction = -1
+        self.dx = self.speed * self.direction
+    
+    def stood_on(self, player):
+        """Called when the player lands on the platform"""
+        pass
     
     def get_rect(self):
         """Get rectangle for collision detection"""
         return (self.x, self.y, self.width, self.height)
     
-    def draw(self):
+    def draw(self, detail=True):
         """Draw the moving platform"""
         picosystem.pen(*self.color)
         picosystem.frect(int(self.x), self.y, self.width, self.height)
+        if not detail:
+            return
         
         # Draw direction indicator
         picosystem.pen(*WHITE)
@@ -103,15 +172,159 @@ class MovingPlatform:
         else:
             picosystem.pixel(center_x - 1, center_y)
 
+class CrumblingPlatform:
+    """Platform that gives way shortly after being stood on, then comes back
+    
+    Falling away and coming back are timers on a TimerWheel (timers.py),
+    so a platform nobody stands on costs nothing per tick. Pass the game's
+    shared wheel as timers; without one the platform keeps its own and
+    advances it in update().
+    """
+    
+    def __init__(self, x, y, width, height, delay=30, respawn=120, color=BROWN,
+                 timers=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.delay = delay      # Ticks from being stood on to falling away
+        self.respawn = respawn  # Ticks until it is back
+        self.color = color
+        self.dx = 0
+        self.solid = True
+        self.timers = timers or TimerWheel()
+        self.own_timers = timers is None
+        self.started = -1       # Wheel tick it was stood on (-1 = not yet)
+        self.timer = None       # Its pending crumble or come back timer
+    
+    def update(self):
+        """Advance its own timers (a shared wheel is advanced by the game)"""
+        if self.own_timers:
+            self.timers.advance()
+    
+    def stood_on(self, player):
+        """Start crumbling when the player lands"""
+        if self.started < 0:
+            self.started = self.timers.tick
+            self.timer = self.timers.after(self.delay - 1, self.crumble)
+    
+    def crumble(self, _=None):
+        """Timer callback: fall away, and come back after respawn ticks"""
+        self.solid = False
+        self.timer = self.timers.after(self.respawn, self.come_back)
+    
+    def come_back(self, _=None):
+        """Timer callback: solid again, ready to crumble next time"""
+        self.solid = True
+        self.started = -1
+        self.timer = None
+    
+    def timer_left(self):
+        """Ticks until it falls away or comes back (0 when neither is due)"""
+        return self.timers.left(self.timer) if self.timer else 0
+    
+    def restore(self, solid, since, left):
+        """Put it back to a saved state (snapshot.py)
+        
+        since is ticks since it was stood on (-1 = not stood on) and left
+        what timer_left() was; the pending timer is started again.
+        """
+        if self.timer:
+            self.timers.cancel(self.timer)
+        self.solid = solid
+        self.started = self.timers.tick - since if since >= 0 else -1
+        self.timer = None
+        if left > 0:
+            self.timer = self.timers.after(
+                left, self.crumble if solid else self.come_back)
+    
+    def get_rect(self):
+        """Get rectangle for collision detection"""
+        return (self.x, self.y, self.width, self.height)
+    
+    def draw(self, detail=True):
+        """Draw the platform, shaking while it crumbles"""
+        if not self.solid:
+            return
+        shake = 0
+        if self.started >= 0:
+            shake = ((self.timers.tick - self.started + 1) // 2) % 2
+        picosystem.pen(*self.color)
+        picosystem.frect(self.x + shake, self.y, self.width, self.height)
+
+class Solids:
+    """Everything the player can stand on, split by how it behaves
+    
+    Static platforms never move, so they are sorted into columns once and
+    the player only checks the column it is in. Dynamic solids (moving,
+    crumbling or falling platforms) are checked every tick in their own
+    pass. Any dynamic solid works as long as it has x, y, width, height,
+    dx (how far it carries a rider this tick), solid, update() and
+    stood_on(player).
+    
+    The static platforms are also drawn into an occupancy bitmap
+    (occupancy.py), so particles and dropped power-ups can collide with
+    them, and the player can skip its static pass when touching nothing.
+    
+        solids = Solids(static_platforms, [MovingPlatform(...),
+                                           CrumblingPlatform(...)])
+    """
+    
+    def __init__(self, static=(), dynamic=(), mover_width=8):
+        self.static = list(static)
+        self.dynamic = list(dynamic)
+        # Each column lists the static platforms that something up to
+        # mover_width wide, with its left edge in that column, can touch
+        self.columns = []
+        for left in range(0, SCREEN_WIDTH, COLUMN_WIDTH):
+            self.columns.append(tuple(
+                p for p in self.static
+                if p.x < left + COLUMN_WIDTH + mover_width and
+                p.x + p.width > left))
+        self.occupancy = Occupancy(self.static)
+    
+    def near(self, x):
+        """Static platforms something at x could be touching"""
+        column = int(x) // COLUMN_WIDTH
+        if column < 0:
+            column = 0
+        elif column >= len(self.columns):
+            column = len(self.columns) - 1
+        return self.columns[column]
+    
+    def ground(self, x, y, width, height):
+        """Check if a rectangle is standing on any solid"""
+        if self.occupancy.ground(x, y, width, height):
+            return True
+        bottom = y + height
+        for solid in self.dynamic:
+            if (solid.solid and x < solid.x + solid.width and
+                    x + width > solid.x and
+                    solid.y <= bottom < solid.y + solid.height):
+                return True
+        return False
+    
+    def update(self):
+        """Move the dynamic solids"""
+        for solid in self.dynamic:
+            solid.update()
+    
+    def draw(self, detail=True):
+        """Draw the dynamic solids (static platforms draw themselves)"""
+        for solid in self.dynamic:
+            solid.draw(detail)
+
 class Enemy:
     """Simple enemy that moves back and forth"""
     
-    def __init__(self, x, y, move_range, speed):
+    def __init__(self, x, y, move_range, speed, kind=ENEMY_WALKER):
+        row = ENEMIES[kind]
+        self.kind = kind
         self.start_x = x
         self.x = x
         self.y = y
-        self.width = 8
-        self.height = 8
+        self.width = row[ENEMY_WIDTH]
+        self.height = row[ENEMY_HEIGHT]
         self.move_range = move_range
         self.speed = speed
         self.direction = 1
@@ -130,70 +343,145 @@ class Enemy:
         """Get rectangle for collision detection"""
         return (self.x, self.y, self.width, self.height)
     
-    def draw(self):
+    def draw(self, detail=True):
         """Draw the enemy"""
-        picosystem.pen(*RED)
+        picosystem.pen(*ENEMIES[self.kind][ENEMY_COLOR])
         picosystem.frect(int(self.x), int(self.y), self.width, self.height)
+        if not detail:
+            return
         
         # Draw angry eyes
         picosystem.pen(*WHITE)
         picosystem.pixel(int(self.x + 2), int(self.y + 2))
         picosystem.pixel(int(self.x + 5), int(self.y + 2))
 
+class ChaserEnemy(Enemy):
+    """Enemy that follows the player across platforms
+
+    Uses the level's shared NavGraph (Game.navigation()), so paths are
+    worked out once per platform pair no matter how many chasers there are.
+    """
+    
+    def __init__(self, x, y, speed, nav, kind=ENEMY_CHASER):
+        super().__init__(x, y, 0, speed, kind)
+        self.nav = nav
+        self.vel_y = 0
+        self.on_ground = False
+        self.target = -1
+    
+    def update(self, player, platforms):
+        """Head for the player's platform along the cached path"""
+        nav = self.nav
+        here = -1
+        if self.on_ground:
+            here = nav.platform_at(self.x, self.y, self.width, self.height)
+        there = nav.platform_at(player.x, player.y, player.width, player.height)
+        if there >= 0:
+            self.target = there
+        
+        goal_x = player.x
+        jump = False
+        if here >= 0 and self.target >= 0 and here != self.target:
+            hops = nav.path(here, self.target)
+            if hops:
+                # Aim for the nearest point of the next platform on the path
+                nxt, kind = hops[0]
+                step = nav.platforms[nxt]
+                goal_x = min(max(self.x, step.x), step.x + step.width - self.width)
+                reach = nav.speed * nav.apex_ticks
+                jump = kind == JUMP and abs(goal_x - self.x) <= reach
+        
+        # Move like the player does
+        if goal_x < self.x - self.speed:
+            self.direction = -1
+        elif goal_x > self.x + self.speed:
+            self.direction = 1
+        else:
+            self.direction = 0
+        self.x += self.speed * self.direction
+        
+        if jump and self.on_ground:
+            self.vel_y = JUMP_STRENGTH
+        self.vel_y += GRAVITY
+        self.y += self.vel_y
+        
+        # Land on top of platforms
+        self.on_ground = False
+        for platform in platforms:
+            if (self.vel_y > 0 and self.y < platform.y and
+                    self.rect_collision(platform)):
+                self.y = platform.y - self.height
+                self.vel_y = 0
+                self.on_ground = True
+    
+    def rect_collision(self, platform):
+        """Check if the enemy overlaps a platform"""
+        return (self.x < platform.x + platform.width and
+                self.x + self.width > platform.x and
+                self.y < platform.y + platform.height and
+                self.y + self.height > platform.y)
+
 class PowerUp:
     """Power-up that gives temporary abilities"""
     
-    def __init__(self, x, y, power_type):
+    def __init__(self, x, y, kind, falling=False):
         self.x = x
         self.y = y
         self.width = 8
         self.height = 8
-        self.power_type = power_type  # "speed", "jump", "invincible"
+        self.kind = kind    # Row of POWERUPS
         self.collected = False
         self.bob_offset = 0
         self.flash_timer = 0
+        self.falling = falling  # Dropped: falls until it lands on a solid
+        self.vel_y = 0
     
-    def update(self):
-        """Update power-up animation"""
+    def update(self, solids=None):
+        """Update power-up animation, and its fall if it was dropped"""
+        if self.falling and solids:
+            self.fall(solids)
         self.bob_offset = math.sin(picosystem.time() * 0.015) * 3
         self.flash_timer = (self.flash_timer + 1) % 20
     
+    def fall(self, solids):
+        """Drop a pixel at a time (up to 4 per tick) until it lands"""
+        self.vel_y = min(self.vel_y + GRAVITY, 4)
+        for _ in range(int(self.vel_y) + 1):
+            if solids.ground(self.x, self.y, self.width, self.height):
+                self.y = int(self.y)
+                self.falling = False
+                self.vel_y = 0
+                return
+            self.y += 1
+            if self.y > SCREEN_HEIGHT:
+                self.falling = False
+                return
+    
     def get_rect(self):
         """Get rectangle for collision detection"""
         return (self.x, self.y + self.bob_offset, self.width, self.height)
     
-    def draw(self):
+    def draw(self, detail=True):
         """Draw the power-up"""
         if not self.collected and self.flash_timer < 15:
+            row = POWERUPS[self.kind]
             y_pos = int(self.y + self.bob_offset)
-            
-            if self.power_type == "speed":
-                picosystem.pen(*GREEN)
-            elif self.power_type == "jump":
-                picosystem.pen(*PURPLE)
-            elif self.power_type == "invincible":
-                picosystem.pen(*ORANGE)
-            
+            picosystem.pen(*row[POWER_COLOR])
             picosystem.frect(self.x, y_pos, self.width, self.height)
+            if not detail:
+                return
             
             # Draw power indicator
             picosystem.pen(*WHITE)
             center_x = self.x + self.width // 2
             center_y = y_pos + self.height // 2
-            
-            if self.power_type == "speed":
-                picosystem.pixel(center_x - 1, center_y)
-                picosystem.pixel(center_x + 1, center_y)
-            elif self.power_type == "jump":
-                picosystem.pixel(center_x, center_y - 1)
-                picosystem.pixel(center_x, center_y + 1)
-            elif self.power_type == "invincible":
-                picosystem.pixel(center_x, center_y)
+            for dx, dy in row[POWER_SPRITE]:
+                picosystem.pixel(center_x + dx, center_y + dy)
 
 class AdvancedPlayer:
     """Enhanced player with power-up support"""
     
-    def __init__(self, x, y):
+    def __init__(self, x, y, controls=None, timers=None, quality=None):
         self.x = x
         self.y = y
         self.width = 8
@@ -203,41 +491,57 @@ class AdvancedPlayer:
         self.on_ground = False
         self.start_x = x
         self.start_y = y
+        # The game calls controls.update() once at the start of each tick
+        self.controls = controls or Controls()
         
-        # Power-up states
-        self.speed_boost = 0
-        self.jump_boost = 0
-        self.invincible = 0
+        # Power-up effects end, and flashing toggles, on timers (timers.py)
+        # instead of being counted down every tick. Pass the game's shared
+        # wheel as timers; without one the player keeps its own and
+        # advances it in update().
+        self.timers = timers or TimerWheel()
+        self.own_timers = timers is None
+        self.effects = [None] * len(POWERUPS)  # Timer of each active effect
+        self.speed_scale = 1    # Worked out from the active effects
+        self.jump_scale = 1
+        self.shield = False
+        self.color = BLUE
+        self.flashing = -1      # Kind of the effect that makes it flash
+        self.flash = None       # Timer of the next flash toggle
+        self.hidden = False     # Flashed off
         self.lives = 3
+        self.particle_budget = MAX_PARTICLES  # Most particles alive at once
+        # Governor (quality.py), if any: its level's particles replace the
+        # budget every tick, so busy frames spawn fewer
+        self.quality = quality
     
-    def update(self, platforms, enemies, particles):
+    def update(self, solids, enemies, particles):
         """Update player with power-up effects"""
-        # Update power-up timers
-        if self.speed_boost > 0:
-            self.speed_boost -= 1
-        if self.jump_boost > 0:
-            self.jump_boost -= 1
-        if self.invincible > 0:
-            self.invincible -= 1
+        # Effects that run out end here, by timer callback
+        if self.own_timers:
+            self.timers.advance()
+        if self.quality:
+            self.particle_budget = min(self.quality.particles, MAX_PARTICLES)
         
         # Handle input with power-up effects
-        current_speed = PLAYER_SPEED * (2 if self.speed_boost > 0 else 1)
+        current_speed = PLAYER_SPEED * self.speed_scale
         
-        if picosystem.pressed(picosystem.LEFT):
+        controls = self.controls
+        if controls.held & LEFT_BIT:
             self.vel_x = -current_speed
-        elif picosystem.pressed(picosystem.RIGHT):
+        elif controls.held & RIGHT_BIT:
             self.vel_x = current_speed
         else:
             self.vel_x = 0
         
         # Jump with power-up effects
-        if picosystem.pressed(picosystem.BUTTON_A) and self.on_ground:
-            jump_power = JUMP_STRENGTH * (1.5 if self.jump_boost > 0 else 1)
+        if controls.can_jump(self.on_ground):
+            controls.jumped()
+            jump_power = JUMP_STRENGTH * self.jump_scale
             self.vel_y = jump_power
             self.on_ground = False
             
             # Jump particles
-            for _ in range(3):
+            for _ in range(min(3, self.particle_budget - len(particles))):
                 particles.append(Particle(
                     self.x + random.randint(0, self.width),
                     self.y + self.height,
@@ -255,10 +559,12 @@ class AdvancedPlayer:
         self.y += self.vel_y
         
         # Handle collisions
-        self.handle_collisions(platforms)
+        self.handle_collisions(solids)
+        
+        controls.ground(self.on_ground)
         
         # Check enemy collisions
-        if self.invincible == 0:
+        if not self.shield:
             self.check_enemy_collisions(enemies, particles)
         
         # Keep player on screen horizontally
@@ -267,27 +573,45 @@ class AdvancedPlayer:
         elif self.x + self.width > SCREEN_WIDTH:
             self.x = SCREEN_WIDTH - self.width
     
-    def handle_collisions(self, platforms):
-        """Handle collision detection with platforms"""
-        player_rect = (self.x, self.y, self.width, self.height)
+    def handle_collisions(self, solids):
+        """Handle collision detection with a level's Solids"""
         self.on_ground = False
         
-        for platform in platforms:
-            if self.rect_collision(player_rect, platform.get_rect()):
-                # Handle moving platform
-                if hasattr(platform, 'speed'):
-                    self.x += platform.speed * platform.direction
-                
-                # Determine collision direction
-                if self.vel_y > 0:  # Falling down
-                    if self.y < platform.y:  # Landing on top
-                        self.y = platform.y - self.height
-                        self.vel_y = 0
-                        self.on_ground = True
-                elif self.vel_y < 0:  # Moving up
-                    if self.y > platform.y:  # Hitting from below
-                        self.y = platform.y + platform.height
-                        self.vel_y = 0
+        # Static platforms: only if the bitmap says the player touches
+        # one, and then only the ones in the player's column
+        if solids.occupancy.box(self.x, self.y, self.width, self.height):
+            for platform in solids.near(self.x):
+                if self.overlaps(platform):
+                    self.resolve(platform)
+        
+        # Dynamic solids carry the player along and may react to landing
+        for solid in solids.dynamic:
+            if solid.solid and self.overlaps(solid):
+                self.x += solid.dx
+                if self.resolve(solid):
+                    solid.stood_on(self)
+    
+    def overlaps(self, platform):
+        """Check if the player overlaps a platform"""
+        return (self.x < platform.x + platform.width and
+                self.x + self.width > platform.x and
+                self.y < platform.y + platform.height and
+                self.y + self.height > platform.y)
+    
+    def resolve(self, platform):
+        """Push the player out of a platform - True if it landed on top"""
+        # Determine collision direction
+        if self.vel_y > 0:  # Falling down
+            if self.y < platform.y:  # Landing on top
+                self.y = platform.y - self.height
+                self.vel_y = 0
+                self.on_ground = True
+                return True
+        elif self.vel_y < 0:  # Moving up
+            if self.y > platform.y:  # Hitting from below
+                self.y = platform.y + platform.height
+                self.vel_y = 0
+        return False
     
     def check_enemy_collisions(self, enemies, particles):
         """Check collisions with enemies"""
@@ -295,16 +619,16 @@ class AdvancedPlayer:
         
         for enemy in enemies:
             if self.rect_collision(player_rect, enemy.get_rect()):
-                self.take_damage(particles)
+                self.take_damage(particles, ENEMIES[enemy.kind][ENEMY_DAMAGE])
                 break
     
-    def take_damage(self, particles):
+    def take_damage(self, particles, damage=1):
         """Handle taking damage"""
-        self.lives -= 1
-        self.invincible = 120  # 2 seconds of invincibility
+        self.lives -= damage
+        self.add_effect(POWER_INVINCIBLE, HURT_TICKS)
         
         # Damage particles
-        for _ in range(10):
+        for _ in range(min(10, self.particle_budget - len(particles))):
             particles.append(Particle(
                 self.x + self.width // 2,
                 self.y + self.height // 2,
@@ -314,39 +638,84 @@ class AdvancedPlayer:
                 30
             ))
     
-    def apply_powerup(self, power_type):
+    def apply_powerup(self, kind):
         """Apply a power-up effect"""
-        if power_type == "speed":
-            self.speed_boost = 300  # 5 seconds
-        elif power_type == "jump":
-            self.jump_boost = 300  # 5 seconds
-        elif power_type == "invincible":
-            self.invincible = 600  # 10 seconds
+        self.add_effect(kind, POWERUPS[kind][POWER_DURATION])
+    
+    def add_effect(self, kind, ticks):
+        """Start (or restart) a power-up effect lasting ticks (0 ends it)"""
+        timer = self.effects[kind]
+        if timer:
+            self.timers.cancel(timer)
+        self.effects[kind] = (self.timers.after(ticks, self.end_effect, kind)
+                              if ticks > 0 else None)
+        self.refresh_effects()
+    
+    def end_effect(self, kind):
+        """Timer callback: a power-up effect ran out"""
+        self.effects[kind] = None
+        self.refresh_effects()
+    
+    def effect_left(self, kind):
+        """Ticks left of a power-up effect (0 when it is not active)"""
+        timer = self.effects[kind]
+        return self.timers.left(timer) if timer else 0
+    
+    def toggle_flash(self, _=None):
+        """Timer callback: show or hide the player, then go again"""
+        self.hidden = not self.hidden
+        self.flash = self.timers.after(FLASH_TICKS, self.toggle_flash)
+    
+    def refresh_effects(self):
+        """Work out the active effects and what they do to the player
+        
+        Only runs when an effect starts or ends. Where effects disagree,
+        the earliest row of POWERUPS picks the color.
+        """
+        self.speed_scale = 1
+        self.jump_scale = 1
+        self.shield = False
+        self.color = BLUE
+        self.flashing = -1
+        for kind in range(len(POWERUPS)):
+            if self.effects[kind] is None:
+                continue
+            row = POWERUPS[kind]
+            self.speed_scale *= row[POWER_SPEED_X]
+            self.jump_scale *= row[POWER_JUMP_X]
+            if row[POWER_SHIELD]:
+                self.shield = True
+            if self.color is BLUE:
+                self.color = row[POWER_COLOR]
+            if row[POWER_FLASH] and self.flashing < 0:
+                self.flashing = kind
+        
+        # Flashing runs on its own repeating timer while it lasts
+        if self.flashing >= 0:
+            if self.flash is None:
+                self.flash = self.timers.after(FLASH_TICKS, self.toggle_flash)
+        elif self.flash is not None:
+            self.timers.cancel(self.flash)
+            self.flash = None
+            self.hidden = False
     
     def rect_collision(self, rect1, rect2):
         """Check if two rectangles collide"""
         x1, y1, w1, h1 = rect1
         x2, y2, w2, h2 = rect2
-        return (x1 < x2 + w2 and x1 + w1 > x2 and 
-                y1 < y2 + h2 and y1 + h1 > y2)
+        return rect_collision(x1, y1, w1, h1, x2, y2, w2, h2)
     
-    def draw(self):
+    def draw(self, detail=True):
         """Draw the player with power-up effects"""
         # Flash when invincible
-        if self.invincible > 0 and (self.invincible // 5) % 2:
+        if self.hidden:
             return
         
         # Color based on power-ups
-        color = BLUE
-        if self.speed_boost > 0:
-            color = GREEN
-        elif self.jump_boost > 0:
-            color = PURPLE
-        elif self.invincible > 0:
-            color = ORANGE
-        
-        picosystem.pen(*color)
+        picosystem.pen(*self.color)
         picosystem.frect(int(self.x), int(self.y), self.width, self.height)
+        if not detail:
+            return
         
         # Draw eyes
         picosystem.pen(*WHITE)
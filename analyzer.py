@@ -0,0 +1,388 @@
+"""
+Level Reachability Analyzer
+Checks offline whether the levels in config.py can be beaten
+
+For every level and physics profile this:
+- precomputes the discrete jump/fall velocity tables for the profile
+- searches every reachable player state, stepping exactly like Player.update
+- builds a platform-to-platform reachability graph
+- reports unreachable platforms and collectibles, plus the minimal tick
+  path (as button presses) to each one
+
+Runs on a desktop Python, not on the Picosystem:
+    python analyzer.py                  # every level x every profile
+    python analyzer.py --level 2 --profile hard --paths
+"""
+
+import argparse
+import math
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+
+# Bounds the player lives in (matches the checks in main.py)
+SCREEN_WIDTH = config.SCREEN_WIDTH
+SCREEN_HEIGHT = config.SCREEN_HEIGHT
+DEATH_Y = SCREEN_HEIGHT + 20
+PLAYER_WIDTH = config.PLAYER_WIDTH
+PLAYER_HEIGHT = config.PLAYER_HEIGHT
+COLLECTIBLE_SIZE = 6
+COLLECTIBLE_BOB = 2    # Bob amplitude from Collectible.update
+
+# Velocity tables - a state's vertical speed is (table, index)
+FALL = 0
+JUMP = 1
+REST = -1  # index meaning vel_y == 0 (standing, or just bumped a ceiling)
+
+# Inputs tried every tick: (horizontal direction, jump pressed)
+INPUTS = ((-1, False), (0, False), (1, False),
+          (-1, True), (0, True), (1, True))
+
+
+class Profile:
+    """Physics constants to analyze a level with"""
+
+    def __init__(self, name, gravity, jump_strength, player_speed):
+        self.name = name
+        self.gravity = gravity
+        self.jump_strength = jump_strength
+        self.player_speed = player_speed
+
+    def __repr__(self):
+        return "Profile(%r, gravity=%r, jump=%r, speed=%r)" % (
+            self.name, self.gravity, self.jump_strength, self.player_speed)
+
+
+def load_profiles():
+    """Get the normal, easy and hard physics profiles from config.py"""
+    profiles = {
+        'normal': Profile('normal', config.GRAVITY, config.JUMP_STRENGTH,
+                          config.PLAYER_SPEED),
+    }
+    for name, preset in (('easy', config.EASY_MODE), ('hard', config.HARD_MODE)):
+        profiles[name] = Profile(name, preset['GRAVITY'],
+                                 preset['JUMP_STRENGTH'], preset['PLAYER_SPEED'])
+    return profiles
+
+
+def load_levels():
+    """Get every level in config.LEVELS, keyed by level number"""
+    return {str(n): level for n, level in enumerate(config.LEVELS, 1)}
+
+
+class ArcTables:
+    """Precomputed vertical velocities of a jump and of a fall
+
+    Player.update adds GRAVITY to vel_y once per tick, so the speed on the
+    n-th airborne tick only depends on how the player left the ground. The
+    tables hold those speeds built with the same sequence of float additions
+    as the game, which keeps the analyzer bit-exact with the real physics.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+
+        # Envelope summary: rise per tick and the jump apex
+        self.rise = []
+        vel = profile.jump_strength
+        y = 0
+        while vel < 0:
+            vel += profile.gravity
+            y += vel
+            self.rise.append(-y)
+        self.apex_height = max(self.rise)
+        self.apex_tick = self.rise.index(self.apex_height) + 1
+
+        # A fall can start anywhere from the top of a jump off the highest
+        # platform, so the tables must cover that whole drop
+        drop = DEATH_Y + PLAYER_HEIGHT + self.apex_height
+        self.fall = self._build(0, drop)
+        self.jump = self._build(profile.jump_strength, drop)
+        self.tables = (self.fall, self.jump)
+
+    def _build(self, vel, drop):
+        """Step vel until the player has fallen `drop` pixels"""
+        table = []
+        y = 0
+        while y <= drop or vel <= 0:
+            vel += self.profile.gravity
+            y += vel
+            table.append(vel)
+        return table
+
+
+
+def step(arcs, platforms, state, move, jump):
+    """Advance one tick exactly like Player.update + Game.update
+
+    state is (x, y, table, index, on_ground). Returns the new state and the
+    index of the platform landed on (or -1), or None if the player died.
+    """
+    x, y, table, index, on_ground = state
+    profile = arcs.profile
+
+    # Handle input
+    vel_x = move * profile.player_speed if move else 0
+
+    # Jump
+    if jump and on_ground:
+        table, index = JUMP, REST
+
+    # Apply gravity - the next entry of the table
+    index += 1
+    vel_y = arcs.tables[table][index]
+
+    # Update position
+    x += vel_x
+    y += vel_y
+
+    # Handle collisions - the rect is taken once, before any resolution
+    x1 = x
+    y1 = y
+    on_ground = False
+    landed = -1
+    for i, (px, py, pw, ph) in enumerate(platforms):
+        if (x1 < px + pw and x1 + PLAYER_WIDTH > px and
+                y1 < py + ph and y1 + PLAYER_HEIGHT > py):
+            if vel_y > 0:
+                if y < py:
+                    y = py - PLAYER_HEIGHT
+                    vel_y = 0
+                    on_ground = True
+                    landed = i
+            elif vel_y < 0:
+                if y > py:
+                    y = py + ph
+                    vel_y = 0
+    if vel_y == 0:
+        table, index = FALL, REST
+
+    # Keep player on screen horizontally
+    if x < 0:
+        x = 0
+    elif x + PLAYER_WIDTH > SCREEN_WIDTH:
+        x = SCREEN_WIDTH - PLAYER_WIDTH
+
+    # Game restarts the level when the player falls off screen
+    if y > DEATH_Y:
+        return None
+    return (x, y, table, index, on_ground), landed
+
+
+def _touches(state, collectible, tick):
+    """Check if the player overlaps a collectible on a given tick
+
+    Collectible.update bobs each item by sin(tick * 0.1) * 2, counting
+    Game.update calls since the level was built.
+    """
+    x, y = state[0], state[1]
+    cx, cy = collectible
+    cy += math.sin(tick * 0.1) * COLLECTIBLE_BOB
+    return (x < cx + COLLECTIBLE_SIZE and x + PLAYER_WIDTH > cx and
+            y < cy + COLLECTIBLE_SIZE and y + PLAYER_HEIGHT > cy)
+
+
+def label_input(move, jump):
+    """Short name for one tick of input, e.g. 'R', 'JL' or '-'"""
+    name = ('L', '-', 'R')[move + 1]
+    return 'J' + name if jump else name
+
+
+def compress_inputs(inputs):
+    """Run-length encode a list of input labels: 'R12 JR1 R5'"""
+    runs = []
+    for label in inputs:
+        if runs and runs[-1][0] == label:
+            runs[-1][1] += 1
+        else:
+            runs.append([label, 1])
+    return ' '.join('%s%d' % (label, count) for label, count in runs)
+
+
+def search(arcs, platforms, collectibles, start):
+    """Breadth-first search over every player state reachable from start
+
+    Ticks are the edges, so the first time a platform or collectible is
+    reached is also the minimal number of ticks needed. Collectibles are
+    tested at the bob height of the tick each state is first reached on;
+    waiting around for a better bob phase is not explored. Returns two
+    dicts mapping platform / collectible index to its input path.
+    """
+    start_state = (start[0], start[1], FALL, REST, False)
+    parents = {start_state: None}
+    queue = deque([(start_state, 0)])
+    platform_hits = {}
+    collectible_hits = {}
+
+    while queue:
+        state, tick = queue.popleft()
+        for c, collectible in enumerate(collectibles):
+            if (tick and c not in collectible_hits and
+                    _touches(state, collectible, tick)):
+                collectible_hits[c] = state
+        for move, jump in INPUTS:
+            if jump and not state[4]:
+                continue
+            result = step(arcs, platforms, state, move, jump)
+            if result is None:
+                continue
+            new_state, landed = result
+            if new_state in parents:
+                continue
+            parents[new_state] = (state, move, jump)
+            if landed >= 0 and landed not in platform_hits:
+                platform_hits[landed] = new_state
+            queue.append((new_state, tick + 1))
+
+    def path_to(state):
+        inputs = []
+        while parents[state] is not None:
+            state, move, jump = parents[state]
+            inputs.append(label_input(move, jump))
+        inputs.reverse()
+        return inputs
+
+    return ({i: path_to(s) for i, s in platform_hits.items()},
+            {i: path_to(s) for i, s in collectible_hits.items()})
+
+
+def hop_edges(arcs, platforms, source):
+    """Find every platform reachable in a single hop from platform `source`
+
+    Seeds the player standing anywhere on the platform and follows each
+    jump or fall until it lands again. Returns {target index: min ticks}.
+    """
+    px, py, pw, _ = platforms[source]
+    speed = arcs.profile.player_speed
+    y = py - PLAYER_HEIGHT
+    seeds = set()
+    x = px - PLAYER_WIDTH + speed
+    while x < px + pw:
+        seeds.add(min(max(x, 0), SCREEN_WIDTH - PLAYER_WIDTH))
+        x += speed
+
+    seen = set()
+    queue = deque()
+    for x in seeds:
+        state = (x, y, FALL, REST, True)
+        seen.add(state)
+        queue.append((state, 0))
+
+    edges = {}
+    while queue:
+        state, ticks = queue.popleft()
+        for move, jump in INPUTS:
+            if jump and not state[4]:
+                continue
+            result = step(arcs, platforms, state, move, jump)
+            if result is None:
+                continue
+            new_state, landed = result
+            if landed == source or new_state in seen:
+                continue
+            seen.add(new_state)
+            if landed >= 0:
+                if landed not in edges:
+                    edges[landed] = ticks + 1
+                continue
+            queue.append((new_state, ticks + 1))
+    return edges
+
+
+def analyze(job):
+    """Analyze one (level, profile) job - runs inside a pool worker"""
+    level_name, platforms, collectibles, profile, start = job
+    arcs = ArcTables(profile)
+    platform_paths, collectible_paths = search(arcs, platforms, collectibles,
+                                               start)
+    graph = {i: hop_edges(arcs, platforms, i) for i in range(len(platforms))}
+    return {
+        'level': level_name,
+        'profile': profile.name,
+        'apex_height': arcs.apex_height,
+        'apex_ticks': arcs.apex_tick,
+        'graph': graph,
+        'platforms': platform_paths,
+        'collectibles': collectible_paths,
+        'unreachable_platforms': [i for i in range(len(platforms))
+                                  if i not in platform_paths],
+        'unreachable_collectibles': [i for i in range(len(collectibles))
+                                     if i not in collectible_paths],
+    }
+
+
+def analyze_pack(levels, profiles, start=None, workers=None):
+    """Analyze every level x profile combination on a process pool
+
+    levels maps a name to (platforms, collectibles) in the config.py format.
+    Returns the reports in the same order as the jobs.
+    """
+    if start is None:
+        start = (config.PLAYER_START_X, config.PLAYER_START_Y)
+    jobs = [(name, list(platforms), list(collectibles), profile, start)
+            for name, (platforms, collectibles) in levels.items()
+            for profile in profiles]
+    if workers == 1 or len(jobs) == 1:
+        return [analyze(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze, jobs))
+
+
+def print_report(report, levels, show_paths=False):
+    """Print a human readable summary of one report"""
+    platforms, collectibles = levels[report['level']]
+    print("Level %s / %s: jump apex %.1fpx after %d ticks" % (
+        report['level'], report['profile'], report['apex_height'],
+        report['apex_ticks']))
+    print("  Reached %d/%d platforms, %d/%d collectibles" % (
+        len(report['platforms']), len(platforms),
+        len(report['collectibles']), len(collectibles)))
+    for i in report['unreachable_platforms']:
+        print("  UNREACHABLE platform %d %s" % (i, platforms[i]))
+    for i in report['unreachable_collectibles']:
+        print("  UNREACHABLE collectible %d %s" % (i, collectibles[i]))
+    if show_paths:
+        for i, targets in sorted(report['graph'].items()):
+            hops = ', '.join('%d (%d ticks)' % (t, n)
+                             for t, n in sorted(targets.items()))
+            print("  platform %d -> %s" % (i, hops or 'nothing'))
+        for kind, paths, items in (('platform', report['platforms'], platforms),
+                                   ('collectible', report['collectibles'],
+                                    collectibles)):
+            for i, path in sorted(paths.items()):
+                print("  %s %d %s: %d ticks: %s" % (
+                    kind, i, items[i], len(path), compress_inputs(path)))
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--level', action='append',
+                        help="Level number from config.py (default: all)")
+    parser.add_argument('--profile', action='append',
+                        help="normal, easy or hard (default: all)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--paths', action='store_true',
+                        help="Print the hop graph and minimal input paths")
+    args = parser.parse_args(argv)
+
+    levels = load_levels()
+    profiles = load_profiles()
+    if args.level:
+        levels = {name: levels[name] for name in args.level}
+    chosen = [profiles[name] for name in (args.profile or sorted(profiles))]
+
+    reports = analyze_pack(levels, chosen, workers=args.workers)
+    failed = False
+    for report in reports:
+        print_report(report, levels, args.paths)
+        if report['unreachable_platforms'] or report['unreachable_collectibles']:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
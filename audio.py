@@ -0,0 +1,86 @@
+"""
+Sound Effects
+Plays game sounds through a small pool of picosystem Voices
+
+Game code calls play() for every event, as often as it likes. Requests
+are queued for the current tick and handled once per tick by update():
+- the same sound requested twice in a tick plays once
+- each sound has a cooldown, so a burst of pickups doesn't spam the synth
+- at most MAX_PER_TICK sounds start per tick, highest priority first
+- when every voice is busy, the lowest priority one gets stolen
+
+So the cost per frame stays the same however many events fire at once.
+"""
+
+import picosystem
+import config
+
+# Sound effects, indexed by the SOUND_* constants in main.py:
+# (name, pitch Hz, duration ms, volume, priority, cooldown ms)
+SOUNDS = (
+    ("jump", config.JUMP_SOUND_PITCH, 80, 60, 1, 60),
+    ("collect", config.COLLECT_SOUND_PITCH, 120, 80, 2, 50),
+    ("hit", 110, 250, 100, 3, 200),
+    ("level", 660, 400, 90, 4, 500),
+)
+
+VOICES = 3          # Size of the voice pool
+MAX_PER_TICK = 2    # Most sounds started in one tick
+
+
+class Audio:
+    """Per-tick sound queue feeding a fixed pool of voices"""
+
+    def __init__(self, voices=VOICES, enabled=config.SOUND_ENABLED):
+        self.enabled = enabled
+        self.voices = [picosystem.Voice(10, 20, 60, 40) for _ in range(voices)]
+        self.busy_until = [0] * voices      # time() each voice is free again
+        self.priority = [0] * voices        # Priority of what each one plays
+        self.requested = bytearray(len(SOUNDS))
+        self.next_allowed = [0] * len(SOUNDS)
+        # Sounds in the order update() considers them
+        self.order = sorted(range(len(SOUNDS)), key=lambda s: -SOUNDS[s][4])
+        self.played = 0
+        self.dropped = 0
+
+    def play(self, sound):
+        """Ask for a sound this tick - cheap, and safe to call repeatedly"""
+        self.requested[sound] = 1
+
+    def update(self):
+        """Start this tick's sounds - call once per tick"""
+        if not self.enabled:
+            for sound in self.order:
+                self.requested[sound] = 0
+            return
+        now = picosystem.time()
+        started = 0
+        for sound in self.order:
+            if not self.requested[sound]:
+                continue
+            self.requested[sound] = 0
+            _, pitch, duration, volume, priority, cooldown = SOUNDS[sound]
+            if started == MAX_PER_TICK or now < self.next_allowed[sound]:
+                self.dropped += 1
+                continue
+            voice = self._pick_voice(now, priority)
+            if voice < 0:
+                self.dropped += 1
+                continue
+            self.voices[voice].play(pitch, duration, volume)
+            self.busy_until[voice] = now + duration
+            self.priority[voice] = priority
+            self.next_allowed[sound] = now + cooldown
+            started += 1
+            self.played += 1
+
+    def _pick_voice(self, now, priority):
+        """Find a free voice, or steal the least important busy one"""
+        steal = -1
+        for voice, busy_until in enumerate(self.busy_until):
+            if busy_until <= now:
+                return voice
+            if self.priority[voice] <= priority and (
+                    steal < 0 or self.priority[voice] < self.priority[steal]):
+                steal = voice
+        return steal
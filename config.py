@@ -23,6 +23,8 @@ COLLECTIBLE_POINTS = 10  # Points earned per collectible
 # Player settings
 PLAYER_WIDTH = 8
 PLAYER_HEIGHT = 8
+PLAYER_START_X = 20    # Where the player spawns at level start
+PLAYER_START_Y = 80
 
 # Colors (R, G, B) - values from 0 to 15 for picosystem
 BLACK = (0, 0, 0)
@@ -115,6 +117,12 @@ LEVEL_2_COLLECTIBLES = [
     (60, 17),
 ]
 
+# Every level in the order they are played - (platforms, collectibles)
+LEVELS = [
+    (LEVEL_1_PLATFORMS, LEVEL_1_COLLECTIBLES),
+    (LEVEL_2_PLATFORMS, LEVEL_2_COLLECTIBLES),
+]
+
 # Easy mode settings
 EASY_MODE = {
     'GRAVITY': 0.3,
@@ -148,7 +156,7 @@ SCORE_X = 2
 SCORE_Y = 2
 UI_TEXT_COLOR = WHITE
 
-# Sound settings (if you add sound later)
+# Sound settings (see audio.py)
 SOUND_ENABLED = True
 JUMP_SOUND_PITCH = 440    # Hz
 COLLECT_SOUND_PITCH = 880  # Hz
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Controls
+Reads every button once per tick into one bitmask the game reads from
+
+Instead of each object asking picosystem about buttons, Controls.update()
+reads them all at the start of a tick. Game code then checks bits:
+    controls.held & LEFT_BIT        # held down this tick
+    controls.pressed & A_BIT        # went down this tick
+    controls.released & A_BIT       # came up this tick
+
+It also keeps two counters that make jumping feel forgiving:
+- jump buffering: a jump press still counts for jump_buffer ticks, so
+  pressing just before landing jumps on landing
+- coyote time: the player can still jump for coyote ticks after running
+  off a ledge (a jump pressed on the coyote-th airborne tick still works)
+
+Where the buttons come from is pluggable: the hardware, a recording (one
+mask byte per tick, like headless.py and fuzz.py use) or an agent that
+decides what to press.
+
+    python controls.py      # check coyote time gives exactly coyote ticks
+"""
+
+import picosystem
+
+# Bit for each button in an input mask
+UP_BIT = 1 << 0
+DOWN_BIT = 1 << 1
+LEFT_BIT = 1 << 2
+RIGHT_BIT = 1 << 3
+A_BIT = 1 << 4
+B_BIT = 1 << 5
+X_BIT = 1 << 6
+Y_BIT = 1 << 7
+
+BUTTONS = (
+    (picosystem.UP, UP_BIT),
+    (picosystem.DOWN, DOWN_BIT),
+    (picosystem.LEFT, LEFT_BIT),
+    (picosystem.RIGHT, RIGHT_BIT),
+    (picosystem.A, A_BIT),
+    (picosystem.B, B_BIT),
+    (picosystem.X, X_BIT),
+    (picosystem.Y, Y_BIT),
+)
+
+
+class HardwareSource:
+    """Buttons as picosystem reports them"""
+
+    def read(self):
+        """Mask of the buttons held right now"""
+        mask = 0
+        button = picosystem.button
+        for pin, bit in BUTTONS:
+            if button(pin):
+                mask |= bit
+        return mask
+
+
+class ReplaySource:
+    """Plays back recorded masks, then holds nothing"""
+
+    def __init__(self, masks):
+        self.masks = masks
+        self.tick = 0
+
+    @classmethod
+    def load(cls, path):
+        """Replay a file of one mask byte per tick"""
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def read(self):
+        """Next recorded mask"""
+        tick = self.tick
+        if tick >= len(self.masks):
+            return 0
+        self.tick = tick + 1
+        return self.masks[tick]
+
+
+class RecordingSource:
+    """Passes another source through, keeping what it read"""
+
+    def __init__(self, source, ticks=3600):
+        self.source = source
+        self.masks = bytearray(ticks)
+        self.count = 0
+
+    def read(self):
+        """Read and record the wrapped source (until the buffer is full)"""
+        mask = self.source.read()
+        if self.count < len(self.masks):
+            self.masks[self.count] = mask
+            self.count += 1
+        return mask
+
+    def save(self, path):
+        """Write the recording for ReplaySource.load"""
+        with open(path, 'wb') as f:
+            f.write(self.masks[:self.count])
+
+
+class AgentSource:
+    """Asks a policy what to press: policy(game) returns a mask"""
+
+    def __init__(self, policy, game=None):
+        self.policy = policy
+        self.game = game
+
+    def read(self):
+        """The policy's mask for this tick"""
+        return self.policy(self.game)
+
+
+class Controls:
+    """This tick's buttons, their edges and the jump timing windows"""
+
+    def __init__(self, source=None, jump_buffer=0, coyote=0):
+        self.source = source or HardwareSource()
+        self.jump_buffer = jump_buffer
+        self.coyote = coyote
+        self.held = 0
+        self.pressed = 0
+        self.released = 0
+        self.jump_left = 0      # Ticks a jump press still counts for
+        self.coyote_left = 0    # Ticks the player may still jump in the air
+
+    def update(self):
+        """Read the source - call once at the start of every tick"""
+        mask = self.source.read()
+        held = self.held
+        self.pressed = mask & ~held
+        self.released = held & ~mask
+        self.held = mask
+        if self.pressed & A_BIT:
+            self.jump_left = self.jump_buffer + 1
+        elif self.jump_left:
+            self.jump_left -= 1
+
+    def ground(self, on_ground):
+        """Tell the coyote timer whether the player is on the ground"""
+        if on_ground:
+            # One more, as the tick the player leaves the ledge on counts
+            # one off before any jump check sees it
+            self.coyote_left = self.coyote + 1
+        elif self.coyote_left:
+            self.coyote_left -= 1
+
+    def can_jump(self, on_ground):
+        """Check if a (buffered) jump press should start a jump now"""
+        return self.jump_left > 0 and (on_ground or self.coyote_left > 0)
+
+    def jumped(self):
+        """Use up the jump press and the coyote time"""
+        self.jump_left = 0
+        self.coyote_left = 0
+
+
+def coyote_jump(main, coyote, delay):
+    """Run off a ledge and press jump delay ticks later - True if it jumps"""
+    platform = main.Platform(0, 50, 40, 8)
+    state = {'tick': 0, 'left_at': None}
+
+    def policy(game):
+        left_at = state['left_at']
+        if left_at is not None and state['tick'] == left_at + delay:
+            return RIGHT_BIT | A_BIT
+        return RIGHT_BIT
+
+    controls = Controls(AgentSource(policy), coyote=coyote)
+    player = main.Player(24, 42, controls)
+    was_on_ground = False
+    for tick in range(60):
+        state['tick'] = tick
+        controls.update()
+        player.update([platform])
+        if player.jumped:
+            return True
+        if was_on_ground and not player.on_ground and state['left_at'] is None:
+            state['left_at'] = tick
+        was_on_ground = player.on_ground
+    return False
+
+
+def check():
+    """Check a jump N ticks after leaving a ledge works for N <= coyote
+
+    and not after. Returns True if every case behaved.
+    """
+    import headless
+    main = headless.load_game()
+    wrong = 0
+    for coyote in range(5):
+        for delay in range(1, coyote + 3):
+            jumped = coyote_jump(main, coyote, delay)
+            if jumped != (delay <= coyote):
+                wrong += 1
+                print("coyote %d: jump %d ticks after the ledge %s" % (
+                    coyote, delay, "worked" if jumped else "failed"))
+    print("%d wrong coyote jumps" % wrong)
+    return wrong == 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check() else 1)
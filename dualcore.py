@@ -0,0 +1,194 @@
+"""
+Dual-Core Pipeline
+Simulates the next frame on the second core while the first one draws
+
+The RP2040 has two cores but update(tick) and draw(tick) run one after
+the other on the first. With DUAL_CORE = True in main.py, Game.update runs
+on the second core instead:
+
+    core 0:  draw N-1 | draw N   | draw N+1
+    core 1:  update N | update N+1 | ...
+
+Each update ends by extracting what drawing needs into a RenderState
+(render.py), and the pipeline hands it one of two in turn. Drawing only
+reads the other one, which doesn't change until the next swap, so the
+cores never touch the same data at the same time. Everything else that
+changes the game (input, sound, quality, preloading, the scheduler) runs
+on core 0 in the short window between one update finishing and the next
+starting.
+
+Moving on to the next level is the exception: Game.simulate calls
+levels.advance() when A is pressed on a completed level, so the old level
+is released, garbage collected and the new one built on core 1, while
+core 0 may be drawing. That is safe because drawing reads nothing but
+its RenderState - never the platform or collectible lists - and the
+preloading task that advance() cancels only runs on core 0 between
+updates, never alongside one.
+
+This relies on main.Game drawing only from its RenderState. The
+advanced_example.py classes draw from their live fields, so they can't be
+used with the pipeline until they are extracted into one too.
+
+On CPython the same code runs on a threading.Thread, so the handoff can be
+checked on a desktop:
+    python dualcore.py
+"""
+
+import sys
+
+from controls import HardwareSource
+from render import RenderState
+
+if sys.implementation.name == 'micropython':
+    import _thread
+
+    allocate_lock = _thread.allocate_lock
+
+    def start_thread(function):
+        """Run function on the second core"""
+        _thread.start_new_thread(function, ())
+else:
+    import threading
+
+    allocate_lock = threading.Lock
+
+    def start_thread(function):
+        """Run function on a background thread"""
+        threading.Thread(target=function, daemon=True).start()
+
+
+class LatchedSource:
+    """Controls source holding the buttons core 0 read for the next update"""
+
+    def __init__(self):
+        self.mask = 0
+
+    def read(self):
+        """The latched mask"""
+        return self.mask
+
+
+class Pipeline:
+    """Runs Game.update on another core, one frame ahead of drawing"""
+
+    def __init__(self, game, source=None):
+        self.game = game
+        self.source = source or HardwareSource()
+        self.latch = LatchedSource()
+        game.controls.source = self.latch
+        self.states = (game.render, RenderState())
+        self.front = 0          # State being drawn
+        # Both locks start taken: the worker waits on start, core 0 on done
+        self.start = allocate_lock()
+        self.start.acquire()
+        self.done = allocate_lock()
+        self.done.acquire()
+        self.busy = False       # An update is running on the other core
+        self.running = True
+        self.steps = 0
+        start_thread(self._worker)
+
+    def _worker(self):
+        """Second core: one Game.update per step, then publish its state"""
+        game = self.game
+        while True:
+            self.start.acquire()
+            if not self.running:
+                break
+            game.update()
+            self.steps += 1
+            self.done.release()
+        self.done.release()
+
+    def wait(self):
+        """Let the running update finish and show its state
+
+        Until step() is called, nothing runs on the other core, so the
+        game can be changed safely.
+        """
+        if self.busy:
+            self.done.acquire()
+            self.busy = False
+            self.front = 1 - self.front
+
+    def step(self):
+        """Read the buttons and start the next update on the other core"""
+        self.latch.mask = self.source.read()
+        self.game.render = self.states[1 - self.front]
+        self.busy = True
+        self.start.release()
+
+    def state(self):
+        """RenderState of the newest finished frame"""
+        return self.states[self.front]
+
+    def draw(self):
+        """Draw the newest finished frame"""
+        self.game.draw(self.states[self.front])
+
+    def stop(self):
+        """Stop the worker"""
+        self.wait()
+        self.running = False
+        self.start.release()
+        self.done.acquire()
+
+
+def check_pipeline(ticks=600):
+    """Check pipelined frames match the ones drawn on a single core
+
+    Plays the goldens.py input script both ways headlessly, with a
+    quality governor on its lowest level so animations only move some
+    ticks, as main.py sets it up. The pipeline draws each frame one tick
+    later, so its frame N+1 must be identical to the single core frame N,
+    and the governor must never change while an update is running.
+    Returns True if every frame matched.
+    """
+    import hashlib
+    import headless
+    import goldens
+    import quality
+    main = headless.load_game()
+    screen = headless.install_screen()
+    masks = goldens.script(ticks, goldens.SEED)
+
+    def frame():
+        return hashlib.blake2b(screen.pixels, digest_size=8).digest()
+
+    def governed(game):
+        game.quality = quality.Governor(verbose=False)
+        game.quality.set_level(len(quality.LEVELS) - 1)
+        return game
+
+    game = governed(main.Game())
+    single = []
+    for tick, mask in enumerate(masks):
+        headless.set_buttons(mask)
+        game.quality.update(tick)
+        game.update()
+        game.draw()
+        single.append(frame())
+
+    game = governed(main.Game())
+    pipeline = Pipeline(game)
+    piped = []
+    races = 0
+    for tick, mask in enumerate(masks + [0]):
+        headless.set_buttons(mask)
+        pipeline.wait()
+        races += pipeline.busy  # The worker reads quality.animate
+        game.quality.update(tick)
+        pipeline.step()
+        pipeline.draw()
+        piped.append(frame())
+    pipeline.stop()
+
+    matched = sum(a == b for a, b in zip(single, piped[1:]))
+    print("Pipelined %d steps, %d/%d frames match single core, "
+          "%d governor updates during an update" % (
+              pipeline.steps, matched, ticks, races))
+    return matched == ticks and not races
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check_pipeline() else 1)
@@ -0,0 +1,388 @@
+"""
+Monte-Carlo Playtesting Fuzzer
+Plays the game headlessly with random input to find bugs nobody has hit yet
+
+Each episode plays one level with one physics profile and one input
+strategy, from a seed, and checks after every tick that:
+- the player is not inside a platform
+- the player is on screen horizontally and above the fall limit
+- positions and velocities are finite numbers
+- the score matches the collectibles picked up
+- the player isn't stuck: holding a direction always moves it
+
+A broken invariant doesn't end the episode: each one is noted at the
+first tick it breaks and play goes on, so the whole tick budget is spent
+even when a known bug fires early. The same invariant broken on the same
+level and profile is one failure however many episodes hit it; its
+earliest input is shrunk to a short sequence that still breaks it and
+saved as a replay file (one button mask byte per tick, see headless.py),
+which --replay plays back. Episodes and shrinking are spread over all
+CPU cores.
+
+Runs on a desktop Python, not on the Picosystem:
+    python fuzz.py                          # a million ticks
+    python fuzz.py --ticks 10000000 --strategy spam_jump
+    python fuzz.py --replay fuzz_failures/1-normal-inside-17.replay
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import analyzer
+import headless
+
+TICKS = 1000000        # Total ticks per run
+EPISODE_TICKS = 20000  # Ticks per episode
+STUCK_TICKS = 600      # Holding a direction this long without moving
+FAILURES_DIR = 'fuzz_failures'
+MAX_SHRINK_RUNS = 300  # Replays tried while minimizing one failure
+MAGIC = b'FZR1'
+
+LEFT = headless.LEFT_BIT
+RIGHT = headless.RIGHT_BIT
+JUMP = headless.A_BIT
+RESTART = headless.X_BIT
+MOVES = (0, LEFT, RIGHT, JUMP, LEFT | JUMP, RIGHT | JUMP)
+
+
+def random_input(rng, tick, mask):
+    """Anything goes, changing every tick"""
+    if rng.randint(0, 999) == 0:
+        return RESTART
+    return MOVES[rng.randint(0, len(MOVES) - 1)]
+
+
+def hold_right(rng, tick, mask):
+    """Run right, jumping now and then"""
+    return RIGHT | (JUMP if rng.randint(0, 15) == 0 else 0)
+
+
+def spam_jump(rng, tick, mask):
+    """Press jump every other tick, changing direction now and then"""
+    direction = mask & (LEFT | RIGHT)
+    if rng.randint(0, 30) == 0:
+        direction = (0, LEFT, RIGHT)[rng.randint(0, 2)]
+    return direction | (JUMP if tick & 1 else 0)
+
+
+def sticky_input(rng, tick, mask):
+    """Hold a random input for a while, like a person does"""
+    if rng.randint(0, 11) == 0:
+        return MOVES[rng.randint(0, len(MOVES) - 1)]
+    return mask
+
+
+STRATEGIES = {
+    'random': random_input,
+    'hold_right': hold_right,
+    'spam_jump': spam_jump,
+    'sticky': sticky_input,
+}
+
+
+def generate_inputs(strategy, seed, ticks):
+    """Input masks for an episode, the same for the same seed"""
+    from snapshot import Rng
+    rng = Rng(seed)
+    choose = STRATEGIES[strategy]
+    masks = bytearray(ticks)
+    mask = 0
+    for tick in range(ticks):
+        mask = choose(rng, tick, mask)
+        masks[tick] = mask
+    return masks
+
+
+class Checker:
+    """Checks the invariants on a game after every tick"""
+
+    def __init__(self, main):
+        self.main = main
+        self.fall_limit = main.SCREEN_HEIGHT + 20
+        self.still = 0
+        self.last = None
+
+    def check(self, game, mask):
+        """Name of the first broken invariant, or None"""
+        p = game.player
+        for value in (p.x, p.y, p.vel_x, p.vel_y):
+            if not math.isfinite(value):
+                return 'not_finite'
+        if p.x < 0 or p.x + p.width > self.main.SCREEN_WIDTH:
+            return 'off_screen'
+        if p.y > self.fall_limit:
+            return 'below_fall_limit'
+        for platform in game.platforms:
+            if (p.x < platform.x + platform.width and
+                    p.x + p.width > platform.x and
+                    p.y < platform.y + platform.height and
+                    p.y + p.height > platform.y):
+                return 'inside_platform'
+        collected = 0
+        for collectible in game.collectibles:
+            if collectible.collected:
+                collected += 1
+        if game.score != collected * 10:
+            return 'score'
+
+        # Holding left or right must move the player unless at the edge
+        position = (p.x, p.y)
+        direction = mask & (LEFT | RIGHT)
+        at_edge = ((direction == LEFT and p.x <= 0) or
+                   (direction == RIGHT and
+                    p.x + p.width >= self.main.SCREEN_WIDTH))
+        if direction in (LEFT, RIGHT) and not at_edge and position == self.last:
+            self.still += 1
+            if self.still >= STUCK_TICKS:
+                return 'stuck'
+        else:
+            self.still = 0
+        self.last = position
+        return None
+
+
+def play(main, level, inputs):
+    """Play inputs from the start of a level
+
+    Returns (invariant, tick) for the first broken invariant, or None.
+    """
+    game = main.Game(level=level)
+    checker = Checker(main)
+    set_buttons = headless.set_buttons
+    headless.set_buttons(0)
+    for tick, mask in enumerate(inputs):
+        set_buttons(mask)
+        game.update()
+        broken = checker.check(game, mask)
+        if broken:
+            return broken, tick
+    return None
+
+
+def survey(main, level, inputs):
+    """Play all of inputs from the start of a level
+
+    Returns {invariant: first tick it broke on} for every invariant broken.
+    """
+    game = main.Game(level=level)
+    checker = Checker(main)
+    set_buttons = headless.set_buttons
+    headless.set_buttons(0)
+    broken_at = {}
+    for tick, mask in enumerate(inputs):
+        set_buttons(mask)
+        game.update()
+        broken = checker.check(game, mask)
+        if broken and broken not in broken_at:
+            broken_at[broken] = tick
+    return broken_at
+
+
+def shrink(main, level, inputs, invariant):
+    """Make a failing input shorter while it still breaks the same invariant
+
+    Cuts out ever smaller chunks (delta debugging), then blanks out
+    single ticks.
+    """
+    runs = [0]
+
+    def fails(candidate):
+        runs[0] += 1
+        result = play(main, level, candidate)
+        return result is not None and result[0] == invariant, result
+
+    inputs = bytes(inputs)
+    chunk = len(inputs) // 2
+    while chunk >= 1 and runs[0] < MAX_SHRINK_RUNS:
+        start = 0
+        while start < len(inputs) and runs[0] < MAX_SHRINK_RUNS:
+            candidate = inputs[:start] + inputs[start + chunk:]
+            ok, result = fails(candidate)
+            if ok:
+                # Everything after the failing tick is unused
+                inputs = candidate[:result[1] + 1]
+            else:
+                start += chunk
+        chunk //= 2
+    for i in range(len(inputs)):
+        if runs[0] >= MAX_SHRINK_RUNS:
+            break
+        if inputs[i]:
+            candidate = inputs[:i] + b'\0' + inputs[i + 1:]
+            if fails(candidate)[0]:
+                inputs = candidate
+    return inputs
+
+
+def episode(job):
+    """Run one fuzzing episode in a worker process
+
+    Returns a dict with the worker's pid, ticks played, time taken and the
+    failures found, as (invariant, tick, inputs up to that tick).
+    """
+    level, profile, strategy, seed, ticks = job
+    main = headless.load_game(profile)
+    inputs = generate_inputs(strategy, seed, ticks)
+    start = time.perf_counter()
+    broken_at = survey(main, level, inputs)
+    elapsed = time.perf_counter() - start
+    return {'pid': os.getpid(), 'level': level, 'profile': profile,
+            'strategy': strategy, 'seed': seed, 'seconds': elapsed,
+            'ticks': ticks,
+            'failures': [(invariant, tick, bytes(inputs[:tick + 1]))
+                         for invariant, tick in sorted(broken_at.items(),
+                                                       key=lambda b: b[1])]}
+
+
+def minimize(failure):
+    """Shrink one failure's inputs in a worker process"""
+    main = headless.load_game(failure['profile'])
+    failure['inputs'] = shrink(main, failure['level'], failure['inputs'],
+                               failure['invariant'])
+    return failure
+
+
+def distinct(reports):
+    """One failure per level, profile and invariant
+
+    Keeps the one that broke earliest, so it has the least to shrink, and
+    counts the episodes that hit it out of the episodes played on that
+    level and profile.
+    """
+    failures = {}
+    played = {}
+    for report in reports:
+        level = (report['level'], report['profile'].name)
+        played[level] = played.get(level, 0) + 1
+        for invariant, tick, inputs in report['failures']:
+            key = (report['level'], report['profile'].name, invariant)
+            known = failures.get(key)
+            if known:
+                known['episodes'] += 1
+                if tick >= known['tick']:
+                    continue
+            failures[key] = {
+                'level': report['level'], 'profile': report['profile'],
+                'strategy': report['strategy'], 'seed': report['seed'],
+                'invariant': invariant, 'tick': tick, 'inputs': inputs,
+                'episodes': known['episodes'] if known else 1}
+    for key, failure in failures.items():
+        failure['played'] = played[key[:2]]
+    return list(failures.values())
+
+
+def save_replay(failure, directory=FAILURES_DIR):
+    """Write a failure's inputs as a replay file and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    name = failure['profile'].name.encode()
+    path = os.path.join(directory, "%d-%s-%s-%d.replay" % (
+        failure['level'], failure['profile'].name, failure['invariant'],
+        failure['seed']))
+    with open(path, 'wb') as f:
+        f.write(MAGIC + bytes((failure['level'], len(name))) + name)
+        f.write(failure['inputs'])
+    return path
+
+
+def load_replay(path):
+    """Read a replay file: (level, profile name, input masks)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError("%s is not a fuzzer replay" % path)
+    level, size = data[4], data[5]
+    return level, data[6:6 + size].decode(), data[6 + size:]
+
+
+def fuzz(levels, profiles, strategies, ticks=TICKS, seed=0, workers=None):
+    """Run episodes adding up to `ticks` ticks over a process pool
+
+    Returns (episode reports, distinct failures with shrunk inputs).
+    """
+    # Every level, profile and strategy together, in turn
+    combos = [(level, profile, strategy) for level in levels
+              for profile in profiles for strategy in strategies]
+    length = min(EPISODE_TICKS, max(ticks // len(combos), 1))
+    jobs = []
+    for i in range(max(1, ticks // length)):
+        level, profile, strategy = combos[i % len(combos)]
+        jobs.append((level, profile, strategy, seed + i, length))
+    if workers == 1:
+        reports = [episode(job) for job in jobs]
+        return reports, [minimize(failure) for failure in distinct(reports)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(episode, jobs))
+        return reports, list(pool.map(minimize, distinct(reports)))
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--level', action='append', type=int,
+                        help="Level number from config.py (default: all)")
+    parser.add_argument('--profile', action='append',
+                        help="normal, easy or hard (default: all)")
+    parser.add_argument('--strategy', action='append',
+                        choices=sorted(STRATEGIES),
+                        help="Input strategy (default: all)")
+    parser.add_argument('--ticks', type=int, default=TICKS,
+                        help="Total ticks to play (default: %d)" % TICKS)
+    parser.add_argument('--seed', type=int, default=0,
+                        help="First episode seed")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--replay', help="Play back a saved failure")
+    args = parser.parse_args(argv)
+
+    profiles = analyzer.load_profiles()
+    if args.replay:
+        level, profile, inputs = load_replay(args.replay)
+        main = headless.load_game(profiles[profile])
+        result = play(main, level, inputs)
+        if result:
+            print("Level %d / %s: %s at tick %d" % (level, profile, result[0],
+                                                   result[1]))
+            return 1
+        print("Level %d / %s: %d ticks, no invariant broken" % (
+            level, profile, len(inputs)))
+        return 0
+
+    levels = args.level or [int(name) for name in sorted(analyzer.load_levels())]
+    chosen = [profiles[name] for name in (args.profile or sorted(profiles))]
+    strategies = args.strategy or sorted(STRATEGIES)
+
+    start = time.perf_counter()
+    reports, failures = fuzz(levels, chosen, strategies, args.ticks, args.seed,
+                             args.workers)
+    elapsed = time.perf_counter() - start
+
+    workers = {}
+    for report in reports:
+        ticks, seconds = workers.get(report['pid'], (0, 0))
+        workers[report['pid']] = (ticks + report['ticks'],
+                                  seconds + report['seconds'])
+    total = sum(ticks for ticks, _ in workers.values())
+    for i, (ticks, seconds) in enumerate(workers.values()):
+        print("Worker %d: %d ticks, %d ticks/s" % (
+            i, ticks, ticks / max(seconds, 1e-9)))
+    print("%d ticks in %.1fs (%d ticks/s overall)" % (
+        total, elapsed, total / max(elapsed, 1e-9)))
+
+    for failure in failures:
+        print("Level %d / %s: %s in %d of %d episodes (first: %s seed %d, "
+              "tick %d), %d ticks to reproduce: %s" % (
+                  failure['level'], failure['profile'].name,
+                  failure['invariant'], failure['episodes'], failure['played'],
+                  failure['strategy'], failure['seed'], failure['tick'],
+                  len(failure['inputs']), save_replay(failure)))
+    if not failures:
+        print("No invariant broken")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Golden-Frame Regression Harness
+Checks that what Game.draw puts on screen doesn't change by accident
+
+For every level and physics profile this plays a fixed, seeded input
+script headlessly, draws every tick into a software screen and hashes
+the frame. The hashes are compared with the goldens in goldens/frames.idx
+(8 bytes per frame), so thousands of frames are checked per second.
+On a mismatch the same frames are rendered from a known good git revision
+and a PNG (expected | actual | differences in red) is written for each.
+
+Runs on a desktop Python, not on the Picosystem:
+    python goldens.py                   # check every level x every profile
+    python goldens.py --update          # accept the current frames
+    python goldens.py --level 2 --profile hard --against HEAD~3
+"""
+
+import argparse
+import hashlib
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import analyzer
+
+GOLDENS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'goldens',
+                       'frames.idx')
+MAGIC = b'GFI1'
+TICKS = 600         # Ticks played per case
+EVERY = 1           # Hash every Nth tick
+SEED = 2024
+MAX_DIFFS = 3       # PNGs written per failing case
+
+# Input script: mostly running and jumping, now and then standing still
+# or restarting, so collecting, dying and restarting all get drawn
+MOVES = (0x08, 0x08, 0x18, 0x18, 0x04, 0x14, 0x10, 0x00)
+RESTART_CHANCE = 300  # One tick in this many presses X
+
+
+def script(ticks, seed):
+    """Button masks for each tick, the same on every run"""
+    from snapshot import Rng
+    import headless
+    rng = Rng(seed)
+    masks = []
+    mask = 0
+    for _ in range(ticks):
+        if rng.randint(0, RESTART_CHANCE - 1) == 0:
+            masks.append(headless.X_BIT)
+            continue
+        if rng.randint(0, 7) == 0:
+            mask = MOVES[rng.randint(0, len(MOVES) - 1)]
+        masks.append(mask)
+    return masks
+
+
+def case_name(level, profile_name):
+    """Name of a level x profile case"""
+    return "%s-%s" % (level, profile_name)
+
+
+def render(job):
+    """Play one case and return (name, every, [frame hash, ...])
+
+    With a list of ticks in `keep`, also return those frames' pixels.
+    """
+    level, profile, ticks, every, keep = job
+    import headless
+    main = headless.load_game(profile)
+    screen = headless.install_screen()
+    game = main.Game(level=int(level))
+    hashes = []
+    frames = {}
+    for tick, mask in enumerate(script(ticks, SEED + int(level))):
+        headless.set_buttons(mask)
+        game.update()
+        game.draw()
+        if tick % every == 0:
+            hashes.append(hashlib.blake2b(screen.pixels, digest_size=8).digest())
+            if keep and tick in keep:
+                frames[tick] = bytes(screen.pixels)
+    headless.set_buttons(0)
+    name = case_name(level, profile.name)
+    return (name, every, hashes, frames) if keep else (name, every, hashes)
+
+
+def render_all(levels, profiles, ticks=TICKS, every=EVERY, workers=None):
+    """Render every level x profile case on a process pool"""
+    jobs = [(level, profile, ticks, every, None)
+            for level in levels for profile in profiles]
+    if workers == 1 or len(jobs) == 1:
+        return [render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render, jobs))
+
+
+def load_goldens(path=GOLDENS):
+    """Read the golden index: {case name: (every, hashes bytes)}"""
+    goldens = {}
+    if not os.path.exists(path):
+        return goldens
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError("%s is not a golden frame index" % path)
+    offset = 4
+    while offset < len(data):
+        size = data[offset]
+        name = data[offset + 1:offset + 1 + size].decode()
+        offset += 1 + size
+        every, count = struct.unpack_from('<II', data, offset)
+        offset += 8
+        goldens[name] = (every, data[offset:offset + count * 8])
+        offset += count * 8
+    return goldens
+
+
+def save_goldens(goldens, path=GOLDENS):
+    """Write the golden index, cases sorted by name"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for name in sorted(goldens):
+            every, hashes = goldens[name]
+            encoded = name.encode()
+            f.write(bytes((len(encoded),)) + encoded)
+            f.write(struct.pack('<II', every, len(hashes) // 8))
+            f.write(hashes)
+
+
+def compare(name, every, hashes, goldens):
+    """Ticks whose frame differs from the golden one (or all, if none)"""
+    if name not in goldens or goldens[name][0] != every:
+        return None
+    golden = goldens[name][1]
+    actual = b''.join(hashes)
+    if actual == golden:
+        return []
+    return [i * every for i in range(max(len(hashes), len(golden) // 8))
+            if actual[i * 8:i * 8 + 8] != golden[i * 8:i * 8 + 8]]
+
+
+def png(path, width, height, pixels):
+    """Write 0-15 RGB pixels as an 8-bit PNG"""
+    rows = b''.join(b'\0' + bytes(v * 17 for v in pixels[y * width * 3:
+                                                       (y + 1) * width * 3])
+                    for y in range(height))
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2,
+                                           0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows, 9)))
+        f.write(chunk(b'IEND', b''))
+
+
+def diff_image(expected, actual, width=120, height=120):
+    """Expected, actual and their differences side by side"""
+    marks = bytearray(len(actual))
+    for i in range(0, len(actual), 3):
+        if expected[i:i + 3] != actual[i:i + 3]:
+            marks[i] = 15
+        else:
+            # Dim copy of the frame, so the red marks stand out
+            marks[i:i + 3] = bytes(v // 4 for v in actual[i:i + 3])
+    row = width * 3
+    out = bytearray()
+    for y in range(height):
+        for image in (expected, actual, marks):
+            out += image[y * row:(y + 1) * row]
+    return out
+
+
+def reference_frames(revision, level, profile_name, ticks, every, keep):
+    """Render frames from a git revision of the game, in a separate process
+
+    Returns {tick: pixels}, or None if that revision can't be rendered.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tree:
+        archive = subprocess.run(['git', 'archive', revision], cwd=root,
+                                 capture_output=True)
+        if archive.returncode:
+            return None
+        subprocess.run(['tar', '-x', '-C', tree], input=archive.stdout,
+                       check=True)
+        out = os.path.join(tree, 'frames.bin')
+        done = subprocess.run(
+            [sys.executable, 'goldens.py', '--dump', out, '--level', level,
+             '--profile', profile_name, '--ticks', str(ticks),
+             '--every', str(every), '--keep', ','.join(map(str, keep))],
+            cwd=tree, capture_output=True)
+        if done.returncode:
+            return None
+        with open(out, 'rb') as f:
+            data = f.read()
+    frames = {}
+    size = 120 * 120 * 3
+    for i, tick in enumerate(keep):
+        frames[tick] = data[i * size:(i + 1) * size]
+    return frames
+
+
+def write_diffs(revision, level, profile, ticks, every, failed, out_dir):
+    """Write PNG diffs for the first few failing ticks of a case"""
+    keep = failed[:MAX_DIFFS]
+    _, _, _, actual = render((level, profile, ticks, every, keep))
+    expected = reference_frames(revision, level, profile.name, ticks, every,
+                                keep)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for tick in keep:
+        path = os.path.join(out_dir, "%s-%04d.png" % (
+            case_name(level, profile.name), tick))
+        if expected:
+            png(path, 360, 120, diff_image(expected[tick], actual[tick]))
+        else:
+            png(path, 120, 120, actual[tick])
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--level', action='append',
+                        help="Level number from config.py (default: all)")
+    parser.add_argument('--profile', action='append',
+                        help="normal, easy or hard (default: all)")
+    parser.add_argument('--ticks', type=int, default=TICKS,
+                        help="Ticks played per case (default: %d)" % TICKS)
+    parser.add_argument('--every', type=int, default=EVERY,
+                        help="Hash every Nth tick (default: %d)" % EVERY)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--update', action='store_true',
+                        help="Store the current frames as the new goldens")
+    parser.add_argument('--against', default='HEAD',
+                        help="Git revision to render expected frames from")
+    parser.add_argument('--diffs', default='golden_diffs',
+                        help="Where PNG diffs are written on a mismatch")
+    parser.add_argument('--dump', help=argparse.SUPPRESS)
+    parser.add_argument('--keep', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    levels = sorted(analyzer.load_levels())
+    profiles = analyzer.load_profiles()
+    if args.level:
+        levels = args.level
+    chosen = [profiles[name] for name in (args.profile or sorted(profiles))]
+
+    if args.dump:
+        # Used by reference_frames(): raw pixels of the --keep ticks
+        keep = [int(t) for t in args.keep.split(',')]
+        _, _, _, frames = render((levels[0], chosen[0], args.ticks,
+                                  args.every, keep))
+        with open(args.dump, 'wb') as f:
+            for tick in keep:
+                f.write(frames[tick])
+        return 0
+
+    import time
+    start = time.perf_counter()
+    results = render_all(levels, chosen, args.ticks, args.every, args.workers)
+    elapsed = time.perf_counter() - start
+    frames = sum(len(hashes) for _, _, hashes in results)
+    print("Rendered %d frames in %.1fs (%d frames/s)" % (
+        frames, elapsed, frames / max(elapsed, 1e-9)))
+
+    goldens = load_goldens()
+    if args.update:
+        for name, every, hashes in results:
+            goldens[name] = (every, b''.join(hashes))
+        save_goldens(goldens)
+        print("Updated %d cases in %s" % (len(results), GOLDENS))
+        return 0
+
+    failed = False
+    for (level, profile), (name, every, hashes) in zip(
+            [(l, p) for l in levels for p in chosen], results):
+        ticks = compare(name, every, hashes, goldens)
+        if ticks is None:
+            print("%s: no goldens (run with --update)" % name)
+            failed = True
+        elif ticks:
+            failed = True
+            paths = write_diffs(args.against, level, profile, args.ticks,
+                                every, ticks, args.diffs)
+            print("%s: %d frames differ, first at tick %d - see %s" % (
+                name, len(ticks), ticks[0], ', '.join(paths)))
+        else:
+            print("%s: %d frames ok" % (name, len(hashes)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
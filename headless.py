@@ -0,0 +1,189 @@
+"""
+Headless Picosystem Backend
+Runs the real game code on a desktop Python with scripted input
+
+The picosystem.py stub only answers "every button is held" and draws
+nothing. This module swaps its input functions for ones driven by a
+per-tick button bitmask so tools can play main.Game without a device or a
+window, and can swap its drawing functions for a software Screen so the
+frames Game.draw produces can be checked.
+
+Example:
+    import headless
+    main = headless.load_game()
+    game = headless.build_game(main, platforms, collectibles)
+    headless.run(game, [headless.RIGHT_BIT] * 30)
+"""
+
+import picosystem
+
+from controls import (UP_BIT, DOWN_BIT, LEFT_BIT, RIGHT_BIT, A_BIT, B_BIT,
+                      X_BIT, Y_BIT, BUTTONS)
+
+BUTTON_BITS = dict(BUTTONS)
+
+# Buttons held this tick and last tick
+_held = 0
+_previous = 0
+
+
+def _button(button):
+    """Headless picosystem.button: is the button held"""
+    return bool(_held & BUTTON_BITS.get(button, 0))
+
+
+def _pressed(button):
+    """Headless picosystem.pressed: did the button go down this tick"""
+    bit = BUTTON_BITS.get(button, 0)
+    return bool(_held & bit and not _previous & bit)
+
+
+def install():
+    """Route picosystem input through the headless bitmask"""
+    picosystem.button = _button
+    picosystem.pressed = _pressed
+    set_buttons(0)
+    set_buttons(0)
+
+
+def set_buttons(mask):
+    """Set the buttons held for the next tick"""
+    global _held, _previous
+    _previous = _held
+    _held = mask
+
+
+def apply_profile(main, profile):
+    """Copy a physics profile (see analyzer.Profile) into main.py's constants"""
+    main.GRAVITY = profile.gravity
+    main.JUMP_STRENGTH = profile.jump_strength
+    main.PLAYER_SPEED = profile.player_speed
+
+
+def load_game(profile=None):
+    """Import main.py headlessly and return the module
+
+    Importing main builds its Game and calls picosystem.start(), which the
+    stub returns from straight away.
+    """
+    install()
+    import main
+    if profile is not None:
+        apply_profile(main, profile)
+    return main
+
+
+def build_game(main, platforms, collectibles):
+    """Make a main.Game playing a config.py style layout"""
+    game = main.Game()
+    game.platforms = [main.Platform(*rect) for rect in platforms]
+    game.collectibles = [main.Collectible(x, y) for x, y in collectibles]
+    game.start_level()
+    return game
+
+
+def input_mask(label):
+    """Turn an analyzer input label ('R', 'JL', '-') into a button mask"""
+    mask = A_BIT if label[0] == 'J' else 0
+    direction = label[-1]
+    if direction == 'L':
+        mask |= LEFT_BIT
+    elif direction == 'R':
+        mask |= RIGHT_BIT
+    return mask
+
+
+def run(game, inputs):
+    """Feed one button mask per tick into game.update"""
+    for mask in inputs:
+        set_buttons(mask)
+        game.update()
+    set_buttons(0)
+
+
+class Screen:
+    """Software framebuffer for the drawing calls the game uses
+
+    Pixels are stored as 3 bytes (r, g, b) of 0-15, like the pen colours.
+    Text has no real font: each character is drawn as a block pattern
+    made from its character code, which is enough to see text change.
+    """
+
+    def __init__(self, width=120, height=120):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height * 3)
+        self.colour = bytes(3)
+        self.glyphs = {}    # Character -> ((dx, dy), ...) of set pixels
+
+    def pen(self, *args):
+        """picosystem.pen: pen(), pen(rgba), pen(r, g, b) or pen(r, g, b, a)"""
+        if not args:
+            self.colour = bytes(3)
+        elif len(args) == 1:
+            rgba = args[0]
+            self.colour = bytes(((rgba >> 12) & 15, (rgba >> 8) & 15,
+                                 (rgba >> 4) & 15))
+        else:
+            self.colour = bytes(int(c) & 15 for c in args[:3])
+
+    def clear(self):
+        """picosystem.clear: fill the screen with the pen colour"""
+        self.pixels[:] = self.colour * (self.width * self.height)
+
+    def frect(self, x, y, w, h):
+        """picosystem.frect: filled rectangle, clipped to the screen"""
+        x, y = int(x), int(y)
+        left = max(x, 0)
+        right = min(x + int(w), self.width)
+        top = max(y, 0)
+        bottom = min(y + int(h), self.height)
+        if left >= right or top >= bottom:
+            return
+        row = self.colour * (right - left)
+        for line in range(top, bottom):
+            start = (line * self.width + left) * 3
+            self.pixels[start:start + len(row)] = row
+
+    def rect(self, x, y, w, h):
+        """picosystem.rect: rectangle outline"""
+        self.frect(x, y, w, 1)
+        self.frect(x, y + h - 1, w, 1)
+        self.frect(x, y, 1, h)
+        self.frect(x + w - 1, y, 1, h)
+
+    def hline(self, x, y, length):
+        """picosystem.hline"""
+        self.frect(x, y, length, 1)
+
+    def vline(self, x, y, length):
+        """picosystem.vline"""
+        self.frect(x, y, 1, length)
+
+    def pixel(self, x, y):
+        """picosystem.pixel"""
+        x, y = int(x), int(y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            start = (y * self.width + x) * 3
+            self.pixels[start:start + 3] = self.colour
+
+    def text(self, message, x=0, y=0, wrap=-1):
+        """picosystem.text: 4x6 block pattern per character, 6px apart"""
+        for i, char in enumerate(message):
+            glyph = self.glyphs.get(char)
+            if glyph is None:
+                code = (ord(char) * 2654435761) & 0xFFFFFF if char != ' ' else 0
+                glyph = tuple((bit % 4, bit // 4) for bit in range(24)
+                              if code >> bit & 1)
+                self.glyphs[char] = glyph
+            for dx, dy in glyph:
+                self.pixel(x + i * 6 + dx, y + dy)
+
+
+def install_screen(width=120, height=120):
+    """Route picosystem drawing into a new Screen and return it"""
+    screen = Screen(width, height)
+    for name in ('pen', 'clear', 'frect', 'rect', 'hline', 'vline', 'pixel',
+                 'text'):
+        setattr(picosystem, name, getattr(screen, name))
+    return screen
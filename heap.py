@@ -0,0 +1,20 @@
+"""
+Heap Usage
+Reads how much memory is free and allocated
+
+Uses gc.mem_free()/gc.mem_alloc() on MicroPython. CPython has neither, so
+there the allocated size comes from tracemalloc (while it is tracing) and
+the free size is reported as -1.
+"""
+
+import gc
+
+
+def usage():
+    """Get (free bytes, allocated bytes) - either is -1 if unknown"""
+    if hasattr(gc, 'mem_free'):
+        return gc.mem_free(), gc.mem_alloc()
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        return -1, tracemalloc.get_traced_memory()[0]
+    return -1, -1
@@ -0,0 +1,145 @@
+"""
+Idle Frame Detector
+Skips drawing frames that would look exactly like the last one
+
+The "Level Complete!" screen, or a low quality level that only moves the
+bobbing collectibles every few ticks, give many frames where nothing on
+screen changes, yet each one was cleared and drawn again. Everything a
+frame shows is in the game's render state (render.py), so comparing it
+with a copy of the last drawn one tells whether drawing can be skipped:
+the screen buffer still holds that frame.
+
+After some idle frames in a row the detector can also sleep a little
+every tick, lowering the tick rate until something changes again. Input
+is still read every tick, so any press wakes it up.
+
+The Picosystem's start() loop flips the screen after every draw(tick)
+call, so only the clear and redraw are saved - the flip just resends the
+unchanged buffer. report() prints how many frames were skipped, and the
+battery voltage at the start and now, from picosystem.battery().
+
+    python idle.py      # check skipped frames really were unchanged
+"""
+
+from array import array
+
+import picosystem
+
+IDLE_FRAMES = 30    # Unchanged frames in a row before slowing down
+
+try:
+    from time import sleep_ms
+except ImportError:
+    from time import sleep
+
+    def sleep_ms(ms):
+        """time.sleep_ms for desktop Python"""
+        sleep(ms / 1000)
+
+
+class IdleDetector:
+    """Remembers the last drawn render state and spots repeats of it"""
+
+    def __init__(self, sleep_ms=0, idle_frames=IDLE_FRAMES):
+        self.sleep_ms = sleep_ms    # Sleep per tick once idle (0 = never)
+        self.idle_frames = idle_frames
+        self.last = None            # Copy of the last drawn frame's data
+        self.unchanged = 0          # Unchanged frames in a row
+        self.frames = 0
+        self.skipped = 0
+        self.slept = 0              # Ticks slowed down
+        self.throttled = False      # The last tick slept
+        self.battery_start = picosystem.battery()
+
+    def changed(self, data):
+        """Check if a frame differs from the last one drawn
+
+        Counts the frame, and remembers it when it has to be drawn.
+        """
+        self.frames += 1
+        last = self.last
+        if last is not None and last == data:
+            self.unchanged += 1
+            self.skipped += 1
+            return False
+        if last is None or len(last) != len(data):
+            self.last = array(data.typecode, data)
+        else:
+            last[:] = data
+        self.unchanged = 0
+        return True
+
+    def invalidate(self):
+        """Something else was drawn over the frame: draw the next one"""
+        self.last = None
+
+    def throttle(self):
+        """Call at the start of each tick - sleeps once the screen has been idle
+
+        throttled says whether this tick slept. picosystem.stats() only
+        reports the tick on the next one, so main.py updates the quality
+        governor before calling this, with throttled still describing the
+        frame stats() covers.
+        """
+        self.throttled = (self.sleep_ms > 0 and
+                          self.unchanged >= self.idle_frames)
+        if self.throttled:
+            self.slept += 1
+            sleep_ms(self.sleep_ms)
+
+    def report(self):
+        """Print the share of frames skipped and the battery voltage"""
+        print("Idle: skipped %d of %d frames (%d%%), slowed %d ticks, "
+              "battery %d -> %d" % (
+                  self.skipped, self.frames,
+                  self.skipped * 100 // max(self.frames, 1), self.slept,
+                  self.battery_start, picosystem.battery()))
+
+
+def check(ticks=900):
+    """Check every skipped frame would have drawn the same pixels
+
+    Plays the goldens.py input script on the lowest quality level (which
+    animates every 8th tick), then stands still on a finished level.
+    Returns True if no skipped frame differed from the one on screen.
+    """
+    import hashlib
+    import headless
+    import goldens
+    import quality
+    main = headless.load_game()
+    screen = headless.install_screen()
+    game = main.Game()
+    game.quality = quality.Governor(verbose=False)
+    game.quality.set_level(len(quality.LEVELS) - 1)
+    detector = IdleDetector()
+    masks = goldens.script(ticks, goldens.SEED)
+
+    wrong = 0
+    shown = None
+    for tick, mask in enumerate(masks):
+        if tick == ticks * 2 // 3:
+            # Finish the level, then stand still
+            for collectible in list(game.collectibles):
+                if not collectible.collected:
+                    game.collect(collectible)
+        if tick >= ticks * 2 // 3:
+            mask = 0
+        headless.set_buttons(mask)
+        game.quality.animate = tick % game.quality.animate_every == 0
+        game.update()
+        game.draw()
+        frame = hashlib.blake2b(screen.pixels, digest_size=8).digest()
+        if detector.changed(game.render.data):
+            shown = frame
+        elif frame != shown:
+            wrong += 1
+    headless.set_buttons(0)
+    detector.report()
+    print("%d skipped frames differed from the screen" % wrong)
+    return wrong == 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check() else 1)
@@ -0,0 +1,296 @@
+"""
+Hot Kernels
+The inner loops the game spends most of its time in, compiled to machine
+code on the Picosystem
+
+MicroPython normally interprets bytecode. Functions decorated with
+@micropython.native are compiled to machine code instead (same results,
+roughly twice as fast), and @micropython.viper ones work on raw machine
+integers and memory, which is much faster again but only for integer work.
+On a desktop Python a stand-in micropython whose decorators return the
+function unchanged is used, so each kernel is written once and runs as
+plain Python there.
+
+    rect_collision(x1, y1, w1, h1, x2, y2, w2, h2)  do two rectangles overlap
+    move(x, y, vel_x, vel_y, gravity)               -> (x, y, vel_y)
+    collide_platforms(platforms, x, y, w, h, vel_y) -> (y, vel_y, on_ground)
+    update_particles(particles, occupancy)          move them, drop dead ones
+    any_bits(buf, start, end)                       any of buf[start:end] set
+
+Positions are floats, so only any_bits can be a viper kernel; the others
+are native, which gives exactly the same float results as plain Python.
+Viper code uses machine pointers (ptr8) that only exist on MicroPython,
+so any_bits alone has a plain version as well.
+
+    python kernels.py       # check the kernels against reference code
+"""
+
+try:
+    import micropython
+    COMPILED = True
+except ImportError:
+    COMPILED = False
+
+    class micropython:
+        """Desktop stand-in: the code emitter decorators change nothing"""
+
+        @staticmethod
+        def native(function):
+            return function
+
+        viper = native
+
+
+@micropython.native
+def rect_collision(x1, y1, w1, h1, x2, y2, w2, h2):
+    """Check if two rectangles collide"""
+    return (x1 < x2 + w2 and x1 + w1 > x2 and
+            y1 < y2 + h2 and y1 + h1 > y2)
+
+
+@micropython.native
+def move(x, y, vel_x, vel_y, gravity):
+    """One tick of gravity and movement"""
+    vel_y += gravity
+    return x + vel_x, y + vel_y, vel_y
+
+
+@micropython.native
+def collide_platforms(platforms, x, y, w, h, vel_y):
+    """Land on or bump into the platforms a box overlaps
+
+    Overlaps are tested with the box where it was on entry, landing and
+    bumping with where it has been pushed to so far.
+    """
+    top = y
+    on_ground = False
+    for platform in platforms:
+        px = platform.x
+        py = platform.y
+        if (x < px + platform.width and x + w > px and
+                top < py + platform.height and top + h > py):
+            if vel_y > 0:
+                if y < py:
+                    y = py - h
+                    vel_y = 0
+                    on_ground = True
+            elif vel_y < 0:
+                if y > py:
+                    y = py + platform.height
+                    vel_y = 0
+    return y, vel_y, on_ground
+
+
+@micropython.native
+def update_particles(particles, occupancy=None):
+    """Particle.update for a whole list, removing the ones that died"""
+    kept = 0
+    for particle in particles:
+        x = particle.x + particle.vel_x
+        y = particle.y + particle.vel_y
+        if occupancy and occupancy.solid(x, y):
+            # Hit a platform: come to rest just outside it
+            particle.vel_x = 0
+            particle.vel_y = 0
+        else:
+            particle.x = x
+            particle.y = y
+        particle.vel_y += 0.1
+        particle.life -= 1
+        if particle.life > 0:
+            particles[kept] = particle
+            kept += 1
+    del particles[kept:]
+
+
+if COMPILED:
+    @micropython.viper
+    def any_bits(buf, start: int, end: int) -> bool:
+        """Check if any byte of buf[start:end] is not zero"""
+        p = ptr8(buf)
+        i = start
+        while i < end:
+            if p[i]:
+                return True
+            i += 1
+        return False
+else:
+    def any_bits(buf, start, end):
+        """Check if any byte of buf[start:end] is not zero"""
+        for i in range(start, end):
+            if buf[i]:
+                return True
+        return False
+
+
+class _Box:
+    """Something with a position, size and velocity, for the checks"""
+
+    def __init__(self, x, y, width, height, vel_x=0, vel_y=0, life=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.vel_x = vel_x
+        self.vel_y = vel_y
+        self.life = life
+
+
+def _reference_overlap(x1, y1, w1, h1, x2, y2, w2, h2):
+    """Rectangle overlap as overlapping intervals, for the checks"""
+    return (max(x1, x2) < min(x1 + w1, x2 + w2) and
+            max(y1, y2) < min(y1 + h1, y2 + h2))
+
+
+def _reference_collisions(platforms, box):
+    """Player.handle_collisions as it was before the kernel, for the checks"""
+    player_rect = (box.x, box.y, box.width, box.height)
+    on_ground = False
+    for platform in platforms:
+        x1, y1, w1, h1 = player_rect
+        x2, y2, w2, h2 = platform.x, platform.y, platform.width, platform.height
+        if x1 < x2 + w2 and x1 + w1 > x2 and y1 < y2 + h2 and y1 + h1 > y2:
+            if box.vel_y > 0:
+                if box.y < platform.y:
+                    box.y = platform.y - box.height
+                    box.vel_y = 0
+                    on_ground = True
+            elif box.vel_y < 0:
+                if box.y > platform.y:
+                    box.y = platform.y + platform.height
+                    box.vel_y = 0
+    return box.y, box.vel_y, on_ground
+
+
+def _reference_particle(particle, occupancy):
+    """Particle.update from advanced_example.py, for the checks"""
+    x = particle.x + particle.vel_x
+    y = particle.y + particle.vel_y
+    if occupancy and occupancy.solid(x, y):
+        particle.vel_x = 0
+        particle.vel_y = 0
+    else:
+        particle.x = x
+        particle.y = y
+    particle.vel_y += 0.1
+    particle.life -= 1
+    return particle.life > 0
+
+
+def parity(cases=3000, seed=7):
+    """Run every kernel on seeded random inputs
+
+    Returns (mismatches against the reference code, a checksum of all
+    results). The checksum is the same wherever the kernels agree, so it
+    can be compared between CPython and a MicroPython build.
+    """
+    import struct
+    from snapshot import Rng
+    from occupancy import Occupancy
+    import config
+
+    rng = Rng(seed)
+    mismatches = 0
+    checksum = [0x811C9DC5]
+
+    def mix(*values):
+        for value in values:
+            for byte in struct.pack('<d', float(value)):
+                checksum[0] = ((checksum[0] ^ byte) * 0x01000193) & 0xFFFFFFFF
+
+    def coordinate():
+        # Whole, half and arbitrary positions, to hit exact edges too
+        value = rng.uniform(-10, 130)
+        kind = rng.randint(0, 2)
+        if kind == 0:
+            return float(int(value))
+        if kind == 1:
+            return int(value * 2) / 2
+        return value
+
+    levels = [[_Box(*rect[:4]) for rect in layout]
+              for layout, _ in config.LEVELS]
+    for case in range(cases):
+        platforms = levels[case % len(levels)]
+        a = (coordinate(), coordinate(), rng.randint(1, 12), rng.randint(1, 12))
+        b = (coordinate(), coordinate(), rng.randint(1, 30), rng.randint(1, 12))
+        hit = rect_collision(a[0], a[1], a[2], a[3], b[0], b[1], b[2], b[3])
+        if hit != _reference_overlap(a[0], a[1], a[2], a[3],
+                                     b[0], b[1], b[2], b[3]):
+            mismatches += 1
+        mix(hit)
+
+        vel_x = rng.randint(-2, 2)
+        vel_y = rng.uniform(-9, 9)
+        moved = move(a[0], a[1], vel_x, vel_y, 0.5)
+        box = _Box(a[0], a[1], 8, 8, vel_x, vel_y)
+        box.vel_y += 0.5    # As Player.update does it
+        box.x += box.vel_x
+        box.y += box.vel_y
+        if moved != (box.x, box.y, box.vel_y):
+            mismatches += 1
+        mix(*moved)
+
+        box = _Box(moved[0], moved[1], 8, 8, vel_y=moved[2])
+        result = collide_platforms(platforms, box.x, box.y, 8, 8, box.vel_y)
+        if result != _reference_collisions(platforms, box):
+            mismatches += 1
+        mix(*result)
+
+    occupancy = Occupancy(levels[0])
+    particles = [_Box(rng.uniform(0, 120), rng.uniform(0, 120), 1, 1,
+                      rng.uniform(-3, 3), rng.uniform(-3, 1), life=1 + i % 40)
+                 for i in range(200)]
+    copies = [_Box(p.x, p.y, 1, 1, p.vel_x, p.vel_y, p.life)
+              for p in particles]
+    for _ in range(45):
+        update_particles(particles, occupancy)
+        copies = [p for p in copies if _reference_particle(p, occupancy)]
+        if [(p.x, p.y, p.vel_x, p.vel_y, p.life) for p in particles] != \
+                [(p.x, p.y, p.vel_x, p.vel_y, p.life) for p in copies]:
+            mismatches += 1
+        for p in particles:
+            mix(p.x, p.y, p.life)
+
+    bits = occupancy.bits
+    for case in range(cases):
+        start = rng.randint(0, len(bits) - 1)
+        end = rng.randint(start, min(len(bits), start + 20))
+        found = any_bits(bits, start, end)
+        if bool(found) != any(bits[start:end]):
+            mismatches += 1
+        mix(bool(found))
+    return mismatches, checksum[0]
+
+
+def main():
+    """Check the kernels, and compare with MicroPython if it is installed"""
+    import sys
+    mismatches, checksum = parity()
+    build = sys.implementation.name + (" (native/viper)" if COMPILED
+                                       else " (plain Python)")
+    print("%s: %d mismatches, checksum %08x" % (build, mismatches, checksum))
+    if '--checksum' in sys.argv or COMPILED:
+        return 1 if mismatches else 0
+
+    # A desktop MicroPython (the unix port) runs the compiled kernels
+    import shutil
+    import subprocess
+    micropython_exe = shutil.which('micropython')
+    if not micropython_exe:
+        print("micropython not found: compiled kernels not checked")
+        return 1 if mismatches else 0
+    import os
+    done = subprocess.run([micropython_exe, 'kernels.py', '--checksum'],
+                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True)
+    print(done.stdout.strip() or done.stderr.strip())
+    if done.returncode or ("%08x" % checksum) not in done.stdout:
+        print("Compiled kernels differ from the plain Python ones")
+        return 1
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
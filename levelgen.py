@@ -0,0 +1,244 @@
+"""
+Procedural Level Generator
+Builds level packs in the same format as the layouts in config.py
+
+Each candidate layout comes from a seed, so the same seed and physics
+profile always give the same level. Candidates are validated by:
+- keeping every platform clear of the spawn point, so the player never
+  starts inside one
+- the reachability analyzer, which proves every collectible can be reached
+  and measures the shortest path to each one
+- replaying those paths through the real main.Game on the headless
+  backend, which confirms the collectible really gets picked up
+
+Validation results are cached on disk by seed and physics profile, so
+re-running a pack only pays for new seeds.
+
+Runs on a desktop Python, not on the Picosystem:
+    python levelgen.py --count 2000 --keep 20 --out level_pack.py
+    python levelgen.py --profile hard --min-ticks 150 --max-ticks 400
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import analyzer
+import headless
+
+SCREEN_WIDTH = analyzer.SCREEN_WIDTH
+GROUND_Y = 110
+GROUND_HEIGHT = 10
+PLATFORM_HEIGHT = 8
+TOP_Y = 20          # Highest a platform may sit (leaves room for the UI)
+CACHE_DIR = '.levelgen_cache'
+CACHE_VERSION = 2   # Bump when validation changes, so old results are redone
+
+
+def generate(seed, profile):
+    """Create one candidate layout from a seed
+
+    Platforms are stacked upwards, each one within the profile's jump
+    envelope of the one below, with a collectible above each platform.
+    Returns (platforms, collectibles) as config.py style tuples.
+    """
+    rng = random.Random(seed)
+    arcs = analyzer.ArcTables(profile)
+    # Stay well inside the envelope so most candidates are solvable
+    max_rise = int(min(arcs.apex_height * 0.8, 30))
+    max_gap = int(profile.player_speed * arcs.apex_tick)
+
+    # Ground with a gap somewhere right of the spawn point
+    gap_x = rng.randint(40, 80)
+    gap_width = rng.randint(10, 25)
+    platforms = [(0, GROUND_Y, gap_x, GROUND_HEIGHT)]
+    if gap_x + gap_width < SCREEN_WIDTH:
+        platforms.append((gap_x + gap_width, GROUND_Y,
+                          SCREEN_WIDTH - gap_x - gap_width, GROUND_HEIGHT))
+
+    collectibles = []
+    x, y, width = 0, GROUND_Y, gap_x
+    while True:
+        y -= rng.randint(8, max(8, max_rise))
+        if y < TOP_Y:
+            break
+        width = rng.randint(15, 40)
+        lowest = max(0, x - width - max_gap)
+        highest = min(SCREEN_WIDTH - width, x + width + max_gap)
+        x = rng.randint(lowest, max(lowest, highest))
+        platforms.append((x, y, width, PLATFORM_HEIGHT))
+        collectibles.append((x + rng.randint(0, width - 6), y - 8))
+    return platforms, collectibles
+
+
+def blocks_spawn(platforms):
+    """Whether any platform overlaps the player at the spawn point"""
+    left = analyzer.config.PLAYER_START_X
+    top = analyzer.config.PLAYER_START_Y
+    right, bottom = left + analyzer.PLAYER_WIDTH, top + analyzer.PLAYER_HEIGHT
+    return any(x < right and x + width > left and y < bottom and
+               y + height > top for x, y, width, height in platforms)
+
+
+def replay_collects(main, platforms, collectibles, paths):
+    """Check each analyzer path picks up its collectible in the real game"""
+    for index, path in paths.items():
+        game = headless.build_game(main, platforms, collectibles)
+        headless.run(game, [headless.input_mask(label) for label in path])
+        if not game.collectibles[index].collected:
+            return False
+    return True
+
+
+def validate(job):
+    """Generate and validate one seed - runs inside a pool worker
+
+    Returns a result dict that is also what gets cached.
+    """
+    seed, profile = job
+    platforms, collectibles = generate(seed, profile)
+    arcs = analyzer.ArcTables(profile)
+    start = (analyzer.config.PLAYER_START_X, analyzer.config.PLAYER_START_Y)
+    _, paths = analyzer.search(arcs, platforms, collectibles, start)
+
+    solvable = (not blocks_spawn(platforms) and
+                len(paths) == len(collectibles))
+    if solvable:
+        main = headless.load_game(profile)
+        solvable = replay_collects(main, platforms, collectibles, paths)
+
+    lengths = [len(path) for path in paths.values()] or [0]
+    jumps = sum(label[0] == 'J' for path in paths.values() for label in path)
+    return {
+        'seed': seed,
+        'solvable': solvable,
+        'platforms': platforms,
+        'collectibles': collectibles,
+        # Difficulty: the longest shortest-path to any collectible
+        'ticks': max(lengths),
+        'jumps': jumps,
+    }
+
+
+def profile_key(profile):
+    """Cache file name for a physics profile"""
+    return '%s_g%s_j%s_s%s_v%d' % (profile.name, profile.gravity,
+                                   profile.jump_strength, profile.player_speed,
+                                   CACHE_VERSION)
+
+
+class ResultCache:
+    """Validation results on disk, one JSON line per seed"""
+
+    def __init__(self, directory, profile):
+        self.path = os.path.join(directory, profile_key(profile) + '.jsonl')
+        self.results = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    result = json.loads(line)
+                    self.results[result['seed']] = result
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'a')
+
+    def add(self, result):
+        """Store a freshly validated result"""
+        self.results[result['seed']] = result
+        self.file.write(json.dumps(result) + '\n')
+
+    def close(self):
+        """Flush the cache to disk"""
+        self.file.close()
+
+
+def validate_seeds(seeds, profile, workers=None, cache_dir=CACHE_DIR):
+    """Validate many seeds across a process pool, reusing cached results"""
+    cache = ResultCache(cache_dir, profile)
+    todo = [seed for seed in seeds if seed not in cache.results]
+    try:
+        if todo:
+            jobs = [(seed, profile) for seed in todo]
+            chunk = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(validate, jobs, chunksize=chunk):
+                    cache.add(result)
+    finally:
+        cache.close()
+    return [cache.results[seed] for seed in seeds]
+
+
+def format_layout(value):
+    """Format a list of tuples the way config.py lays them out"""
+    lines = ['    %r,' % (item,) for item in value]
+    return '[\n' + '\n'.join(lines) + '\n]'
+
+
+def write_pack(path, levels, profile):
+    """Write chosen levels as LEVEL_<n>_PLATFORMS / _COLLECTIBLES constants
+
+    followed by a LEVELS list, so the file can replace the level section
+    of config.py as it is.
+    """
+    with open(path, 'w') as f:
+        f.write('"""\nGenerated level pack\nProfile: %r\n"""\n' % profile)
+        for n, result in enumerate(levels, 1):
+            f.write('\n# Seed %d, %d ticks to the furthest collectible\n' % (
+                result['seed'], result['ticks']))
+            f.write('LEVEL_%d_PLATFORMS = %s\n\n' % (
+                n, format_layout([tuple(p) for p in result['platforms']])))
+            f.write('LEVEL_%d_COLLECTIBLES = %s\n' % (
+                n, format_layout([tuple(c) for c in result['collectibles']])))
+        f.write('\n# Every level in the order they are played - '
+                '(platforms, collectibles)\nLEVELS = [\n')
+        for n in range(1, len(levels) + 1):
+            f.write('    (LEVEL_%d_PLATFORMS, LEVEL_%d_COLLECTIBLES),\n' % (n, n))
+        f.write(']\n')
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--profile', default='normal',
+                        help="normal, easy or hard (default: normal)")
+    parser.add_argument('--seed', type=int, default=0, help="First seed")
+    parser.add_argument('--count', type=int, default=200,
+                        help="Number of candidate seeds to try")
+    parser.add_argument('--keep', type=int, default=10,
+                        help="Number of levels to put in the pack")
+    parser.add_argument('--min-ticks', type=int, default=0,
+                        help="Easiest allowed level (ticks to furthest item)")
+    parser.add_argument('--max-ticks', type=int, default=10 ** 9,
+                        help="Hardest allowed level")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--cache', default=CACHE_DIR, help="Cache directory")
+    parser.add_argument('--out', default='level_pack.py',
+                        help="Level pack file to write")
+    args = parser.parse_args(argv)
+
+    profile = analyzer.load_profiles()[args.profile]
+    seeds = range(args.seed, args.seed + args.count)
+    results = validate_seeds(seeds, profile, args.workers, args.cache)
+
+    solvable = [r for r in results if r['solvable']]
+    fitting = [r for r in solvable
+               if args.min_ticks <= r['ticks'] <= args.max_ticks]
+    print("%d candidates, %d solvable, %d in the difficulty range" % (
+        len(results), len(solvable), len(fitting)))
+    if not fitting:
+        return 1
+
+    # Spread the pack evenly over the difficulty range, easiest first
+    fitting.sort(key=lambda r: (r['ticks'], r['seed']))
+    keep = min(args.keep, len(fitting))
+    chosen = [fitting[i * len(fitting) // keep] for i in range(keep)]
+    write_pack(args.out, chosen, profile)
+    print("Wrote %d levels to %s" % (len(chosen), args.out))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
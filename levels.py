@@ -0,0 +1,177 @@
+"""
+Level Manager
+Moves the game between the levels listed in config.LEVELS
+
+On each transition the manager:
+- releases the old level's platforms, collectibles and cached data
+- builds the new level (or swaps in the one preloaded during play)
+- logs gc.mem_free()/gc.mem_alloc() before and after
+
+With preloading on, the next level is built a few objects per tick while
+the current one is played, so the transition itself costs almost nothing.
+
+Run this file on a desktop Python to check that memory goes back to the
+same baseline after every transition:
+    python levels.py
+"""
+
+import gc
+
+import heap
+
+PRELOAD_STEPS = 2  # Objects built per tick while preloading
+
+
+def level_count():
+    """Count the levels listed in config.LEVELS"""
+    import config
+    return len(config.LEVELS)
+
+
+class LevelManager:
+    """Loads, unloads and preloads levels for a Game"""
+
+    def __init__(self, game, preload=False, verbose=True, scheduler=None):
+        self.game = game
+        self.count = level_count()
+        self.preload = preload
+        self.verbose = verbose
+        self.scheduler = scheduler  # Runs the preloading, if given
+        self.pending = None     # Generator (or Task) building the next level
+        self.preloaded = None   # (level, platforms, collectibles) once built
+        self.last_transition = None
+        game.levels = self
+
+    def next_level(self):
+        """Level that follows the current one, wrapping back to the first"""
+        return self.game.level % self.count + 1
+
+    def update(self):
+        """Call once per tick - spreads preloading over several frames
+
+        With a scheduler the preloading runs as a task in the frame's idle
+        time, otherwise PRELOAD_STEPS objects get built per tick.
+        """
+        if not self.preload or self.preloaded or self.count < 2:
+            return
+        if self.pending is None:
+            builder = self._preload(self.next_level())
+            if self.scheduler:
+                self.pending = self.scheduler.spawn(builder, name="preload")
+            else:
+                self.pending = builder
+        if self.scheduler:
+            return
+        for _ in range(PRELOAD_STEPS):
+            try:
+                next(self.pending)
+            except StopIteration:
+                return
+
+    def _preload(self, level):
+        """Build a level off to the side, one object per step"""
+        platforms = []
+        collectibles = []
+        yield from self.game.build_level(level, platforms, collectibles)
+        self.preloaded = (level, platforms, collectibles)
+        self.pending = None
+
+    def advance(self):
+        """Move on to the next level"""
+        self.load(self.next_level())
+
+    def load(self, level):
+        """Swap the current level for `level`"""
+        game = self.game
+        previous = game.level
+        gc.collect()
+        before = heap.usage()
+
+        game.release_level()
+        preloaded = self.preloaded
+        if self.pending is not None:
+            if self.scheduler:
+                self.pending.cancel()
+            else:
+                self.pending.close()
+            self.pending = None
+        self.preloaded = None
+        game.level = level
+        if preloaded and preloaded[0] == level:
+            game.platforms = preloaded[1]
+            game.collectibles = preloaded[2]
+        else:
+            game.setup_level()
+        preloaded = None
+        game.start_level()
+
+        gc.collect()
+        after = heap.usage()
+        self.last_transition = (previous, level, before, after)
+        if self.verbose:
+            print("Level %d -> %d: free %d -> %d, alloc %d -> %d" % (
+                previous, level, before[0], after[0], before[1], after[1]))
+
+
+def check_transitions(rounds=3, frames=10):
+    """Check memory returns to baseline after every level transition
+
+    Loads each level in turn, several times over, plays a few frames so
+    per-level buffers like the render state get sized, and compares the
+    memory held by objects any of the game's modules allocated - every .py
+    file next to this one, not only main.py - after each visit with the
+    first visit. A warm-up round runs first so one-off allocations don't
+    count.
+    Returns True if all of them matched.
+    """
+    import os
+    import tracemalloc
+    from array import array
+    import headless
+    main = headless.load_game()
+    here = os.path.dirname(os.path.abspath(__file__))
+    game_code = [tracemalloc.Filter(True, os.path.join(here, '*.py'))]
+
+    def game_memory():
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(game_code)
+        return sum(stat.size for stat in snapshot.statistics('filename'))
+
+    tracemalloc.start()
+    game = main.Game()
+    manager = LevelManager(game, verbose=False)
+    # Sized up front: a list growing here would count as a leak itself
+    used = array('l', [0]) * (rounds * manager.count)
+    for round in range(rounds + 1):
+        for level in range(1, manager.count + 1):
+            manager.load(level)
+            for _ in range(frames):
+                game.update()   # Per-level buffers fill on the first frames
+            if round:
+                used[(round - 1) * manager.count + level - 1] = game_memory()
+
+    ok = True
+    for i, size in enumerate(used):
+        level = i % manager.count + 1
+        baseline = used[level - 1]
+        ok = ok and size == baseline
+        print("Level %d: %d bytes allocated, baseline %d %s" % (
+            level, size, baseline, "ok" if size == baseline else "LEAK"))
+
+    # Preloading must build the same level as a direct load
+    manager.preload = True
+    manager.load(1)
+    while not manager.preloaded:
+        manager.update()
+    manager.advance()
+    preloaded = [p.get_rect() for p in game.platforms]
+    manager.preload = False
+    manager.load(2)
+    ok = ok and preloaded == [p.get_rect() for p in game.platforms]
+    tracemalloc.stop()
+    return ok
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check_transitions() else 1)
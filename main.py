@@ -6,12 +6,34 @@ Controls:
 - Left/Right: Move player
 - A Button: Jump
 - X Button: Restart level
+- Y Button: Rewind (with REWIND = True)
 """
 
 import picosystem
+
+# Put a first frame on screen before importing or building anything else
+boot_start_us = picosystem.time_us()
+picosystem.pen(0, 0, 0)
+picosystem.clear()
+picosystem.pen(15, 15, 15)
+picosystem.text("Loading...", 35, 56)
+picosystem.flip()
+splash_us = picosystem.time_us()
+
 import math
-import random
-import time
+
+from controls import Controls, LEFT_BIT, RIGHT_BIT, A_BIT, B_BIT, X_BIT, Y_BIT
+from kernels import rect_collision, move, collide_platforms
+import render
+from render import (RenderState, pack, HEADER, PLATFORM, ITEM, SCORE, FLAGS,
+                    PLAYER_X, PLAYER_Y, EYE_LEFT, EYE_RIGHT, EYE_Y, PLATFORMS,
+                    ITEMS, ITEMS_AT, PLAYER_WIDTH, PLAYER_HEIGHT, ITEM_WIDTH,
+                    ITEM_HEIGHT, BACKGROUND, PLAYER_COLOR, ITEM_COLOR,
+                    DETAIL_COLOR, TEXT_COLOR, MESSAGE_COLOR, COMPLETE, LEVELS,
+                    DETAIL)
+from startup import BootTimeline
+from levels import LevelManager
+from scheduler import Scheduler
 
 # Game constants
 SCREEN_WIDTH = 120
@@ -19,6 +41,34 @@ SCREEN_HEIGHT = 120
 GRAVITY = 0.5
 JUMP_STRENGTH = -8
 PLAYER_SPEED = 2
+COLUMN_WIDTH = 16          # Width of the collectible buckets
+JUMP_BUFFER = 0            # Ticks a jump press early still counts (controls.py)
+COYOTE_TICKS = 0           # Ticks the player can still jump after a ledge
+LEVEL = 1                  # Level from config.py to start on
+PRELOAD_NEXT_LEVEL = True  # Build the next level a little each frame
+SHOW_BOOT_TIMELINE = False  # Draw the boot timeline for the first 3 seconds
+PROFILE_ALLOCATIONS = False  # Track heap allocations per subsystem
+MANUAL_GC = False          # Only collect garbage in idle time (needs the above)
+TRACE = False              # Record a Chrome trace of the game loop (tracer.py)
+ADAPTIVE_QUALITY = True    # Drop decorative detail when frames run slow
+REWIND = False             # Hold Y to step back through recent snapshots
+DUAL_CORE = False          # Update on the second core while drawing (dualcore.py)
+SKIP_IDLE_FRAMES = True    # Don't redraw frames identical to the last (idle.py)
+IDLE_SLEEP_MS = 0          # Once idle, sleep this long per tick to save battery
+TELEMETRY = False          # Stream per-frame stats over USB serial (telemetry.py)
+
+# Subsystems reported to a probe (names in profiler.NAMES)
+PROBE_PLAYER = 0
+PROBE_COLLECTIBLES = 1
+PROBE_DRAW = 2
+PROBE_UI = 3
+PROBE_UPDATE = 4
+PROBE_COLLISIONS = 5
+
+# Sound effects (see audio.SOUNDS)
+SOUND_JUMP = 0
+SOUND_COLLECT = 1
+SOUND_LEVEL = 3
 
 # Colors
 BLACK = (0, 0, 0)        # 0
@@ -30,46 +80,58 @@ YELLOW = (15, 15, 0)     # 5
 GRAY = (8, 8, 8)         # 7 (approximate mid-gray)
 BROWN = (8, 4, 0)        # 9 (approximate brown)
 
+
 class Player:
     """Player character with physics and controls"""
     
-    def __init__(self, x, y):
+    def __init__(self, x, y, controls=None):
         self.x = x
         self.y = y
         self.width = 8
         self.height = 8
+        self.controls = controls or Controls()  # Updated by Game each tick
         self.vel_x = 0
         self.vel_y = 0
         self.on_ground = False
+        self.jumped = False  # Jumped this tick
+        self.probe = None    # Set by Game when profiling
         self.start_x = x
         self.start_y = y
     
     def update(self, platforms):
         """Update player physics and handle input"""
+        self.jumped = False
+        
         # Handle input
-        if picosystem.button(picosystem.LEFT):
+        controls = self.controls
+        if controls.held & LEFT_BIT:
             self.vel_x = -PLAYER_SPEED
-        elif picosystem.button(picosystem.RIGHT):
+        elif controls.held & RIGHT_BIT:
             self.vel_x = PLAYER_SPEED
         else:
             self.vel_x = 0
         
         # Jump
-        if picosystem.pressed(picosystem.A) and self.on_ground:
+        if controls.can_jump(self.on_ground):
             self.vel_y = JUMP_STRENGTH
             self.on_ground = False
+            self.jumped = True
+            controls.jumped()
         
-        # Apply gravity
-        self.vel_y += GRAVITY
-        
-        # Update position
-        self.x += self.vel_x
-        self.y += self.vel_y
+        # Apply gravity and update position
+        self.x, self.y, self.vel_y = move(self.x, self.y, self.vel_x,
+                                          self.vel_y, GRAVITY)
 
         #print("Player position:", self.x, self.y, "Velocity:", self.vel_x, self.vel_y, end='\r')
         
         # Handle collisions
+        probe = self.probe
+        if probe:
+            probe.begin(PROBE_COLLISIONS)
         self.handle_collisions(platforms)
+        if probe:
+            probe.end(PROBE_COLLISIONS)
+        controls.ground(self.on_ground)
         
         # Keep player on screen horizontally
         if self.x < 0:
@@ -78,29 +140,19 @@ class Player:
             self.x = SCREEN_WIDTH - self.width
     
     def handle_collisions(self, platforms):
-        """Handle collision detection with platforms"""
-        player_rect = (self.x, self.y, self.width, self.height)
-        self.on_ground = False
+        """Handle collision detection with platforms
         
-        for platform in platforms:
-            if self.rect_collision(player_rect, platform.get_rect()):
-                # Determine collision direction
-                if self.vel_y > 0:  # Falling down
-                    if self.y < platform.y:  # Landing on top
-                        self.y = platform.y - self.height
-                        self.vel_y = 0
-                        self.on_ground = True
-                elif self.vel_y < 0:  # Moving up
-                    if self.y > platform.y:  # Hitting from below
-                        self.y = platform.y + platform.height
-                        self.vel_y = 0
+        Lands on platforms when falling and bumps into them when rising
+        (see kernels.collide_platforms).
+        """
+        self.y, self.vel_y, self.on_ground = collide_platforms(
+            platforms, self.x, self.y, self.width, self.height, self.vel_y)
     
     def rect_collision(self, rect1, rect2):
         """Check if two rectangles collide"""
         x1, y1, w1, h1 = rect1
         x2, y2, w2, h2 = rect2
-        return (x1 < x2 + w2 and x1 + w1 > x2 and 
-                y1 < y2 + h2 and y1 + h1 > y2)
+        return rect_collision(x1, y1, w1, h1, x2, y2, w2, h2)
     
     def reset(self):
         """Reset player to starting position"""
@@ -109,16 +161,8 @@ class Player:
         self.vel_x = 0
         self.vel_y = 0
         self.on_ground = False
-    
-    def draw(self):
-        """Draw the player"""
-        picosystem.pen(*BLUE)
-        picosystem.frect(int(self.x), int(self.y), self.width, self.height)
-        
-        # Draw eyes
-        picosystem.pen(*WHITE)
-        picosystem.pixel(int(self.x + 2), int(self.y + 2))
-        picosystem.pixel(int(self.x + 5), int(self.y + 2))
+        self.controls.coyote_left = 0
+
 
 
 class Platform:
@@ -134,11 +178,6 @@ class Platform:
     def get_rect(self):
         """Get rectangle representation for collision detection"""
         return (self.x, self.y, self.width, self.height)
-    
-    def draw(self):
-        """Draw the platform"""
-        picosystem.pen(*self.color)
-        picosystem.frect(self.x, self.y, self.width, self.height)
 
 
 class Collectible:
@@ -152,157 +191,421 @@ class Collectible:
         self.collected = False
         self.bob_offset = 0
         self.tick_counter = 0  # Add tick counter for animation
+        self.bob_tick = 0      # tick_counter the bob offset was worked out for
+        self.column = 0        # Bucket in Game.columns, and place in it
+        self.slot = 0
     
-    def update(self):
-        """Update collectible animation using ticks"""
+    def update(self, animate=True):
+        """Update collectible animation using ticks
+        
+        With animate False the drawn position isn't moved this tick.
+        """
         self.tick_counter += 1
+        if animate:
+            self.bob()
+    
+    def bob(self):
+        """Work out the bob offset for the current tick"""
+        self.bob_tick = self.tick_counter
         # Use sine wave with tick counter for smooth bobbing
         # Divide by larger number for slower animation, smaller for faster
         self.bob_offset = math.sin(self.tick_counter * 0.1) * 2
     
     def get_rect(self):
         """Get rectangle for collision detection"""
+        # Collisions always use the exact position, even if drawing lags
+        if self.bob_tick != self.tick_counter:
+            self.bob()
         return (self.x, self.y + self.bob_offset, self.width, self.height)
-    
-    def draw(self):
-        """Draw the collectible"""
-        if not self.collected:
-            picosystem.pen(*YELLOW)
-            y_pos = int(self.y + self.bob_offset)
-            picosystem.frect(self.x, y_pos, self.width, self.height)
-            
-            # Draw shine effect
-            picosystem.pen(*WHITE)
-            picosystem.pixel(self.x + 1, y_pos + 1)
 
 
 class Game:
     """Main game class"""
     
-    def __init__(self):
-        self.player = Player(20, 80)
+    def __init__(self, level=LEVEL):
+        self.level = level
+        self.controls = Controls(jump_buffer=JUMP_BUFFER, coyote=COYOTE_TICKS)
+        self.player = Player(20, 80, self.controls)
         self.platforms = []
         self.collectibles = []
+        # Collectibles not picked up yet, bucketed by x so the player only
+        # tests nearby ones; picked up ones are swap-removed
+        self.columns = [[] for _ in range(SCREEN_WIDTH // COLUMN_WIDTH + 1)]
+        self.remaining = 0
         self.score = 0
+        self.nav = None
+        self.levels = None  # LevelManager, if there is one
+        self.probe = None   # AllocTracker or Tracer, if profiling
+        self.audio = None   # Audio, if sound is on
+        self.quality = None  # Governor, if quality adapts to frame time
+        self.snapshots = None   # Snapshotter, reused for every level
+        self.start_state = None  # Snapshot taken when the level started
+        self.rewind = None  # Rewind, if on
+        self.render = RenderState()  # What the next draw() shows
         self.setup_level()
+        self.start_level()
+        self.extract()
     
     def setup_level(self):
-        """Create the level layout"""
-        # Ground platforms
-        self.platforms.append(Platform(0, 110, 40, 10))
-        self.platforms.append(Platform(60, 110, 60, 10))
+        """Create the layout of the current level from config.py"""
+        # Navigation paths are only valid for the layout they were built on
+        self.nav = None
         
-        # Mid-level platforms
-        self.platforms.append(Platform(30, 90, 20, 8))
-        self.platforms.append(Platform(70, 80, 25, 8))
-        self.platforms.append(Platform(15, 70, 20, 8))
-        self.platforms.append(Platform(80, 60, 30, 8))
-        
-        # Upper platforms
-        self.platforms.append(Platform(10, 50, 25, 8))
-        self.platforms.append(Platform(50, 40, 30, 8))
-        self.platforms.append(Platform(90, 30, 25, 8))
-        
-        # Top platform
-        self.platforms.append(Platform(40, 20, 40, 8))
+        for _ in self.build_level(self.level, self.platforms, self.collectibles):
+            pass
+    
+    def build_level(self, level, platforms, collectibles):
+        """Build a level's objects into the given lists, one per step
         
-        # Add collectibles
-        self.collectibles.append(Collectible(35, 82))
-        self.collectibles.append(Collectible(78, 72))
-        self.collectibles.append(Collectible(20, 62))
-        self.collectibles.append(Collectible(88, 52))
-        self.collectibles.append(Collectible(20, 42))
-        self.collectibles.append(Collectible(65, 32))
-        self.collectibles.append(Collectible(98, 22))
-        self.collectibles.append(Collectible(55, 12))
+        This is a generator so a level can be built over several frames.
+        """
+        import config
+        layout, items = config.LEVELS[level - 1]
+        for rect in layout:
+            platforms.append(Platform(*rect))
+            yield
+        for x, y in items:
+            collectibles.append(Collectible(x, y))
+            yield
+    
+    def release_level(self):
+        """Drop everything that belongs to the current level"""
+        self.platforms = []
+        self.collectibles = []
+        self.nav = None
+        self.start_state = None
+        self.rewind = None
+        self.reset_active()
+    
+    def start_level(self):
+        """Put the player at the start and snapshot the fresh level"""
+        self.player.reset()
+        self.score = 0
+        if self.snapshots is None:
+            from snapshot import Snapshotter
+            self.snapshots = Snapshotter(self)
+        else:
+            self.snapshots.setup()
+        self.start_state = self.snapshots.capture()
+        self.reset_active()
+        if REWIND:
+            from snapshot import Rewind
+            self.rewind = Rewind(self.snapshots)
+    
+    def reset_active(self):
+        """Rebuild the active collectible buckets from the collected flags"""
+        last = len(self.columns) - 1
+        for column in self.columns:
+            del column[:]
+        self.remaining = 0
+        for collectible in self.collectibles:
+            if not collectible.collected:
+                column = min(max(collectible.x // COLUMN_WIDTH, 0), last)
+                collectible.column = column
+                collectible.slot = len(self.columns[column])
+                self.columns[column].append(collectible)
+                self.remaining += 1
+    
+    def collect(self, collectible):
+        """Pick up a collectible: swap-remove it from its bucket"""
+        collectible.collected = True
+        column = self.columns[collectible.column]
+        moved = column.pop()
+        if moved is not collectible:
+            column[collectible.slot] = moved
+            moved.slot = collectible.slot
+        self.remaining -= 1
+    
+    def level_complete(self):
+        """Check if every collectible has been picked up"""
+        return self.remaining == 0
+    
+    def navigation(self):
+        """Get the enemy navigation graph for this level, built on first use"""
+        if self.nav is None:
+            from navigation import NavGraph
+            self.nav = NavGraph(self.platforms, GRAVITY, JUMP_STRENGTH,
+                                PLAYER_SPEED)
+        return self.nav
     
     def update(self):
-        """Update game state"""
+        """Update game state, then extract what to draw from it"""
+        self.simulate()
+        self.extract()
+    
+    def simulate(self):
+        """Advance the game by one tick"""
+        controls = self.controls
+        controls.update()
+        
         # Handle restart
-        if picosystem.pressed(picosystem.X):
+        if controls.pressed & X_BIT:
             self.restart_level()
             return
         
+        # Step back in time while Y is held
+        if self.rewind and controls.held & Y_BIT:
+            if self.rewind.rewind():
+                self.reset_active()
+            return
+        
+        # Move on once the level is complete
+        if (self.levels and self.level_complete() and
+                controls.pressed & A_BIT):
+            self.levels.advance()
+            return
+        
+        probe = self.probe
+        
         # Update player
+        if probe:
+            probe.begin(PROBE_PLAYER)
         self.player.update(self.platforms)
+        if self.audio and self.player.jumped:
+            self.audio.play(SOUND_JUMP)
+        if probe:
+            probe.end(PROBE_PLAYER)
+            probe.begin(PROBE_COLLECTIBLES)
         
-        # Update collectibles
-        for collectible in self.collectibles:
-            collectible.update()
-            
-            # Check collision with player
-            if not collectible.collected:
-                player_rect = (self.player.x, self.player.y, 
-                             self.player.width, self.player.height)
-                if self.player.rect_collision(player_rect, collectible.get_rect()):
-                    collectible.collected = True
-                    self.score += 10
+        # Update collectibles - only the ones not picked up yet
+        animate = self.quality.animate if self.quality else True
+        columns = self.columns
+        for column in columns:
+            for collectible in column:
+                collectible.update(animate)
+        
+        # Check collisions with the player, only in the buckets it could
+        # touch (collectibles are 6 wide). Walk each bucket backwards, so
+        # a swap-removed item is replaced by one already checked.
+        player = self.player
+        last = len(columns) - 1
+        first = min(max(int(player.x - 6) // COLUMN_WIDTH, 0), last)
+        final = min(max(int(player.x + player.width) // COLUMN_WIDTH, 0), last)
+        for index in range(first, final + 1):
+            column = columns[index]
+            for slot in range(len(column) - 1, -1, -1):
+                collectible = column[slot]
+                # Only work out the exact position of collectibles the
+                # player lines up with
+                if (player.x < collectible.x + collectible.width and
+                        player.x + player.width > collectible.x):
+                    x, y, width, height = collectible.get_rect()
+                    if rect_collision(player.x, player.y, player.width,
+                                      player.height, x, y, width, height):
+                        self.collect(collectible)
+                        self.score += 10
+                        if self.audio:
+                            self.audio.play(SOUND_LEVEL if self.level_complete()
+                                            else SOUND_COLLECT)
+        if probe:
+            probe.end(PROBE_COLLECTIBLES)
         
         # Check if player fell off screen
         if self.player.y > SCREEN_HEIGHT + 20:
             self.restart_level()
     
     def restart_level(self):
-        """Restart the current level"""
-        self.player.reset()
-        self.score = 0
-        for collectible in self.collectibles:
-            collectible.collected = False
+        """Restart the current level from its start snapshot"""
+        self.snapshots.restore(self.start_state)
+        self.controls.coyote_left = 0   # As Player.reset - no ledge to leave
+        self.reset_active()
     
-    def draw(self):
-        """Draw the game"""
-        # Clear screen
-        picosystem.pen(*BLACK)
-        picosystem.clear()
-        
-        # Draw platforms
-        for platform in self.platforms:
-            platform.draw()
+    def extract(self):
+        """Write everything draw() needs into self.render (see render.py)"""
+        state = self.render
+        data = state.data
+        platforms = self.platforms
+        if state.source is not platforms:
+            # New level: lay out the platforms, sizes and colors once
+            state.reserve(len(platforms), len(self.collectibles))
+            data = state.data
+            state.source = platforms
+            i = HEADER
+            for platform in platforms:
+                data[i] = platform.x
+                data[i + 1] = platform.y
+                data[i + 2] = platform.width
+                data[i + 3] = platform.height
+                data[i + 4] = pack(platform.color)
+                i += PLATFORM
+            data[PLATFORMS] = len(platforms)
+            player = self.player
+            data[PLAYER_WIDTH] = player.width
+            data[PLAYER_HEIGHT] = player.height
+            data[ITEM_WIDTH] = 6
+            data[ITEM_HEIGHT] = 6
+            data[BACKGROUND] = pack(BLACK)
+            data[PLAYER_COLOR] = pack(BLUE)
+            data[ITEM_COLOR] = pack(YELLOW)
+            data[DETAIL_COLOR] = pack(WHITE)
+            data[TEXT_COLOR] = pack(WHITE)
+            data[MESSAGE_COLOR] = pack(GREEN)
         
-        # Draw collectibles
-        for collectible in self.collectibles:
-            collectible.draw()
+        x = self.player.x
+        y = self.player.y
+        data[PLAYER_X] = int(x)
+        data[PLAYER_Y] = int(y)
+        data[EYE_LEFT] = int(x + 2)
+        data[EYE_RIGHT] = int(x + 5)
+        data[EYE_Y] = int(y + 2)
         
-        # Draw player
-        self.player.draw()
+        i = data[ITEMS_AT]
+        for column in self.columns:
+            for collectible in column:
+                data[i] = collectible.x
+                data[i + 1] = int(collectible.y + collectible.bob_offset)
+                i += ITEM
+        data[ITEMS] = self.remaining
         
-        # Draw UI
-        self.draw_ui()
+        data[SCORE] = self.score
+        flags = 0
+        if self.level_complete():
+            flags = COMPLETE
+            if self.levels:
+                flags |= LEVELS
+        quality = self.quality
+        if quality is None or quality.detail:
+            flags |= DETAIL
+        data[FLAGS] = flags
     
-    def draw_ui(self):
-        """Draw user interface elements"""
-        # Draw score
-        picosystem.pen(*WHITE)
-        picosystem.text(f"Score: {self.score}", 2, 2)
-        
-        # Draw controls hint
-        # picosystem.text("X: Restart", 2, SCREEN_HEIGHT - 10)
-        
-        # Check for level completion
-        all_collected = all(c.collected for c in self.collectibles)
-        if all_collected:
-            picosystem.pen(*GREEN)
-            picosystem.text("Level Complete!", 25, 60)
-            picosystem.text("Press X to restart", 15, 70)
+    def draw(self, state=None):
+        """Draw the game from its render state (or another one)"""
+        data = (state or self.render).data
+        probe = self.probe
+        if probe:
+            probe.begin(PROBE_DRAW)
+        render.draw(data)
+        if probe:
+            probe.end(PROBE_DRAW)
+            probe.begin(PROBE_UI)
+        render.draw_ui(data)
+        if probe:
+            probe.end(PROBE_UI)
+
+
+def start_subsystems():
+    """Import and start the optional subsystems that are switched on
 
+    Called once the first frame is on screen, so none of them hold up
+    the first frame or the level. Each module is only imported behind
+    its flag.
+    """
+    global pipeline, idle, telemetry
+    import config
+    if config.SOUND_ENABLED:
+        from audio import Audio
+        game.audio = Audio()
+    if ADAPTIVE_QUALITY:
+        from quality import Governor
+        game.quality = Governor()
+    if PROFILE_ALLOCATIONS:
+        from profiler import AllocTracker
+        game.probe = AllocTracker(manual_gc=MANUAL_GC)
+    elif TRACE:
+        from tracer import Tracer
+        game.probe = Tracer()
+    game.player.probe = game.probe
+    if DUAL_CORE:
+        # Spans from both cores would mix in one probe, so profile on one core
+        game.probe = game.player.probe = None
+        from dualcore import Pipeline
+        pipeline = Pipeline(game)
+    if SKIP_IDLE_FRAMES:
+        from idle import IdleDetector
+        idle = IdleDetector(IDLE_SLEEP_MS)
+    if TELEMETRY:
+        from telemetry import Telemetry
+        telemetry = Telemetry()
 
-# Global game instance
+
+boot = BootTimeline(boot_start_us)
+boot.mark("splash", splash_us)
+boot.mark("import")
+
+# Global game instance - only the current level gets built
 game = Game()
+scheduler = Scheduler()  # Background work, run in each frame's idle time
+levels = LevelManager(game, preload=PRELOAD_NEXT_LEVEL, scheduler=scheduler)
+pipeline = None     # The optional subsystems, once start_subsystems() ran
+idle = None
+telemetry = None
+boot.mark("level build")
+first_frame = True
 
 def update(tick):
     """Main update function called by picosystem"""
+    if pipeline:
+        # Wait for the other core's update: everything below touches the
+        # game, so it has to happen before the next one starts
+        pipeline.wait()
+    if game.quality:
+        # A tick slowed down on purpose says nothing about the frame budget
+        game.quality.update(tick, measure=not (idle and idle.throttled))
+    if idle:
+        idle.throttle()
+    if telemetry:
+        telemetry.send(game, tick)  # stats() covers the frame just shown
+    if pipeline:
+        if game.rewind and not game.controls.held & Y_BIT:
+            game.rewind.push(tick)
+        levels.update()
+        if game.audio:
+            game.audio.update()
+        scheduler.run()
+        pipeline.step()
+        if tick > 1000:
+            pipeline.stop()
+            if idle:
+                idle.report()
+            quit()
+        return
+    probe = game.probe
+    if probe:
+        probe.begin(PROBE_UPDATE)
     game.update()
+    if probe:
+        probe.end(PROBE_UPDATE)
+    if TRACE and not PROFILE_ALLOCATIONS and game.controls.pressed & B_BIT:
+        probe.export()
+    if game.rewind and not game.controls.held & Y_BIT:
+        game.rewind.push(tick)
+    levels.update()
+    if game.audio:
+        game.audio.update()
+    scheduler.run()
     # Uncomment if you want to see a countdown
     #if tick % 10 == 0:
     #    print("Count down to auto quit: ", 1000 - tick, end='\r')
 
     # Auto quit after 1000 ticks
     if tick > 1000:
+        if game.probe:
+            game.probe.report()
+        if idle:
+            idle.report()
         quit()
 
 def draw(tick):
     """Main draw function called by picosystem"""
-    game.draw()
+    global first_frame
+    state = pipeline.state() if pipeline else game.render
+    drawn = idle is None or idle.changed(state.data)
+    if drawn:
+        game.draw(state)
+    if game.probe:
+        game.probe.end_tick(tick)
+    if SHOW_BOOT_TIMELINE and tick < 180:
+        if drawn:
+            picosystem.pen(*WHITE)
+            boot.draw(2, 80)
+        if idle and tick == 179:
+            idle.invalidate()   # Draw the next frame without the timeline
+    if first_frame:
+        first_frame = False
+        boot.mark("first draw")
+        start_subsystems()
+        boot.mark("subsystems")
+        boot.report()
 
 
 
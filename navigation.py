@@ -0,0 +1,276 @@
+"""
+Platform Navigation Graph
+Lets enemies find their way across platforms towards the player
+
+The graph is built once per level from the platform list. Each platform is
+a node, joined by:
+- walk edges to platforms touching it at the same height
+- jump edges to platforms inside the jump arc
+- fall edges to lower platforms reachable by walking off an edge
+
+Paths are found with A* and cached per (source, target) platform pair, so
+any number of enemies can share them. Build a new graph when the level
+changes - that is the only thing that invalidates the cache.
+
+    python navigation.py    # check paths on every level, and the cache
+"""
+
+import heapq
+
+# Edge kinds
+WALK = 0
+JUMP = 1
+FALL = 2
+
+
+class NavGraph:
+    """Walk/jump/fall graph between the platforms of one level"""
+
+    def __init__(self, platforms, gravity, jump_strength, speed,
+                 width=8, height=8):
+        self.platforms = platforms
+        self.speed = speed
+        self.width = width
+        self.height = height
+        self.paths = {}
+
+        # Jump arc: height above take-off after each tick, down to the screen
+        self.jump_arc = []
+        vel = jump_strength
+        y = 0
+        while y < 240:
+            vel += gravity
+            y += vel
+            self.jump_arc.append(-y)
+        self.apex_height = max(self.jump_arc)
+        self.apex_ticks = self.jump_arc.index(self.apex_height) + 1
+        # Fall arc: drop below the edge after each tick, down to the screen
+        self.fall_arc = []
+        vel = 0
+        y = 0
+        while y < 240:
+            vel += gravity
+            y += vel
+            self.fall_arc.append(y)
+
+        self.edges = [self._link(i) for i in range(len(platforms))]
+
+    def _jump_ticks(self, rise):
+        """Ticks until a jump comes down onto something `rise` pixels higher"""
+        if rise > self.apex_height:
+            return -1
+        peaked = False
+        for tick, height in enumerate(self.jump_arc):
+            if tick and height < self.jump_arc[tick - 1]:
+                peaked = True
+            if peaked and height <= rise:
+                return tick + 1
+        return -1
+
+    def _fall_ticks(self, drop):
+        """Ticks to fall `drop` pixels"""
+        for tick, depth in enumerate(self.fall_arc):
+            if depth >= drop:
+                return tick + 1
+        return len(self.fall_arc)
+
+    def _link(self, i):
+        """Find the edges leaving platform i"""
+        a = self.platforms[i]
+        edges = []
+        for j, b in enumerate(self.platforms):
+            if i == j:
+                continue
+            # Gap between the platform edges, 0 if they overlap
+            gap = max(b.x - (a.x + a.width), a.x - (b.x + b.width), 0)
+            rise = a.y - b.y
+            if rise == 0 and gap == 0:
+                kind, ticks = WALK, 0
+            else:
+                kind, ticks = JUMP, self._jump_ticks(rise)
+                if rise < 0:
+                    # Walking off the edge may be quicker than jumping down
+                    fall = self._fall_ticks(-rise)
+                    if fall * self.speed + self.width >= gap and (
+                            ticks < 0 or fall < ticks):
+                        kind, ticks = FALL, fall
+                if ticks < 0 or ticks * self.speed + self.width < gap:
+                    continue
+            # Never cheaper than crossing the distance between the centres,
+            # which keeps the A* heuristic admissible
+            cross = abs(self._centre(b) - self._centre(a)) / self.speed
+            edges.append((j, kind, max(ticks, cross)))
+        return edges
+
+    def _centre(self, platform):
+        """Horizontal centre of a platform"""
+        return platform.x + platform.width / 2
+
+    def platform_at(self, x, y, width, height):
+        """Index of the platform an entity is standing on, or -1"""
+        feet = y + height
+        for i, platform in enumerate(self.platforms):
+            if (feet == platform.y and x < platform.x + platform.width and
+                    x + width > platform.x):
+                return i
+        return -1
+
+    def path(self, source, target):
+        """Get the cheapest platform path from source to target
+
+        Returns a tuple of (platform index, edge kind) hops after the source,
+        or None if the target can't be reached. Results are shared, so don't
+        modify them.
+        """
+        key = (source, target)
+        if key not in self.paths:
+            self.paths[key] = self._search(source, target)
+        return self.paths[key]
+
+    def _search(self, source, target):
+        """A* from source to target"""
+        goal = self._centre(self.platforms[target])
+        came_from = {source: None}
+        cost = {source: 0}
+        frontier = [(0, source)]
+        while frontier:
+            _, current = heapq.heappop(frontier)
+            if current == target:
+                break
+            for nxt, kind, step in self.edges[current]:
+                new_cost = cost[current] + step
+                if nxt not in cost or new_cost < cost[nxt]:
+                    cost[nxt] = new_cost
+                    came_from[nxt] = (current, kind)
+                    guess = abs(goal - self._centre(self.platforms[nxt]))
+                    heapq.heappush(frontier,
+                                   (new_cost + guess / self.speed, nxt))
+        if target not in came_from:
+            return None
+
+        hops = []
+        node = target
+        while came_from[node] is not None:
+            previous, kind = came_from[node]
+            hops.append((node, kind))
+            node = previous
+        hops.reverse()
+        return tuple(hops)
+
+
+def _cheapest(nav, source, target):
+    """Cost of the cheapest path by plain Dijkstra, for the checks"""
+    best = {source: 0}
+    frontier = [(0, source)]
+    while frontier:
+        cost, current = heapq.heappop(frontier)
+        if current == target:
+            return cost
+        if cost > best[current]:
+            continue
+        for nxt, _, step in nav.edges[current]:
+            if nxt not in best or cost + step < best[nxt]:
+                best[nxt] = cost + step
+                heapq.heappush(frontier, (cost + step, nxt))
+    return None
+
+
+def _cost(nav, source, hops):
+    """Cost of a path's hops, or None if a hop isn't an edge"""
+    total = 0
+    node = source
+    for nxt, kind in hops:
+        for to, edge_kind, step in nav.edges[node]:
+            if to == nxt and edge_kind == kind:
+                total += step
+                break
+        else:
+            return None
+        node = nxt
+    return total
+
+
+def check(chasers=8, ticks=600):
+    """Check paths and the shared path cache on every level in config.py
+
+    Every path A* finds must follow real edges and cost what Dijkstra
+    says is cheapest, and it must find one whenever Dijkstra does. Then
+    several ChaserEnemy from advanced_example.py chase a player standing
+    on the top platform: each (source, target) pair must be searched only
+    once however many chasers ask, and they must get there.
+    Returns True if everything held.
+    """
+    import config
+    import headless
+    main = headless.load_game()
+    from advanced_example import ChaserEnemy
+    wrong = 0
+    for level in range(1, len(config.LEVELS) + 1):
+        game = main.Game(level=level)
+        nav = game.navigation()
+        if game.navigation() is not nav:
+            wrong += 1
+            print("Level %d: navigation graph built twice" % level)
+        count = len(game.platforms)
+        found = 0
+        for source in range(count):
+            for target in range(count):
+                if source == target:
+                    continue
+                hops = nav.path(source, target)
+                best = _cheapest(nav, source, target)
+                if hops is None:
+                    if best is not None:
+                        wrong += 1
+                        print("Level %d: no path %d -> %d" % (
+                            level, source, target))
+                    continue
+                found += 1
+                cost = _cost(nav, source, hops)
+                if cost is None or abs(cost - best) > 1e-9:
+                    wrong += 1
+                    print("Level %d: bad path %d -> %d: %r" % (
+                        level, source, target, hops))
+
+        # Chasers share a fresh graph; count the searches they cause
+        nav = NavGraph(game.platforms, main.GRAVITY, main.JUMP_STRENGTH,
+                       main.PLAYER_SPEED)
+        searches = [0]
+        search = nav._search
+
+        def counted(source, target):
+            searches[0] += 1
+            return search(source, target)
+        nav._search = counted
+
+        top = min(range(count), key=lambda i: game.platforms[i].y)
+        goal = game.platforms[top]
+        player = main.Player(goal.x, goal.y - 8)
+        floor = max(range(count), key=lambda i: game.platforms[i].y)
+        start = game.platforms[floor]
+        enemies = [ChaserEnemy(start.x + i % max(start.width - 8, 1),
+                               start.y - 8, 1, nav)
+                   for i in range(chasers)]
+        arrived = set()
+        for _ in range(ticks):
+            for i, enemy in enumerate(enemies):
+                enemy.update(player, game.platforms)
+                if nav.platform_at(enemy.x, enemy.y, enemy.width,
+                                   enemy.height) == top:
+                    arrived.add(i)
+        if searches[0] != len(nav.paths):
+            wrong += 1
+            print("Level %d: %d searches for %d cached paths" % (
+                level, searches[0], len(nav.paths)))
+        if len(arrived) < chasers:
+            wrong += 1
+        print("Level %d: %d paths found, %d/%d chasers reached the top "
+              "platform with %d searches" % (level, found, len(arrived),
+                                             chasers, searches[0]))
+    print("%d problems" % wrong)
+    return wrong == 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check() else 1)
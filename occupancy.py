@@ -0,0 +1,176 @@
+"""
+Occupancy Bitmap
+One bit per pixel saying whether a static platform covers it
+
+Testing a point against every platform costs a rect test per platform, too
+much for particles. The bitmap is filled in once per level from the static
+platforms, after which:
+    occupancy.solid(x, y)           # one pixel
+    occupancy.span(x0, x1, y)       # any of pixels x0..x1-1 on row y
+    occupancy.box(x, y, w, h)       # does a rectangle touch anything
+    occupancy.ground(x, y, w, h)    # anything under (or in) its bottom row
+cost a few byte reads no matter how many platforms there are.
+
+Rows are packed 8 pixels to a byte, leftmost pixel in the top bit, in a
+bytearray of (width + 7) // 8 * height bytes - 1800 for the 120x120
+screen. Positions may be floats: box() and ground() cover every pixel a
+rectangle overlaps, so for platforms at whole-pixel positions they give
+the same answer as rect tests. Anything outside the bitmap is empty.
+
+    python occupancy.py     # check against rect tests on every level
+"""
+
+from kernels import any_bits
+
+
+def masks(x0, x1):
+    """Masks for the first and last byte of pixels x0..x1-1 on a row"""
+    first = 0xFF >> (x0 & 7)
+    last = (0xFF << (7 - ((x1 - 1) & 7))) & 0xFF
+    return first, last
+
+
+class Occupancy:
+    """Bit-packed map of the pixels static platforms cover"""
+
+    def __init__(self, platforms=(), width=120, height=120):
+        self.width = width
+        self.height = height
+        self.stride = (width + 7) // 8
+        self.bits = bytearray(self.stride * height)
+        for platform in platforms:
+            self.fill(platform.x, platform.y, platform.width, platform.height)
+
+    def fill(self, x, y, width, height):
+        """Mark a rectangle of whole pixels as solid"""
+        x0 = max(int(x), 0)
+        x1 = min(int(x + width), self.width)
+        y0 = max(int(y), 0)
+        y1 = min(int(y + height), self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        bits = self.bits
+        head, tail = masks(x0, x1)
+        for row in range(y0 * self.stride, y1 * self.stride, self.stride):
+            first = row + (x0 >> 3)
+            last = row + ((x1 - 1) >> 3)
+            if first == last:
+                bits[first] |= head & tail
+                continue
+            bits[first] |= head
+            for i in range(first + 1, last):
+                bits[i] = 0xFF
+            bits[last] |= tail
+
+    def solid(self, x, y):
+        """Check one pixel"""
+        if x < 0 or y < 0:
+            return False
+        x = int(x)
+        y = int(y)
+        if x >= self.width or y >= self.height:
+            return False
+        return bool(self.bits[y * self.stride + (x >> 3)] & (0x80 >> (x & 7)))
+
+    def span(self, x0, x1, y):
+        """Check pixels x0 to x1 - 1 (whole numbers) on row y"""
+        if y < 0 or y >= self.height:
+            return False
+        if x0 < 0:
+            x0 = 0
+        if x1 > self.width:
+            x1 = self.width
+        if x0 >= x1:
+            return False
+        bits = self.bits
+        row = y * self.stride
+        first = row + (x0 >> 3)
+        last = row + ((x1 - 1) >> 3)
+        head, tail = masks(x0, x1)
+        if first == last:
+            return bool(bits[first] & head & tail)
+        if bits[first] & head or bits[last] & tail:
+            return True
+        return any_bits(bits, first + 1, last)
+
+    def box(self, x, y, width, height):
+        """Check whether a rectangle overlaps any solid pixel"""
+        x0 = int(x) if x >= 0 else -1
+        x1 = -int(-(x + width) // 1)    # Round up
+        y0 = int(y) if y >= 0 else 0
+        y1 = min(-int(-(y + height) // 1), self.height)
+        for row in range(y0, y1):
+            if self.span(x0, x1, row):
+                return True
+        return False
+
+    def ground(self, x, y, width, height):
+        """Check the row a rectangle's bottom edge is on or in
+
+        True when it stands on something, or has sunk into it.
+        """
+        bottom = y + height
+        if bottom < 0:
+            return False
+        return self.span(int(x) if x >= 0 else -1, -int(-(x + width) // 1),
+                         int(bottom))
+
+
+def check(samples=20000):
+    """Compare queries with rect tests on every level in config.py
+
+    Returns True if every answer matched; prints the queries per second.
+    """
+    import random
+    import time
+    import config
+
+    class Rect:
+        def __init__(self, x, y, width, height):
+            self.x, self.y, self.width, self.height = x, y, width, height
+
+    def overlaps(x, y, w, h, platforms):
+        return any(x < p.x + p.width and x + w > p.x and
+                   y < p.y + p.height and y + h > p.y for p in platforms)
+
+    def inside(x, y, platforms):
+        return any(p.x <= x < p.x + p.width and p.y <= y < p.y + p.height
+                   for p in platforms)
+
+    rng = random.Random(1)
+    wrong = 0
+    for layout, _ in config.LEVELS:
+        platforms = [Rect(*rect[:4]) for rect in layout]
+        occupancy = Occupancy(platforms)
+        for _ in range(samples):
+            x = rng.uniform(-10, 130)
+            y = rng.uniform(-10, 130)
+            w = rng.choice((1, 6, 8, rng.uniform(0.5, 30)))
+            h = rng.choice((1, 6, 8, rng.uniform(0.5, 30)))
+            if rng.random() < 0.3:
+                x, y = float(int(x)), float(int(y))
+            if occupancy.box(x, y, w, h) != overlaps(x, y, w, h, platforms):
+                wrong += 1
+            if occupancy.solid(x, y) != inside(x, y, platforms):
+                wrong += 1
+
+        points = [(rng.uniform(0, 120), rng.uniform(0, 120))
+                  for _ in range(10000)]
+        start = time.perf_counter()
+        solid = occupancy.solid
+        for x, y in points:
+            solid(x, y)
+        bitmap_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for x, y in points:
+            inside(x, y, platforms)
+        rects_s = time.perf_counter() - start
+        print("%d platforms: %d point queries/s (rect tests: %d/s)" % (
+            len(platforms), len(points) / bitmap_s, len(points) / rects_s))
+    print("%d wrong answers" % wrong)
+    return wrong == 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check() else 1)
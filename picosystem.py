@@ -1,6 +1,7 @@
 # PicoSystem Python Stubs
 
 from typing import overload, Optional
+import time as _time
 
 
 COPY = 0
@@ -93,6 +94,16 @@ def stats() -> tuple[int, int, int, int, int]:
     return 0, 0, 0, 0, 0
 
 
+def time() -> int:
+    """Get milliseconds since boot."""
+    return _time.monotonic_ns() // 1000000
+
+
+def time_us() -> int:
+    """Get microseconds since boot."""
+    return _time.monotonic_ns() // 1000
+
+
 def clear():
     """Clear buffer to pen colour."""
 
@@ -134,6 +145,10 @@ def pen(r: int, g: int, b: int, a: int):
     """
 
 
+def pen(*args) -> None:
+    """Set pen colour (does nothing off-device)."""
+
+
 @overload
 def alpha() -> None:
     """Reset global alpha
@@ -152,6 +167,10 @@ def alpha(a: int) -> None:
     """
 
 
+def alpha(*args) -> None:
+    """Set global alpha (does nothing off-device)."""
+
+
 @overload
 def clip() -> None:
     """Clear clip rectangle."""
@@ -166,6 +185,10 @@ def clip(x: int, y: int, w: int, h: int) -> None:
     """
 
 
+def clip(*args) -> None:
+    """Set clip rectangle (does nothing off-device)."""
+
+
 @overload
 def blend() -> None:
     """Clear blend mode."""
@@ -182,6 +205,10 @@ def blend(mode: int) -> None:
     """
 
 
+def blend(*args) -> None:
+    """Set blend mode (does nothing off-device)."""
+
+
 @overload
 def target() -> None:
     """Reset draw target."""
@@ -192,6 +219,10 @@ def target(buffer: Buffer) -> None:
     """Set draw target."""
 
 
+def target(*args) -> None:
+    """Set draw target (does nothing off-device)."""
+
+
 @overload
 def camera() -> None:
     """Reset camera."""
@@ -202,6 +233,10 @@ def camera(x: int, y: int) -> None:
     """Set camera to x,y."""
 
 
+def camera(*args) -> None:
+    """Set camera (does nothing off-device)."""
+
+
 @overload
 def cursor() -> None:
     """Reset text cursor."""
@@ -212,6 +247,10 @@ def cursor(x: int, y: int) -> None:
     """Set text cursor."""
 
 
+def cursor(*args) -> None:
+    """Set text cursor (does nothing off-device)."""
+
+
 @overload
 def spritesheet() -> None:
     """Reset spritesheet to default."""
@@ -222,6 +261,10 @@ def spritesheet(spritesheet: Buffer) -> None:
     """Set spritesheet."""
 
 
+def spritesheet(*args) -> None:
+    """Set spritesheet (does nothing off-device)."""
+
+
 def pixel(x: int, y: int) -> None:
     """Set a single pixel."""
 
@@ -289,6 +332,10 @@ def poly(*args: tuple[int, int]) -> None:
     """Draw a polygon."""
 
 
+def poly(*args) -> None:
+    """Draw a polygon (does nothing off-device)."""
+
+
 @overload
 def fpoly(points: list[tuple[int, int]]) -> None:
     """Draw a filled polygon."""
@@ -299,6 +346,10 @@ def fpoly(*args: tuple[int, int]) -> None:
     """Draw a filled polygon."""
 
 
+def fpoly(*args) -> None:
+    """Draw a filled polygon (does nothing off-device)."""
+
+
 @overload
 def blit(buffer: Buffer, x: int, y: int, w: int, h: int, dx: int, dy: int) -> None:
     """Blit a buffer to the screen: 1:1.
@@ -329,6 +380,10 @@ def blit(buffer: Buffer, x: int, y: int, w: int, h: int, dx: int, dy: int, dw: i
     """
 
 
+def blit(*args) -> None:
+    """Blit a buffer to the screen (does nothing off-device)."""
+
+
 @overload
 def sprite(index: int, x: int, y: int) -> None:
     """Draw a sprite at x,y.
@@ -372,6 +427,10 @@ def sprite(index: int, x: int, y: int, cx: int, cy: int, dw: int, dh: int) -> No
     """
 
 
+def sprite(*args) -> None:
+    """Draw sprites (does nothing off-device)."""
+
+
 @overload
 def text(text: str) -> None:
     """Draw text.
@@ -415,6 +474,10 @@ def text(text: str, x: int, y: int, wrap: int) -> None:
     """
 
 
+def text(*args) -> None:
+    """Draw text (does nothing off-device)."""
+
+
 @overload
 def measure(text: str) -> tuple[int, int]:
     """Measure text."""
@@ -427,6 +490,11 @@ def measure(text: str, wrap: int) -> tuple[int, int]:
     return 0, 0
 
 
+def measure(text: str, wrap: int = -1) -> tuple[int, int]:
+    """Measure text (always 0, 0 off-device)."""
+    return 0, 0
+
+
 def rgb(r: int, g: int, b: int) -> int:
     """Build RGB colour."""
     return 0xFFFF
@@ -0,0 +1,164 @@
+"""
+Allocation Tracker
+Finds out which part of the game loop allocates memory, tick by tick
+
+main.py calls begin()/end() around each subsystem and end_tick() once a
+frame. Allocations are read from gc.mem_alloc() on MicroPython, or from
+tracemalloc on CPython (which frees most temporaries straight away, so
+there it shows what a subsystem keeps rather than all it allocates). The
+tracker also:
+- counts garbage collections and how long they take
+- flags any tick that allocates more than a budget
+- optionally takes over garbage collection ("manual GC"), only collecting
+  when picosystem.stats() says the last frame had enough idle time
+
+Turn it on with PROFILE_ALLOCATIONS = True in main.py.
+"""
+
+import gc
+import picosystem
+
+# Subsystem names, indexed by the PROBE_* constants in main.py
+NAMES = ("player", "collectibles", "draw", "ui", "update", "collisions")
+
+# The first COUNTED subsystems don't overlap, so together they make up a
+# tick's allocations. The others are spans around or inside them.
+COUNTED = 4
+
+HISTORY = 8  # Over-budget ticks kept for the report
+
+
+def _tracemalloc_allocated():
+    """Bytes allocated according to tracemalloc (CPython)"""
+    import tracemalloc
+    return tracemalloc.get_traced_memory()[0]
+
+
+class AllocTracker:
+    """Per-tick allocation counts for each subsystem of the game loop"""
+
+    def __init__(self, budget=256, manual_gc=False, reserve=8192,
+                 verbose=True):
+        self.budget = budget
+        self.manual_gc = manual_gc
+        self.reserve = reserve      # Collect anyway when less is free
+        self.verbose = verbose
+
+        if hasattr(gc, 'mem_alloc'):
+            self.allocated = gc.mem_alloc
+            self.free = gc.mem_free
+        else:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.allocated = _tracemalloc_allocated
+            self.free = None
+            # CPython tells us exactly when it collects
+            self.gc_started = 0
+            gc.callbacks.append(self._gc_callback)
+
+        count = len(NAMES)
+        self.starts = [0] * count
+        self.tick_bytes = [0] * count   # Allocated this tick
+        self.total_bytes = [0] * count  # Allocated since the tracker started
+        self.peak_bytes = [0] * count   # Worst single tick
+        self.ticks = 0
+        self.over_budget = 0
+        self.history = []               # (tick, bytes) of recent bad ticks
+        self.gc_count = 0
+        self.gc_time_us = 0
+        self.gc_max_us = 0
+        self.gc_idle_us = 2000          # Idle time needed to collect
+
+        if manual_gc:
+            gc.disable()
+
+    def _gc_callback(self, phase, info):
+        """gc.callbacks hook: time CPython's own collections"""
+        if phase == 'start':
+            self.gc_started = picosystem.time_us()
+        else:
+            self._record_gc(picosystem.time_us() - self.gc_started)
+
+    def _record_gc(self, duration_us):
+        """Count one collection that took duration_us"""
+        self.gc_count += 1
+        self.gc_time_us += duration_us
+        if duration_us > self.gc_max_us:
+            self.gc_max_us = duration_us
+
+    def begin(self, subsystem):
+        """Start measuring a subsystem"""
+        self.starts[subsystem] = self.allocated()
+
+    def end(self, subsystem):
+        """Stop measuring a subsystem and add what it allocated"""
+        used = self.allocated() - self.starts[subsystem]
+        if used < 0:
+            # The heap shrank, so MicroPython collected mid-way. Its cost
+            # can't be timed from here, but it still gets counted.
+            if self.free is not None:
+                self._record_gc(0)
+            used = 0
+        self.tick_bytes[subsystem] += used
+
+    def end_tick(self, tick):
+        """Finish the tick: check the budget and maybe collect"""
+        self.ticks += 1
+        total = 0
+        for i, used in enumerate(self.tick_bytes):
+            if i < COUNTED:
+                total += used
+            self.total_bytes[i] += used
+            if used > self.peak_bytes[i]:
+                self.peak_bytes[i] = used
+        if total > self.budget:
+            self.over_budget += 1
+            if len(self.history) == HISTORY:
+                self.history.pop(0)
+            self.history.append((tick, total))
+            if self.verbose:
+                print("Tick %d allocated %d bytes: %s" % (tick, total, ", ".join(
+                    "%s %d" % (NAMES[i], used)
+                    for i, used in enumerate(self.tick_bytes) if used)))
+        for i in range(len(self.tick_bytes)):
+            self.tick_bytes[i] = 0
+
+        if self.manual_gc:
+            self.collect_if_idle()
+
+    def collect_if_idle(self):
+        """Collect if the last frame had spare time, or memory is low"""
+        idle_us = picosystem.stats()[1]
+        low = self.free is not None and self.free() < self.reserve
+        if idle_us < self.gc_idle_us and not low:
+            return
+        start = picosystem.time_us()
+        gc.collect()
+        duration = picosystem.time_us() - start
+        if self.free is not None:
+            # CPython's collections are already timed by the callback
+            self._record_gc(duration)
+        # Only collect when there is room for the slowest one so far
+        self.gc_idle_us = max(self.gc_idle_us, duration + duration // 4)
+
+    def report(self):
+        """Print a summary over serial"""
+        ticks = max(self.ticks, 1)
+        print("Allocations over %d ticks:" % self.ticks)
+        for i, name in enumerate(NAMES):
+            print("  %-13s avg %5d  peak %5d bytes/tick" % (
+                name, self.total_bytes[i] // ticks, self.peak_bytes[i]))
+        print("  over budget (%d bytes): %d ticks" % (
+            self.budget, self.over_budget))
+        for tick, used in self.history:
+            print("    tick %d: %d bytes" % (tick, used))
+        print("  gc: %d collections, %dus total, %dus max" % (
+            self.gc_count, self.gc_time_us, self.gc_max_us))
+
+    def close(self):
+        """Stop tracking and hand garbage collection back"""
+        if self.manual_gc:
+            gc.enable()
+        if self.free is None:
+            gc.callbacks.remove(self._gc_callback)
@@ -0,0 +1,94 @@
+"""
+Adaptive Quality Governor
+Scales back eye candy when frames run over budget, and brings it back later
+
+Every tick the governor reads the tick, update and draw times from
+picosystem.stats(). When frames keep running over the budget it steps down
+a quality level; when they keep finishing well within it, it steps back
+up. Needing several frames in a row either way (hysteresis) stops it
+flickering between two levels. Each level sets:
+- particles: how many particles may be alive at once (an AdvancedPlayer
+  given the governor spawns no more than that)
+- animate_every: how often bobbing animations move (1 = every tick)
+- detail: whether decorative pixels (eyes, shine, indicators) are drawn
+
+Gameplay never changes - only what is drawn. Every level change is
+printed over serial.
+"""
+
+import picosystem
+
+# Quality levels, best first: (name, particles, animate every N ticks, detail)
+LEVELS = (
+    ("high", 64, 1, True),
+    ("medium", 24, 2, True),
+    ("low", 8, 4, False),
+    ("minimal", 0, 8, False),
+)
+
+TARGET_FPS = 30     # The frame rate the game is written for (see README)
+HIGH_WATER = 95     # Frame time over this % of the budget counts as slow
+LOW_WATER = 70      # Frame time under this % of the budget counts as fast
+DOWN_FRAMES = 4     # Slow frames in a row before stepping down
+UP_FRAMES = 120     # Fast frames in a row before stepping back up
+
+
+class Governor:
+    """Picks a quality level from measured frame times"""
+
+    def __init__(self, target_fps=TARGET_FPS, down_frames=DOWN_FRAMES,
+                 up_frames=UP_FRAMES, verbose=True):
+        self.budget_us = 1000000 // target_fps
+        self.down_frames = down_frames
+        self.up_frames = up_frames
+        self.verbose = verbose
+        self.slow = 0       # Slow frames in a row
+        self.fast = 0       # Fast frames in a row
+        self.frame_us = 0
+        self.changes = 0
+        self.animate = True  # Animations move this tick
+        self.set_level(0)
+
+    def set_level(self, level):
+        """Switch to a quality level"""
+        self.level = level
+        self.name, self.particles, self.animate_every, self.detail = \
+            LEVELS[level]
+        self.slow = 0
+        self.fast = 0
+
+    def update(self, tick, measure=True):
+        """Call once per tick - measures the last frame and adjusts quality
+
+        With measure False the last frame's time is ignored.
+        """
+        self.animate = tick % self.animate_every == 0
+        if not measure:
+            return
+        _, _, tick_us, update_us, draw_us = picosystem.stats()
+        frame_us = max(tick_us, update_us + draw_us)
+        self.frame_us = frame_us
+
+        if frame_us * 100 > self.budget_us * HIGH_WATER:
+            self.slow += 1
+            self.fast = 0
+        elif frame_us * 100 < self.budget_us * LOW_WATER:
+            self.fast += 1
+            self.slow = 0
+        else:
+            self.slow = 0
+            self.fast = 0
+
+        if self.slow >= self.down_frames and self.level < len(LEVELS) - 1:
+            self._change(self.level + 1, tick)
+        elif self.fast >= self.up_frames and self.level > 0:
+            self._change(self.level - 1, tick)
+
+    def _change(self, level, tick):
+        """Switch level and log it"""
+        previous = self.name
+        self.set_level(level)
+        self.changes += 1
+        if self.verbose:
+            print("Tick %d: quality %s -> %s (frame %dus, budget %dus)" % (
+                tick, previous, self.name, self.frame_us, self.budget_us))
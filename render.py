@@ -0,0 +1,304 @@
+"""
+Render State
+Everything a frame shows, in one flat preallocated array
+
+Game.update ends by extracting what there is to draw - positions, sizes,
+colors, score and flags - into a RenderState, an array of 32-bit integers.
+draw() and draw_ui() draw a frame from that array alone and never look at
+the game objects, so:
+- a frame can be drawn on the other core while the next one is simulated
+  (dualcore.py)
+- frames can be recorded and drawn again later without running the game
+- drawing is a few loops over integers instead of a method call per object
+
+Layout (slot numbers are the constants below):
+    header      HEADER slots: score, flags, player, counts, sizes, colors
+    platforms   PLATFORM slots each: x, y, width, height, color
+    items       ITEM slots each: x, y of collectibles still to pick up
+
+This covers main.Game. The classes in advanced_example.py (moving and
+crumbling platforms, enemies, power-ups, AdvancedPlayer) still draw from
+their own fields, so a game built from them needs slots for them here
+before it can draw on the other core.
+
+Platforms never move, so they are only written when the level changes.
+Colors are packed as r << 8 | g << 4 | b. Slots are 32-bit ('i') rather
+than 16-bit, so slot offsets of levels with thousands of platforms (see
+stress.py) still fit.
+
+Recording and redrawing on a desktop Python:
+    python render.py                        # check redrawn frames match
+    python render.py --record inputs.rec --out frames.bin
+    python render.py --draw frames.bin --png frames/
+"""
+
+from array import array
+
+import picosystem
+
+# Header slots
+SCORE = 0
+FLAGS = 1
+PLAYER_X = 2
+PLAYER_Y = 3
+EYE_LEFT = 4        # Eye pixels, worked out from the exact position
+EYE_RIGHT = 5
+EYE_Y = 6
+PLATFORMS = 7       # Number of platforms
+ITEMS = 8           # Number of collectibles
+ITEMS_AT = 9        # Slot the collectibles start at
+PLAYER_WIDTH = 10
+PLAYER_HEIGHT = 11
+ITEM_WIDTH = 12
+ITEM_HEIGHT = 13
+BACKGROUND = 14     # Colors
+PLAYER_COLOR = 15
+ITEM_COLOR = 16
+DETAIL_COLOR = 17   # Eyes and shine
+TEXT_COLOR = 18
+MESSAGE_COLOR = 19  # Level complete message
+HEADER = 20
+
+PLATFORM = 5        # Slots per platform
+ITEM = 2            # Slots per collectible
+
+# FLAGS bits
+COMPLETE = 1
+LEVELS = 2          # There is a next level to go on to
+DETAIL = 4          # Draw the decorative pixels
+
+
+def pack(color):
+    """Pack an (r, g, b) color into one slot"""
+    r, g, b = color
+    return r << 8 | g << 4 | b
+
+
+class RenderState:
+    """A frame's drawable state in a flat array('i')"""
+
+    def __init__(self, platforms=16, items=32):
+        self.data = array('i', [0] * (HEADER + platforms * PLATFORM +
+                                      items * ITEM))
+        self.platforms = platforms      # Capacity
+        self.items = items
+        self.source = None              # Platform list the layout came from
+        self.data[ITEMS_AT] = HEADER + platforms * PLATFORM
+
+    def reserve(self, platforms, items):
+        """Make room for a bigger level - only when the level changes"""
+        if platforms > self.platforms or items > self.items:
+            self.__init__(max(platforms, self.platforms),
+                          max(items, self.items))
+
+
+def draw(data):
+    """Draw the world from a RenderState's data"""
+    pen = picosystem.pen
+    frect = picosystem.frect
+    pixel = picosystem.pixel
+
+    color = data[BACKGROUND]
+    pen(color >> 8, color >> 4 & 15, color & 15)
+    picosystem.clear()
+
+    i = HEADER
+    for _ in range(data[PLATFORMS]):
+        color = data[i + 4]
+        pen(color >> 8, color >> 4 & 15, color & 15)
+        frect(data[i], data[i + 1], data[i + 2], data[i + 3])
+        i += PLATFORM
+
+    detail = data[FLAGS] & DETAIL
+    color = data[ITEM_COLOR]
+    ir, ig, ib = color >> 8, color >> 4 & 15, color & 15
+    color = data[DETAIL_COLOR]
+    dr, dg, db = color >> 8, color >> 4 & 15, color & 15
+    width = data[ITEM_WIDTH]
+    height = data[ITEM_HEIGHT]
+    i = data[ITEMS_AT]
+    for _ in range(data[ITEMS]):
+        x = data[i]
+        y = data[i + 1]
+        pen(ir, ig, ib)
+        frect(x, y, width, height)
+        if detail:
+            pen(dr, dg, db)
+            pixel(x + 1, y + 1)
+        i += ITEM
+
+    color = data[PLAYER_COLOR]
+    pen(color >> 8, color >> 4 & 15, color & 15)
+    frect(data[PLAYER_X], data[PLAYER_Y], data[PLAYER_WIDTH],
+          data[PLAYER_HEIGHT])
+    if detail:
+        pen(dr, dg, db)
+        pixel(data[EYE_LEFT], data[EYE_Y])
+        pixel(data[EYE_RIGHT], data[EYE_Y])
+
+
+def draw_ui(data):
+    """Draw the score and messages from a RenderState's data"""
+    color = data[TEXT_COLOR]
+    picosystem.pen(color >> 8, color >> 4 & 15, color & 15)
+    picosystem.text(f"Score: {data[SCORE]}", 2, 2)
+    flags = data[FLAGS]
+    if flags & COMPLETE:
+        color = data[MESSAGE_COLOR]
+        picosystem.pen(color >> 8, color >> 4 & 15, color & 15)
+        picosystem.text("Level Complete!", 25, 60)
+        picosystem.text("Press X to restart", 15, 70)
+        if flags & LEVELS:
+            picosystem.text("Press A: next level", 12, 80)
+
+
+class FrameWriter:
+    """Appends every extracted frame to a file, to draw again later"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.frames = 0
+
+    def write(self, state):
+        """Add one frame: its length in slots (4 bytes), then the slots"""
+        data = state.data
+        self.file.write(len(data).to_bytes(4, 'little'))
+        self.file.write(data)
+        self.frames += 1
+
+    def close(self):
+        """Finish the file"""
+        self.file.close()
+
+
+def read_frames(path):
+    """Frames written by a FrameWriter, as arrays"""
+    with open(path, 'rb') as f:
+        blob = f.read()
+    offset = 0
+    while offset < len(blob):
+        size = int.from_bytes(blob[offset:offset + 4], 'little')
+        offset += 4
+        data = array('i')
+        data.frombytes(blob[offset:offset + size * data.itemsize])
+        offset += size * data.itemsize
+        yield data
+
+
+def record(masks, path, level=1):
+    """Play input masks headlessly, writing each frame's state to path"""
+    import headless
+    main = headless.load_game()
+    game = main.Game(level=level)
+    writer = FrameWriter(path)
+    for mask in masks:
+        headless.set_buttons(mask)
+        game.update()
+        writer.write(game.render)
+    writer.close()
+    headless.set_buttons(0)
+    return writer.frames
+
+
+def draw_frames(path, out_dir, every=1):
+    """Draw recorded frames headlessly into PNG files"""
+    import os
+    import headless
+    from goldens import png
+    screen = headless.install_screen()
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for i, data in enumerate(read_frames(path)):
+        if i % every:
+            continue
+        draw(data)
+        draw_ui(data)
+        png(os.path.join(out_dir, "%05d.png" % i), screen.width,
+            screen.height, screen.pixels)
+        count += 1
+    return count
+
+
+def check_redraw(ticks=600):
+    """Check frames drawn from a recording match the ones drawn in play
+
+    Plays the goldens.py input script, hashing every frame and recording
+    its render state, then draws the recording on its own. Also times
+    extracting and drawing the state. Returns True if every frame matched.
+    """
+    import hashlib
+    import os
+    import tempfile
+    import time
+    import headless
+    import goldens
+    main = headless.load_game()
+    screen = headless.install_screen()
+    masks = goldens.script(ticks, goldens.SEED)
+
+    game = main.Game()
+    writer_path = os.path.join(tempfile.mkdtemp(), 'frames.bin')
+    writer = FrameWriter(writer_path)
+    played = []
+    extract_s = draw_s = 0
+    for mask in masks:
+        headless.set_buttons(mask)
+        game.update()
+        start = time.perf_counter()
+        game.extract()
+        middle = time.perf_counter()
+        game.draw()
+        extract_s += middle - start
+        draw_s += time.perf_counter() - middle
+        played.append(hashlib.blake2b(screen.pixels, digest_size=8).digest())
+        writer.write(game.render)
+    writer.close()
+    headless.set_buttons(0)
+
+    matched = 0
+    for digest, data in zip(played, read_frames(writer_path)):
+        draw(data)
+        draw_ui(data)
+        matched += digest == hashlib.blake2b(screen.pixels,
+                                             digest_size=8).digest()
+    os.remove(writer_path)
+    print("Extract %.1fus, draw %.1fus per frame (software screen)" % (
+        extract_s / ticks * 1e6, draw_s / ticks * 1e6))
+    print("%d/%d frames redrawn from the recording match" % (matched, ticks))
+    return matched == ticks
+
+
+def main(argv=None):
+    """Command line entry point"""
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--record',
+                        help="Input masks to play (one byte per tick, as "
+                             "controls.RecordingSource saves them)")
+    parser.add_argument('--level', type=int, default=1,
+                        help="Level to play the inputs on")
+    parser.add_argument('--out', default='frames.bin',
+                        help="Where --record writes the frames")
+    parser.add_argument('--draw', help="Recorded frames to draw")
+    parser.add_argument('--png', default='frames',
+                        help="Directory --draw writes PNGs to")
+    parser.add_argument('--every', type=int, default=1,
+                        help="Draw every Nth frame")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        with open(args.record, 'rb') as f:
+            masks = f.read()
+        frames = record(masks, args.out, args.level)
+        print("Recorded %d frames to %s" % (frames, args.out))
+    if args.draw:
+        count = draw_frames(args.draw, args.png, args.every)
+        print("Drew %d frames into %s" % (count, args.png))
+    if not args.record and not args.draw:
+        return 0 if check_redraw() else 1
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
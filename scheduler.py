@@ -0,0 +1,127 @@
+"""
+Cooperative Task Scheduler
+Spreads heavy work over several frames instead of stalling one
+
+A task is a generator that does a small piece of work and then yields.
+Each frame the scheduler steps tasks until its time slice runs out. The
+slice is the idle time picosystem.stats() measured for the last frame,
+minus a safety margin, so background work only uses time the frame had
+spare. Higher priority tasks run first; tasks of equal priority take
+turns. Tasks can be cancelled at any time.
+
+    def build_things():
+        for thing in things:
+            build(thing)
+            yield
+
+    task = scheduler.spawn(build_things(), priority=1)
+    ...
+    scheduler.run()        # once per tick, from update(tick)
+
+On CPython, run_async() drives the same scheduler from asyncio.
+"""
+
+import picosystem
+
+MARGIN_US = 2000     # Idle time left untouched every frame
+MIN_SLICE_US = 500   # Always make some progress, even on a busy frame
+MAX_SLICE_US = 8000  # Never take more than this in one frame
+
+
+class Task:
+    """A generator being run by a Scheduler"""
+
+    def __init__(self, generator, priority, name):
+        self.generator = generator
+        self.priority = priority
+        self.name = name
+        self.done = False
+        self.cancelled = False
+        self.result = None
+        self.steps = 0
+
+    def cancel(self):
+        """Stop the task - it won't be stepped again"""
+        if not self.done:
+            self.cancelled = True
+            self.done = True
+            self.generator.close()
+
+
+class Scheduler:
+    """Runs generator tasks in per-frame time slices"""
+
+    def __init__(self, margin_us=MARGIN_US, min_slice_us=MIN_SLICE_US,
+                 max_slice_us=MAX_SLICE_US):
+        self.margin_us = margin_us
+        self.min_slice_us = min_slice_us
+        self.max_slice_us = max_slice_us
+        self.tasks = []  # Highest priority first, in turn order
+        self.last_slice_us = 0
+        self.last_used_us = 0
+
+    def spawn(self, generator, priority=0, name=None):
+        """Add a generator as a new task and return its Task"""
+        task = Task(generator, priority, name)
+        self._queue(task)
+        return task
+
+    def _queue(self, task):
+        """Put a task behind the others of the same priority"""
+        tasks = self.tasks
+        i = len(tasks)
+        while i > 0 and tasks[i - 1].priority < task.priority:
+            i -= 1
+        tasks.insert(i, task)
+
+    def busy(self):
+        """Check if any task is still waiting to run"""
+        return bool(self.tasks)
+
+    def slice_us(self):
+        """Time this frame can spare, from the last frame's idle time"""
+        idle_us = picosystem.stats()[1]
+        return min(max(idle_us - self.margin_us, self.min_slice_us),
+                   self.max_slice_us)
+
+    def run(self, slice_us=None):
+        """Step tasks until the time slice is used up or none are left"""
+        if slice_us is None:
+            slice_us = self.slice_us()
+        self.last_slice_us = slice_us
+        tasks = self.tasks
+        start = picosystem.time_us()
+        now = start
+        while tasks and now - start < slice_us:
+            task = tasks.pop(0)
+            if task.cancelled:
+                continue
+            try:
+                next(task.generator)
+                task.steps += 1
+                self._queue(task)
+            except StopIteration as stop:
+                task.result = stop.value
+                task.done = True
+            now = picosystem.time_us()
+        self.last_used_us = now - start
+
+
+async def run_async(scheduler, slice_us=4000, frame_s=1 / 60):
+    """Drive a scheduler from asyncio (CPython) until it runs out of tasks
+
+    Runs one slice per frame interval, leaving the event loop free for
+    other coroutines in between.
+    """
+    import asyncio
+    while scheduler.busy():
+        scheduler.run(slice_us)
+        await asyncio.sleep(frame_s)
+
+
+async def wait(task, poll_s=1 / 60):
+    """Wait from asyncio until a task has finished, and return its result"""
+    import asyncio
+    while not task.done:
+        await asyncio.sleep(poll_s)
+    return task.result
@@ -0,0 +1,493 @@
+"""
+Game State Snapshots
+Packs the whole game state into a preallocated bytearray and back
+
+A Snapshotter reads the layout of each level as it starts, when the
+number of objects is known, and packs with struct into buffers of a
+fixed size:
+- score
+- player position, velocity and power-up timers
+- every collectible, enemy, moving platform and power-up
+- every crumbling platform, with the timer it is waiting on
+
+Game.restart_level restores the snapshot taken when the level started,
+and Rewind keeps a ring of delta-encoded snapshots inside a fixed memory
+budget, so a test (or a player) can step back in time.
+
+Particles are only decoration and are not part of a snapshot. They are
+also the only thing drawn at random, so there is no RNG state to keep
+either; a game that makes gameplay random should draw from an Rng and
+pack its state too. The collectibles' bob animation is left out as
+well, so it keeps running through a restart or rewind as it always has.
+"""
+
+import struct
+
+# Pack floats at the precision the interpreter uses: MicroPython on the
+# Picosystem has single precision floats, a desktop Python double
+FLOAT = 'f' if 1.0 + 2.0 ** -40 == 1.0 else 'd'
+
+HEADER = "<i"                           # score
+PLAYER = "<" + FLOAT * 4 + "B"          # x, y, vel_x, vel_y, on_ground
+EFFECT = "<h"                           # ticks left of a power-up effect
+LIVES = "<h"
+COLLECTIBLE = "<B"                      # collected
+ENEMY = "<" + FLOAT * 3 + "b"           # x, y, vel_y, direction
+MOVER = "<" + FLOAT + "b"               # x, direction
+POWERUP = "<BB"                         # collected, flash_timer
+CRUMBLER = "<Bhh"                       # solid, ticks since stood on, timer
+
+# Rewind record kinds
+KEY = 0
+DELTA = 1
+RECORD_HEADER = "<HB"                   # record length, kind
+
+
+class Rng:
+    """Small xorshift random number generator whose state fits in a snapshot
+
+    MicroPython's random module can't save and restore its state.
+    """
+
+    def __init__(self, seed=1):
+        self.state = (seed & 0xFFFFFFFF) or 1
+
+    def next(self):
+        """Get the next 32-bit random number"""
+        x = self.state
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        self.state = x
+        return x
+
+    def randint(self, a, b):
+        """Random integer from a to b inclusive"""
+        return a + self.next() % (b - a + 1)
+
+    def uniform(self, a, b):
+        """Random float between a and b"""
+        return a + (b - a) * (self.next() / 4294967296)
+
+
+class Snapshotter:
+    """Captures and restores the state of one Game's current level"""
+
+    def __init__(self, game):
+        self.game = game
+        self.setup()
+
+    def setup(self):
+        """Read the layout of the game's current level - call on level start"""
+        game = self.game
+        self.player = game.player
+        self.collectibles = game.collectibles
+        self.enemies = getattr(game, 'enemies', ())
+        # Crumbling platforms have no direction: they run on timers instead
+        dynamic = getattr(game, 'moving_platforms', ())
+        self.movers = [m for m in dynamic if hasattr(m, 'direction')]
+        self.crumblers = [m for m in dynamic if hasattr(m, 'timer_left')]
+        self.powerups = getattr(game, 'powerups', ())
+        # Decided once here, so capture/restore never probe types
+        self.effects = len(getattr(self.player, 'effects', ()))
+        self.enemy_vel = [hasattr(e, 'vel_y') for e in self.enemies]
+
+        self.size = (struct.calcsize(HEADER) + struct.calcsize(PLAYER) +
+                     (struct.calcsize(EFFECT) * self.effects +
+                      struct.calcsize(LIVES) if self.effects else 0) +
+                     struct.calcsize(COLLECTIBLE) * len(self.collectibles) +
+                     struct.calcsize(ENEMY) * len(self.enemies) +
+                     struct.calcsize(MOVER) * len(self.movers) +
+                     struct.calcsize(POWERUP) * len(self.powerups) +
+                     struct.calcsize(CRUMBLER) * len(self.crumblers))
+
+    def buffer(self):
+        """Allocate a buffer big enough for one snapshot"""
+        return bytearray(self.size)
+
+    def capture(self, buf=None):
+        """Pack the current state into buf (or a new buffer) and return it"""
+        if buf is None:
+            buf = bytearray(self.size)
+        p = self.player
+        struct.pack_into(HEADER, buf, 0, self.game.score)
+        offset = struct.calcsize(HEADER)
+        struct.pack_into(PLAYER, buf, offset, p.x, p.y, p.vel_x, p.vel_y,
+                         p.on_ground)
+        offset += struct.calcsize(PLAYER)
+        if self.effects:
+            step = struct.calcsize(EFFECT)
+            for kind in range(self.effects):
+                struct.pack_into(EFFECT, buf, offset, p.effect_left(kind))
+                offset += step
+            struct.pack_into(LIVES, buf, offset, p.lives)
+            offset += struct.calcsize(LIVES)
+
+        step = struct.calcsize(COLLECTIBLE)
+        for c in self.collectibles:
+            struct.pack_into(COLLECTIBLE, buf, offset, c.collected)
+            offset += step
+        step = struct.calcsize(ENEMY)
+        for e, has_vel in zip(self.enemies, self.enemy_vel):
+            struct.pack_into(ENEMY, buf, offset, e.x, e.y,
+                             e.vel_y if has_vel else 0, e.direction)
+            offset += step
+        step = struct.calcsize(MOVER)
+        for m in self.movers:
+            struct.pack_into(MOVER, buf, offset, m.x, m.direction)
+            offset += step
+        step = struct.calcsize(POWERUP)
+        for u in self.powerups:
+            struct.pack_into(POWERUP, buf, offset, u.collected, u.flash_timer)
+            offset += step
+        step = struct.calcsize(CRUMBLER)
+        for c in self.crumblers:
+            since = c.timers.tick - c.started if c.started >= 0 else -1
+            struct.pack_into(CRUMBLER, buf, offset, c.solid, since,
+                             c.timer_left())
+            offset += step
+        return buf
+
+    def restore(self, buf):
+        """Put the game back to the state packed in buf"""
+        p = self.player
+        self.game.score = struct.unpack_from(HEADER, buf, 0)[0]
+        offset = struct.calcsize(HEADER)
+        p.x, p.y, p.vel_x, p.vel_y, on_ground = struct.unpack_from(
+            PLAYER, buf, offset)
+        p.on_ground = bool(on_ground)
+        offset += struct.calcsize(PLAYER)
+        if self.effects:
+            step = struct.calcsize(EFFECT)
+            for kind in range(self.effects):
+                # Restarts the effect's timer with the ticks it had left
+                p.add_effect(kind, struct.unpack_from(EFFECT, buf, offset)[0])
+                offset += step
+            p.lives = struct.unpack_from(LIVES, buf, offset)[0]
+            offset += struct.calcsize(LIVES)
+
+        step = struct.calcsize(COLLECTIBLE)
+        for c in self.collectibles:
+            c.collected = bool(struct.unpack_from(COLLECTIBLE, buf, offset)[0])
+            offset += step
+        step = struct.calcsize(ENEMY)
+        for e, has_vel in zip(self.enemies, self.enemy_vel):
+            e.x, e.y, vel_y, e.direction = struct.unpack_from(ENEMY, buf,
+                                                              offset)
+            if has_vel:
+                e.vel_y = vel_y
+            offset += step
+        step = struct.calcsize(MOVER)
+        for m in self.movers:
+            m.x, m.direction = struct.unpack_from(MOVER, buf, offset)
+            offset += step
+        step = struct.calcsize(POWERUP)
+        for u in self.powerups:
+            collected, u.flash_timer = struct.unpack_from(POWERUP, buf, offset)
+            u.collected = bool(collected)
+            offset += step
+        step = struct.calcsize(CRUMBLER)
+        for c in self.crumblers:
+            # Cancels its pending timer and starts the saved one
+            solid, since, left = struct.unpack_from(CRUMBLER, buf, offset)
+            c.restore(bool(solid), since, left)
+            offset += step
+
+
+class Rewind:
+    """Ring of snapshots taken every few ticks, within a fixed byte budget
+
+    Every `keyframe`-th record is a full snapshot; the others only store
+    the bytes that changed since the previous one (XOR, run-length
+    encoded). When the ring is full the oldest records are dropped, always
+    leaving a full snapshot at the start.
+    """
+
+    def __init__(self, snapshotter, budget=4096, every=10, keyframe=8,
+                 capacity=256):
+        size = snapshotter.size
+        # Worst case record: every byte changed, in runs of at most 255
+        self.max_record = (struct.calcsize(RECORD_HEADER) + size +
+                           4 * (size // 255 + 1))
+        if budget < 2 * self.max_record:
+            raise ValueError("rewind budget too small for this level")
+        self.snapshotter = snapshotter
+        self.every = every
+        self.keyframe = keyframe
+        self.ring = bytearray(budget)
+        self.previous = bytearray(size)  # Last snapshot pushed
+        self.current = bytearray(size)
+        self.starts = [0] * capacity     # Record offsets, oldest at `first`
+        self.first = 0
+        self.count = 0
+        self.head = 0                    # Where the next record goes
+        self.since_key = 0
+
+    def push(self, tick):
+        """Record the game state if this is a snapshot tick"""
+        if tick % self.every:
+            return
+        self.snapshotter.capture(self.current)
+        if self.count == len(self.starts):
+            self._evict()
+        self._reserve(self.max_record)
+
+        ring = self.ring
+        start = self.head
+        offset = start + struct.calcsize(RECORD_HEADER)
+        if self.count == 0 or self.since_key >= self.keyframe - 1:
+            kind = KEY
+            ring[offset:offset + len(self.current)] = self.current
+            offset += len(self.current)
+            self.since_key = 0
+        else:
+            kind = DELTA
+            offset = self._encode(offset)
+            self.since_key += 1
+        struct.pack_into(RECORD_HEADER, ring, start, offset - start, kind)
+
+        self.starts[(self.first + self.count) % len(self.starts)] = start
+        self.count += 1
+        self.head = offset
+        self.previous, self.current = self.current, self.previous
+
+    def _encode(self, offset):
+        """Write current XOR previous as (skip, count, bytes...) runs"""
+        ring = self.ring
+        current = self.current
+        previous = self.previous
+        size = len(current)
+        i = 0
+        while i < size:
+            skip = 0
+            while i < size and skip < 255 and current[i] == previous[i]:
+                skip += 1
+                i += 1
+            count = 0
+            while (i + count < size and count < 255 and
+                   current[i + count] != previous[i + count]):
+                ring[offset + 2 + count] = current[i + count] ^ previous[i + count]
+                count += 1
+            if count == 0 and i == size:
+                break
+            ring[offset] = skip
+            ring[offset + 1] = count
+            offset += 2 + count
+            i += count
+        return offset
+
+    def _decode(self, start, buf):
+        """Apply a record at `start` to buf"""
+        length, kind = struct.unpack_from(RECORD_HEADER, self.ring, start)
+        offset = start + struct.calcsize(RECORD_HEADER)
+        end = start + length
+        ring = self.ring
+        if kind == KEY:
+            # Copied in place: slicing the ring would allocate a new buffer
+            for j in range(end - offset):
+                buf[j] = ring[offset + j]
+            return
+        i = 0
+        while offset < end:
+            i += ring[offset]
+            count = ring[offset + 1]
+            offset += 2
+            for j in range(count):
+                buf[i + j] ^= ring[offset + j]
+            offset += count
+            i += count
+
+    def _kind(self, index):
+        """Record kind of the index-th oldest record"""
+        start = self.starts[(self.first + index) % len(self.starts)]
+        return self.ring[start + 2]
+
+    def _evict(self):
+        """Drop the oldest record, then any deltas that relied on it"""
+        capacity = len(self.starts)
+        self.first = (self.first + 1) % capacity
+        self.count -= 1
+        while self.count and self._kind(0) != KEY:
+            self.first = (self.first + 1) % capacity
+            self.count -= 1
+
+    def _reserve(self, length):
+        """Make `length` contiguous bytes free at the head"""
+        if self.head + length > len(self.ring):
+            self.head = 0
+        while self.count:
+            start = self.starts[self.first]
+            end = start + struct.unpack_from(RECORD_HEADER, self.ring, start)[0]
+            if end <= self.head or start >= self.head + length:
+                break
+            self._evict()
+        if self.count == 0:
+            self.since_key = 0
+
+    def rewind(self, records=1):
+        """Restore the game to `records` snapshots before the newest one
+
+        History after that point is dropped, so recording carries on from
+        the restored state. Returns False if not enough history is kept.
+        """
+        target = self.count - 1 - records
+        if target < 0:
+            return False
+        key = target
+        while self._kind(key) != KEY:
+            key -= 1
+        buf = self.previous
+        capacity = len(self.starts)
+        for index in range(key, target + 1):
+            self._decode(self.starts[(self.first + index) % capacity], buf)
+        self.snapshotter.restore(buf)
+
+        start = self.starts[(self.first + target) % capacity]
+        self.head = start + struct.unpack_from(RECORD_HEADER, self.ring,
+                                               start)[0]
+        self.count = target + 1
+        self.since_key = target - key
+        return True
+
+
+def play_and_rewind(game, rewind, ticks, seed, state=None):
+    """Play random input headlessly, then rewind one record at a time and
+    check each restores the snapshot taken then exactly. state(), if
+    given, is read straight off the game with each snapshot and has to
+    come back too. Returns (ok, every snapshot taken while playing).
+    """
+    import headless
+    rng = Rng(seed)
+    snapshots = rewind.snapshotter
+    expected = []       # Full snapshot for every push
+    states = []
+    for tick in range(ticks):
+        headless.set_buttons(rng.randint(0, 255) & ~headless.X_BIT &
+                             ~headless.Y_BIT)
+        game.update()
+        rewind.push(tick)
+        if tick % rewind.every == 0:
+            expected.append(snapshots.capture())
+            states.append(state() if state else None)
+
+    ok = True
+    kept = rewind.count
+    print("Kept %d of %d snapshots in %d bytes (%d each in full)" % (
+        kept, len(expected), len(rewind.ring), snapshots.size))
+    for back in range(1, kept):
+        if not rewind.rewind():
+            ok = False
+            break
+        matched = snapshots.capture() == expected[-1 - back]
+        if state:
+            matched = state() == states[-1 - back] and matched
+        ok = ok and matched
+    if rewind.rewind():
+        ok = False      # Nothing older should be left
+    return ok, expected
+
+
+def check_rewind(ticks=600, seed=7):
+    """Check rewinding main.Game restores every snapshot still in the
+    buffer exactly, with a budget small enough that old records get
+    dropped, and that restarting the level restores its start.
+    Returns True if they all matched.
+    """
+    import headless
+    main = headless.load_game()
+    game = main.Game()
+    rewind = Rewind(game.snapshots, budget=1024, every=3, keyframe=5)
+    ok, expected = play_and_rewind(game, rewind, ticks, seed)
+    ok = ok and bytes(game.start_state) != bytes(expected[-1])
+    game.restart_level()
+    ok = ok and game.snapshots.capture() == game.start_state
+    print("Rewind %s" % ("ok" if ok else "MISMATCH"))
+    return ok
+
+
+class CrumblingLevel:
+    """advanced_example.py's player and enemies on crumbling platforms
+
+    Has what a Snapshotter reads, for check_crumbling(). The player and
+    the platforms share one timer wheel, as they would in a game.
+    """
+
+    def __init__(self, main):
+        import advanced_example as ae
+        from timers import TimerWheel
+        self.timers = TimerWheel()
+        crumbling = [ae.CrumblingPlatform(x, y, 20, 6, delay=10, respawn=40,
+                                          timers=self.timers)
+                     for x, y in ((10, 90), (40, 90), (70, 90), (100, 90),
+                                  (25, 60), (55, 60), (85, 60))]
+        moving = ae.MovingPlatform(10, 35, 20, 6, 60, 1)
+        self.solids = ae.Solids([main.Platform(0, 110, 120, 10)],
+                                crumbling + [moving])
+        self.moving_platforms = self.solids.dynamic
+        self.player = ae.AdvancedPlayer(20, 80, timers=self.timers)
+        self.enemies = [ae.Enemy(60, 102, 40, 1)]
+        self.collectibles = []
+        self.powerups = []
+        self.particles = []
+        self.score = 0
+
+    def update(self):
+        """A tick, in the order a game would run it"""
+        self.timers.advance()
+        self.player.controls.update()
+        self.solids.update()
+        for enemy in self.enemies:
+            enemy.update()
+        player = self.player
+        player.update(self.solids, self.enemies, self.particles)
+        del self.particles[:]   # Decoration only
+        if player.y > 140:
+            # Fell off, as main.Game checks: back to the start
+            player.x, player.y, player.vel_y = player.start_x, player.start_y, 0
+
+    def live_timers(self):
+        """Pending timers something still holds a handle to"""
+        player = self.player
+        held = [t for t in player.effects if t] + [player.flash]
+        held += [c.timer for c in self.moving_platforms
+                 if hasattr(c, 'timer_left')]
+        return sum(1 for t in held if t and self.timers.left(t) > 0)
+
+
+def check_crumbling(ticks=600, seed=11):
+    """Rewind a level of crumbling platforms the same way
+
+    Their fallen state and pending timers are part of each snapshot, and
+    a restore must leave no timer pending from a state rewound past.
+    Returns True if every restore matched and some platform was down in
+    the stretch rewound over.
+    """
+    import headless
+    main = headless.load_game()
+    level = CrumblingLevel(main)
+    snapshots = Snapshotter(level)
+    rewind = Rewind(snapshots, budget=2048, every=3, keyframe=5)
+    timers = level.timers
+    crumbling = [c for c in level.moving_platforms
+                 if hasattr(c, 'timer_left')]
+    fell = []
+
+    def state():
+        platforms = tuple((c.solid, timers.tick - c.started
+                           if c.started >= 0 else -1, c.timer_left())
+                          for c in crumbling)
+        fell.append(not all(c.solid for c in crumbling))
+        return platforms, level.live_timers() == timers.pending
+
+    ok, expected = play_and_rewind(level, rewind, ticks, seed, state)
+    restored = fell[len(expected):]
+    ok = ok and any(restored)
+    print("Crumbling rewind %s (%d of %d restores with a platform down)" % (
+        "ok" if ok else "MISMATCH", sum(restored), len(restored)))
+    return ok
+
+
+if __name__ == '__main__':
+    import sys
+    results = [check_rewind(), check_crumbling()]
+    sys.exit(0 if all(results) else 1)
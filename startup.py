@@ -0,0 +1,54 @@
+"""
+Boot Timeline
+Records how long each phase of booting the game takes
+
+main.py marks the end of each phase (imports, level build, first draw,
+then starting the optional subsystems that are switched on).
+The timeline is printed over serial once the first frame is drawn, and can
+also be drawn on screen. Times come from picosystem.time_us(), which the
+picosystem.py stub provides on a desktop Python too.
+"""
+
+import picosystem
+
+
+class BootTimeline:
+    """Start time plus the end time of each boot phase"""
+
+    def __init__(self, start_us=None):
+        self.start_us = picosystem.time_us() if start_us is None else start_us
+        self.phases = []
+
+    def mark(self, name, end_us=None):
+        """Record that the phase called `name` just finished"""
+        if end_us is None:
+            end_us = picosystem.time_us()
+        self.phases.append((name, end_us))
+
+    def total_us(self):
+        """Time from the start to the end of the last phase"""
+        if not self.phases:
+            return 0
+        return self.phases[-1][1] - self.start_us
+
+    def lines(self):
+        """Get one 'phase  duration' line per phase, plus the total"""
+        lines = []
+        previous = self.start_us
+        for name, end in self.phases:
+            lines.append("%-11s%6dus" % (name, end - previous))
+            previous = end
+        lines.append("%-11s%6dus" % ("total", self.total_us()))
+        return lines
+
+    def report(self):
+        """Print the timeline over serial"""
+        print("Boot timeline:")
+        for line in self.lines():
+            print("  " + line)
+
+    def draw(self, x, y):
+        """Draw the timeline on screen, one line per phase"""
+        for line in self.lines():
+            picosystem.text(line, x, y)
+            y += 8
@@ -0,0 +1,343 @@
+"""
+Stress Mode
+Times the game on synthesized levels of growing size to find what scales badly
+
+Each sweep grows one kind of entity - platforms, collectibles, enemies or
+particles - from 10 up to 10,000 while the others stay small, and times
+an update and a draw at every size (headlessly, on the software screen).
+The growth of each curve is fitted as time ~ n^k over the largest sizes:
+k near 1 is a loop over the entities, near 2 an everything-against-
+everything loop, which gets flagged.
+
+Platforms and collectibles are timed with main.Game.update/draw.
+main.py has no enemies or particles, so those sweeps time the
+advanced_example.py classes instead: AdvancedPlayer, Enemy and
+update_particles for the update, their draw methods for the draw.
+
+    python stress.py                    # full sweep, table and stress.svg
+    python stress.py --sizes 10,100,1000 --kinds collectibles
+    python stress.py --svg curves.svg --ticks 50
+
+Exits 1 if any curve grows like n^2 or worse, or some size fails, so an
+optimization can be checked against its scaling curve.
+"""
+
+import math
+import time
+
+SIZES = (10, 30, 100, 300, 1000, 3000, 10000)
+KINDS = ("platforms", "collectibles", "enemies", "particles")
+BASE = 10           # Count of the kinds not being swept
+TICKS = 60          # Timed ticks per size (fewer for big sizes)
+FIT_POINTS = 3      # Largest sizes the growth is fitted over
+CONSTANT = 0.2      # Exponents below this are O(1)
+LINEAR = 0.7        # From here up O(n); in between sublinear
+QUADRATIC = 1.6     # Exponents from here up get flagged
+SEED = 7
+
+
+def layout(count, rng):
+    """Platform rects, a floor first so the player has somewhere to stand"""
+    rects = [(0, 110, 120, 10)]
+    for _ in range(count - 1):
+        rects.append((rng.randint(0, 110), rng.randint(10, 105),
+                      rng.randint(4, 20), rng.randint(2, 4)))
+    return rects
+
+
+def items(count, rng):
+    """Collectible positions spread over the screen"""
+    return [(rng.randint(0, 114), rng.randint(10, 100)) for _ in range(count)]
+
+
+class GameScene:
+    """main.Game on a synthesized level"""
+
+    def __init__(self, main, platforms, collectibles, rng):
+        import headless
+        self.game = headless.build_game(main, layout(platforms, rng),
+                                        items(collectibles, rng))
+        self.update = self.game.update
+        self.draw = self.game.draw
+
+
+class AdvancedScene:
+    """advanced_example.py's player, enemies and particles"""
+
+    def __init__(self, platforms, enemies, particles, rng):
+        import advanced_example as ae
+        import picosystem
+        self.ae = ae
+        self.pen = picosystem.pen
+        self.frect = picosystem.frect
+        self.static = [_Rect(*rect) for rect in layout(platforms, rng)]
+        self.solids = ae.Solids(self.static)
+        self.player = ae.AdvancedPlayer(20, 80)
+        self.player.particle_budget = 0     # Keep the particle count fixed
+        self.enemies = [ae.Enemy(rng.randint(0, 100), rng.randint(10, 100),
+                                 rng.randint(10, 40), 1)
+                        for _ in range(enemies)]
+        self.particles = [ae.Particle(rng.uniform(0, 120), rng.uniform(0, 60),
+                                      rng.uniform(-1, 1), rng.uniform(-1, 0),
+                                      ae.WHITE, 1 << 30)
+                          for _ in range(particles)]
+
+    def update(self):
+        """A tick: player, enemies, then particles"""
+        self.player.controls.update()
+        for enemy in self.enemies:
+            enemy.update()
+        self.player.update(self.solids, self.enemies, self.particles)
+        self.ae.update_particles(self.particles, self.solids.occupancy)
+
+    def draw(self):
+        """A frame: platforms, enemies, particles and the player"""
+        self.pen(0, 0, 0)
+        self.frect(0, 0, 120, 120)
+        self.pen(8, 8, 8)
+        for p in self.static:
+            self.frect(p.x, p.y, p.width, p.height)
+        for enemy in self.enemies:
+            enemy.draw()
+        for particle in self.particles:
+            particle.draw()
+        self.player.draw()
+
+
+class _Rect:
+    """A static platform for the advanced scene"""
+
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+
+
+def scene(main, kind, size, rng):
+    """Build the scene for one point of a sweep"""
+    counts = dict.fromkeys(KINDS, BASE)
+    counts[kind] = size
+    if kind in ("platforms", "collectibles"):
+        return GameScene(main, counts["platforms"], counts["collectibles"], rng)
+    return AdvancedScene(counts["platforms"], counts["enemies"],
+                         counts["particles"], rng)
+
+
+def measure(main, kind, size, ticks, masks):
+    """Mean (update us, draw us) on one size, or an error message"""
+    import random
+    import headless
+    rng = random.Random(SEED + size)
+    try:
+        target = scene(main, kind, size, rng)
+        ticks = max(5, min(ticks, ticks * 1000 // size))
+        update_s = draw_s = 0
+        perf_counter = time.perf_counter
+        for tick in range(ticks + 2):
+            headless.set_buttons(masks[tick % len(masks)])
+            start = perf_counter()
+            target.update()
+            middle = perf_counter()
+            target.draw()
+            end = perf_counter()
+            if tick >= 2:   # The first ticks lay out the level
+                update_s += middle - start
+                draw_s += end - middle
+    except Exception as error:
+        return "%s: %s" % (type(error).__name__, error)
+    finally:
+        headless.set_buttons(0)
+    return update_s / ticks * 1e6, draw_s / ticks * 1e6
+
+
+def growth(sizes, times, points=FIT_POINTS):
+    """Exponent k of time ~ n^k, least squares on the largest sizes
+
+    None when there are fewer than two sizes to fit.
+    """
+    pairs = [(math.log(n), math.log(t)) for n, t in zip(sizes, times)
+             if t > 0][-points:]
+    if len(pairs) < 2:
+        return None
+    mean_x = sum(x for x, _ in pairs) / len(pairs)
+    mean_y = sum(y for _, y in pairs) / len(pairs)
+    spread = sum((x - mean_x) ** 2 for x, _ in pairs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in pairs) / spread
+
+
+def exponent(k):
+    """Format a fitted exponent"""
+    return "n/a" if k is None else "n^%.2f" % k
+
+
+def order(k):
+    """Name the growth an exponent is closest to"""
+    if k is None:
+        return "n/a"
+    if k < CONSTANT:
+        return "O(1)"
+    if k < LINEAR:
+        return "sublinear"
+    if k < QUADRATIC:
+        return "O(n)"
+    return "O(n^2)"
+
+
+def sweep(kinds=KINDS, sizes=SIZES, ticks=TICKS, out=print):
+    """Time every kind at every size
+
+    Returns {kind: {'sizes', 'update', 'draw', 'failed', 'fit'}}.
+    """
+    import headless
+    import goldens
+    main = headless.load_game()
+    headless.install_screen()
+    masks = goldens.script(max(ticks + 2, 200), goldens.SEED)
+    results = {}
+    for kind in kinds:
+        result = {'sizes': [], 'update': [], 'draw': [], 'failed': []}
+        for size in sizes:
+            timing = measure(main, kind, size, ticks, masks)
+            if isinstance(timing, str):
+                result['failed'].append((size, timing))
+                out("%-12s %6d  failed - %s" % (kind, size, timing))
+                continue
+            result['sizes'].append(size)
+            result['update'].append(timing[0])
+            result['draw'].append(timing[1])
+            out("%-12s %6d  update %10.1fus  draw %10.1fus" % (
+                kind, size, timing[0], timing[1]))
+        # A curve with failed sizes wasn't measured where it matters most
+        result['fit'] = {phase: None if result['failed'] else
+                         growth(result['sizes'], result[phase])
+                         for phase in ('update', 'draw')}
+        results[kind] = result
+    return results
+
+
+def table(results, sizes=SIZES):
+    """Format the results as a text table with the fitted growth"""
+    lines = ["%-12s %-6s %s" % ("kind", "phase", "  ".join(
+        "%9s" % ("n=%d" % n) for n in sizes)) + "   growth"]
+    flagged = []
+    for kind, result in results.items():
+        for phase in ('update', 'draw'):
+            by_size = dict(zip(result['sizes'], result[phase]))
+            cells = []
+            for n in sizes:
+                if n in by_size:
+                    cells.append("%9.0f" % by_size[n])
+                elif any(size == n for size, _ in result['failed']):
+                    cells.append("%9s" % "FAIL")
+                else:
+                    cells.append("%9s" % "-")
+            k = result['fit'][phase]
+            flag = ""
+            if k is not None and k >= QUADRATIC:
+                flag = "  <-- grows like n^%.1f" % k
+                flagged.append("%s %s" % (kind, phase))
+            lines.append("%-12s %-6s %s   %s %s%s" % (
+                kind, phase, "  ".join(cells), exponent(k), order(k), flag))
+        for size, error in result['failed']:
+            lines.append("%-12s fails at n=%d: %s" % (kind, size, error))
+    lines.append("(mean us per call)")
+    return "\n".join(lines), flagged
+
+
+def svg(results, path, width=640, height=420):
+    """Plot every curve on log-log axes into an SVG file"""
+    left, right, top, bottom = 60, 160, 20, 40
+    sizes = [n for r in results.values() for n in r['sizes']]
+    times = [t for r in results.values() for phase in ('update', 'draw')
+             for t in r[phase] if t > 0]
+    if not sizes or not times:
+        return False
+    low_x, high_x = math.log10(min(sizes)), math.log10(max(sizes))
+    low_y = math.floor(math.log10(min(times)))
+    high_y = math.ceil(math.log10(max(times)))
+    span_x = max(high_x - low_x, 1e-9)
+    span_y = max(high_y - low_y, 1)
+    plot_w = width - left - right
+    plot_h = height - top - bottom
+
+    def point(n, t):
+        return (left + (math.log10(n) - low_x) / span_x * plot_w,
+                top + (high_y - math.log10(t)) / span_y * plot_h)
+
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" '
+             'font-family="sans-serif" font-size="11">' % (width, height),
+             '<rect width="100%" height="100%" fill="white"/>']
+    for decade in range(int(low_y), int(high_y) + 1):
+        y = top + (high_y - decade) / span_y * plot_h
+        parts.append('<line x1="%d" y1="%.1f" x2="%d" y2="%.1f" '
+                     'stroke="#ddd"/>' % (left, y, left + plot_w, y))
+        parts.append('<text x="%d" y="%.1f" text-anchor="end">%gus</text>' % (
+            left - 4, y + 4, 10 ** decade))
+    for n in sorted(set(sizes)):
+        x = point(n, 10 ** high_y)[0]
+        parts.append('<line x1="%.1f" y1="%d" x2="%.1f" y2="%d" '
+                     'stroke="#ddd"/>' % (x, top, x, top + plot_h))
+        parts.append('<text x="%.1f" y="%d" text-anchor="middle">%d</text>' % (
+            x, top + plot_h + 14, n))
+    parts.append('<text x="%d" y="%d" text-anchor="middle">entities</text>' % (
+        left + plot_w // 2, height - 6))
+
+    colors = ("#1f77b4", "#d62728", "#2ca02c", "#9467bd", "#ff7f0e",
+              "#8c564b", "#e377c2", "#17becf")
+    legend_y = top
+    series = 0
+    for kind, result in results.items():
+        for phase, dash in (('update', ''), ('draw', ' stroke-dasharray="4 3"')):
+            points = [point(n, t) for n, t in
+                      zip(result['sizes'], result[phase]) if t > 0]
+            if not points:
+                continue
+            color = colors[series % len(colors)]
+            series += 1
+            parts.append('<polyline fill="none" stroke="%s" stroke-width="2"'
+                         '%s points="%s"/>' % (color, dash, " ".join(
+                             "%.1f,%.1f" % p for p in points)))
+            k = result['fit'][phase]
+            flag = " !" if k is not None and k >= QUADRATIC else ""
+            parts.append('<text x="%d" y="%d" fill="%s">%s %s %s%s</text>'
+                         % (left + plot_w + 8, legend_y + 4, color, kind,
+                            phase, exponent(k), flag))
+            legend_y += 16
+    parts.append('</svg>')
+    with open(path, 'w') as f:
+        f.write("\n".join(parts) + "\n")
+    return True
+
+
+def main(argv=None):
+    """Command line entry point"""
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--kinds', default=",".join(KINDS),
+                        help="Entity kinds to sweep (%s)" % ", ".join(KINDS))
+    parser.add_argument('--sizes', default=",".join(map(str, SIZES)),
+                        help="Entity counts to time")
+    parser.add_argument('--ticks', type=int, default=TICKS,
+                        help="Ticks timed per size (scaled down past 1000)")
+    parser.add_argument('--svg', default='stress.svg',
+                        help="Where to write the plot")
+    args = parser.parse_args(argv)
+
+    sizes = tuple(int(n) for n in args.sizes.split(","))
+    kinds = tuple(kind for kind in args.kinds.split(",") if kind)
+    for kind in kinds:
+        if kind not in KINDS:
+            parser.error("unknown kind %r" % kind)
+    results = sweep(kinds, sizes, args.ticks)
+    text, flagged = table(results, sizes)
+    print()
+    print(text)
+    if svg(results, args.svg):
+        print("Plot written to %s" % args.svg)
+    failed = [kind for kind, result in results.items() if result['failed']]
+    if flagged:
+        print("Grows like n^2 or worse: %s" % ", ".join(flagged))
+    return 1 if flagged or failed else 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
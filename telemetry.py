@@ -0,0 +1,328 @@
+"""
+Frame Telemetry
+Streams per-frame stats from a real Picosystem to a desktop over USB serial
+
+The emulator can't show how a real unit behaves in the field. With
+TELEMETRY = True in main.py the game sends one fixed-size binary record
+per frame over the USB serial connection:
+
+    sync, tick, fps, idle/update/draw us (picosystem.stats()), heap free,
+    platform/collectible/enemy/particle counts, records dropped, level id,
+    checksum
+
+Records are packed into one preallocated buffer, and only written when
+the serial port can take them without waiting - otherwise the record is
+dropped and counted, so a missing or slow host never stalls the game.
+Anything else printed over serial just gets skipped: the reader looks for
+the sync word and checks each record's checksum.
+
+On a desktop, read a stream and print rolling percentiles and histograms:
+    python telemetry.py /dev/ttyACM0        # serial port (pyserial if there)
+    python telemetry.py capture.bin         # a saved capture
+    cat /dev/ttyACM0 | python telemetry.py -
+    python telemetry.py --emit 600 | python telemetry.py -   # headless game
+    python telemetry.py                     # check records survive a pipe
+"""
+
+import struct
+import sys
+
+import heap
+import picosystem
+
+SYNC = 0x5AA5
+# sync, tick, fps, idle us, update us, draw us, heap free, platforms,
+# collectibles, enemies, particles, dropped, level, checksum
+FORMAT = "<HIBHHHiHHHHHBB"
+SIZE = struct.calcsize(FORMAT)
+FIELDS = ("tick", "fps", "idle_us", "update_us", "draw_us", "heap_free",
+          "platforms", "collectibles", "enemies", "particles", "dropped",
+          "level")
+
+try:
+    import select
+except ImportError:
+    select = None
+
+
+def _clamp(value, top):
+    """Fit a value into an unsigned field"""
+    if value < 0:
+        return 0
+    return top if value > top else value
+
+
+class Telemetry:
+    """Packs a record per frame and writes it when the port is free"""
+
+    def __init__(self, stream=None):
+        if stream is None:
+            stream = getattr(sys.stdout, 'buffer', sys.stdout)
+        self.stream = stream
+        self.buf = bytearray(SIZE)
+        self.body = memoryview(self.buf)[:SIZE - 1]     # What is summed
+        self.sent = 0
+        self.dropped = 0
+        self.poll = None
+        if select and hasattr(select, 'poll'):
+            try:
+                self.poll = select.poll()
+                self.poll.register(stream, select.POLLOUT)
+            except (AttributeError, OSError, TypeError, ValueError):
+                self.poll = None    # Not pollable: write and hope
+
+    def send(self, game, tick, stats=None):
+        """Pack this frame's record and write it if that won't block
+
+        stats is picosystem.stats() unless given, as (fps, idle us,
+        tick us, update us, draw us). Returns True if it was written.
+        """
+        if stats is None:
+            stats = picosystem.stats()
+        fps, idle_us, _, update_us, draw_us = stats
+        buf = self.buf
+        struct.pack_into(
+            FORMAT, buf, 0, SYNC, tick & 0xFFFFFFFF, _clamp(fps, 255),
+            _clamp(idle_us, 65535), _clamp(update_us, 65535),
+            _clamp(draw_us, 65535), heap.usage()[0],
+            _clamp(len(game.platforms), 65535),
+            _clamp(getattr(game, 'remaining', len(game.collectibles)), 65535),
+            _clamp(len(getattr(game, 'enemies', ())), 65535),
+            _clamp(len(getattr(game, 'particles', ())), 65535),
+            _clamp(self.dropped, 65535), _clamp(game.level, 255), 0)
+        buf[SIZE - 1] = sum(self.body) & 255
+        if self.poll is not None and not self.poll.poll(0):
+            self.dropped += 1
+            return False
+        try:
+            self.stream.write(buf)
+        except OSError:
+            self.dropped += 1
+            return False
+        self.sent += 1
+        return True
+
+
+def parse(stream, follow=False):
+    """Records in a byte stream, as tuples in FIELDS order
+
+    Skips anything that isn't a record with a good checksum. With follow
+    (a serial port), an empty read means "nothing yet" instead of the end.
+    """
+    read = getattr(stream, 'read1', stream.read)
+    sync = struct.pack("<H", SYNC)
+    pending = bytearray()
+    while True:
+        chunk = read(4096)
+        if not chunk:
+            if follow:
+                continue
+            return
+        pending += chunk
+        start = 0
+        while True:
+            start = pending.find(sync, start)
+            if start < 0 or len(pending) - start < SIZE:
+                break
+            end = start + SIZE
+            if sum(pending[start:end - 1]) & 255 != pending[end - 1]:
+                start += 1  # Text that happened to look like a sync word
+                continue
+            yield struct.unpack_from(FORMAT, pending, start)[1:-1]
+            start = end
+        # Keep what could still be the start of a record
+        if start < 0:
+            del pending[:max(len(pending) - 1, 0)]
+        else:
+            del pending[:start]
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return 0
+    rank = -(-p * len(ordered) // 100)
+    return ordered[min(max(int(rank), 1), len(ordered)) - 1]
+
+
+class Aggregator:
+    """Rolling percentiles and histograms over the last window records"""
+
+    SUMMARY = ("fps", "update_us", "draw_us", "idle_us", "heap_free")
+    HISTOGRAMS = ("update_us", "draw_us")
+
+    def __init__(self, window=300):
+        from collections import deque
+        self.window = window
+        self.columns = {name: deque(maxlen=window) for name in FIELDS}
+        self.records = 0
+        self.lost = 0       # Ticks missing between records that did arrive
+        self.last_tick = None
+
+    def add(self, record):
+        """Take one record (a tuple in FIELDS order)"""
+        for name, value in zip(FIELDS, record):
+            self.columns[name].append(value)
+        tick = record[0]
+        if self.last_tick is not None and tick > self.last_tick + 1:
+            self.lost += tick - self.last_tick - 1
+        self.last_tick = tick
+        self.records += 1
+
+    def percentiles(self, name, points=(50, 90, 99)):
+        """Percentiles of a field over the window"""
+        ordered = sorted(self.columns[name])
+        return [percentile(ordered, p) for p in points]
+
+    def histogram(self, name, bins=8):
+        """(low, high, count) buckets of a field over the window"""
+        values = self.columns[name]
+        if not values:
+            return []
+        low = min(values)
+        width = max((max(values) - low + bins) // bins, 1)
+        counts = [0] * bins
+        for value in values:
+            counts[min((value - low) // width, bins - 1)] += 1
+        return [(low + i * width, low + (i + 1) * width, count)
+                for i, count in enumerate(counts)]
+
+    def report(self, out=None):
+        """Print the rolling summary and histograms"""
+        out = out or sys.stdout
+        columns = self.columns
+        last = {name: columns[name][-1] for name in FIELDS if columns[name]}
+        out.write("%d records, %d lost in transit, %d dropped on device; "
+                  "level %d, %d platforms, %d collectibles, %d enemies, "
+                  "%d particles\n" % (
+                      self.records, self.lost, last.get("dropped", 0),
+                      last.get("level", 0), last.get("platforms", 0),
+                      last.get("collectibles", 0), last.get("enemies", 0),
+                      last.get("particles", 0)))
+        out.write("%-10s %8s %8s %8s %8s\n" % ("last %d" % len(columns["tick"]),
+                                              "p50", "p90", "p99", "max"))
+        for name in self.SUMMARY:
+            if columns[name]:
+                p50, p90, p99 = self.percentiles(name)
+                out.write("%-10s %8d %8d %8d %8d\n" % (
+                    name, p50, p90, p99, max(columns[name])))
+        for name in self.HISTOGRAMS:
+            buckets = self.histogram(name)
+            if not buckets:
+                continue
+            most = max(count for _, _, count in buckets)
+            out.write("%s:\n" % name)
+            for low, high, count in buckets:
+                out.write("  %6d-%-6d %5d %s\n" % (
+                    low, high, count, "#" * (count * 40 // max(most, 1))))
+        out.flush()
+
+
+def emit(ticks, out, noise=False):
+    """Play the goldens.py input script headlessly, sending a record a frame
+
+    There is no picosystem.stats() on a desktop, so update and draw are
+    timed here. With noise, a line of text goes out every 100 frames, as
+    print() output would on the device.
+    """
+    import headless
+    import goldens
+    main = headless.load_game()
+    headless.install_screen()
+    game = main.Game()
+    telemetry = Telemetry(out)
+    time_us = picosystem.time_us
+    for tick, mask in enumerate(goldens.script(ticks, goldens.SEED)):
+        headless.set_buttons(mask)
+        start = time_us()
+        game.update()
+        middle = time_us()
+        game.draw()
+        end = time_us()
+        frame_us = max(end - start, 1)
+        telemetry.send(game, tick, (min(1000000 // frame_us, 40), 0,
+                                    frame_us, middle - start, end - middle))
+        if noise and tick % 100 == 50:
+            out.write(b"Score: %d\n" % game.score)
+    out.flush()
+    headless.set_buttons(0)
+    return telemetry
+
+
+def check(ticks=600):
+    """Pipe a headless game's records (with text mixed in) through parse()
+
+    Returns True if every record arrived, in order.
+    """
+    import subprocess
+    emitter = subprocess.Popen(
+        [sys.executable, __file__, '--emit', str(ticks), '--noise'],
+        stdout=subprocess.PIPE)
+    aggregator = Aggregator()
+    ticks_seen = []
+    for record in parse(emitter.stdout):
+        aggregator.add(record)
+        ticks_seen.append(record[0])
+    emitter.wait()
+    aggregator.report()
+    ok = ticks_seen == list(range(ticks)) and emitter.returncode == 0
+    print("%d/%d records came through the pipe%s" % (
+        len(ticks_seen), ticks, "" if ok else " - MISMATCH"))
+    return ok
+
+
+def open_source(name):
+    """Open a serial port, file or '-' (stdin) for reading
+
+    Returns (stream, follow). Serial ports use pyserial when it is
+    installed, and are read as a plain file otherwise.
+    """
+    if name == '-':
+        return sys.stdin.buffer, False
+    if name.startswith('/dev/tty') or name.upper().startswith('COM'):
+        try:
+            import serial
+        except ImportError:
+            return open(name, 'rb', buffering=0), True
+        return serial.Serial(name, 115200, timeout=0.1), True
+    return open(name, 'rb'), False
+
+
+def main(argv=None):
+    """Command line entry point"""
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('source', nargs='?',
+                        help="Serial port, capture file, or - for stdin")
+    parser.add_argument('--window', type=int, default=300,
+                        help="Records the percentiles and histograms cover")
+    parser.add_argument('--every', type=int, default=60,
+                        help="Print a report every N records")
+    parser.add_argument('--emit', type=int, metavar='TICKS',
+                        help="Play the game headlessly, writing records to "
+                             "stdout")
+    parser.add_argument('--noise', action='store_true',
+                        help="With --emit, mix text in with the records")
+    args = parser.parse_args(argv)
+
+    if args.emit:
+        emit(args.emit, sys.stdout.buffer, args.noise)
+        return 0
+    if not args.source:
+        return 0 if check() else 1
+    stream, follow = open_source(args.source)
+    aggregator = Aggregator(args.window)
+    try:
+        for record in parse(stream, follow):
+            aggregator.add(record)
+            if aggregator.records % args.every == 0:
+                aggregator.report()
+    except KeyboardInterrupt:
+        pass
+    if aggregator.records % args.every:
+        aggregator.report()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
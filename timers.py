@@ -0,0 +1,134 @@
+"""
+Timer Wheel
+Calls things a number of ticks from now, looking only at timers that are due
+
+Counting every timed effect down every tick costs work for each effect,
+each tick. The wheel hashes each timer into one of SLOTS lists by the tick
+it is due on. Advancing a tick only looks at that tick's slot, and only
+fires the timers due on exactly that tick - one more than a lap away
+stays put until its lap comes round.
+
+    timers = TimerWheel()
+    handle = timers.after(120, player.end_effect, POWER_INVINCIBLE)
+    timers.left(handle)     # Ticks until it fires
+    timers.cancel(handle)
+    timers.advance()        # Once per tick
+
+Used for power-up effects and invincibility flashing (AdvancedPlayer) and
+crumbling platform delays (CrumblingPlatform) in advanced_example.py.
+A level timer is one more: timers.after(LEVEL_TICKS, time_up).
+
+    python timers.py        # check against plain countdowns
+"""
+
+SLOTS = 64
+
+
+class TimerWheel:
+    """Timers hashed into slots by the tick they are due on"""
+
+    def __init__(self, slots=SLOTS):
+        self.slots = [[] for _ in range(slots)]
+        self.tick = 0
+        self.pending = 0    # Timers still to fire
+        self.fired = 0
+
+    def after(self, ticks, callback, arg=None):
+        """Call callback(arg) in ticks ticks (at least 1)
+
+        Returns a handle for left() and cancel().
+        """
+        if ticks < 1:
+            ticks = 1
+        due = self.tick + ticks
+        timer = [due, callback, arg]
+        self.slots[due % len(self.slots)].append(timer)
+        self.pending += 1
+        return timer
+
+    def left(self, timer):
+        """Ticks until a timer fires, or 0 if it fired or was cancelled"""
+        if timer[1] is None:
+            return 0
+        return timer[0] - self.tick
+
+    def cancel(self, timer):
+        """Stop a timer firing - harmless if it already has
+
+        The timer stays in its slot until its tick comes round.
+        """
+        if timer[1] is not None:
+            timer[1] = None
+            self.pending -= 1
+
+    def advance(self):
+        """Move on one tick and fire the timers due on it"""
+        self.tick += 1
+        tick = self.tick
+        slot = self.slots[tick % len(self.slots)]
+        i = 0
+        while i < len(slot):
+            timer = slot[i]
+            if timer[0] != tick:
+                i += 1      # Due on a later lap
+                continue
+            # Swap-remove, then look at what was swapped in
+            last = slot.pop()
+            if i < len(slot):
+                slot[i] = last
+            callback = timer[1]
+            if callback is not None:
+                timer[1] = None
+                self.pending -= 1
+                self.fired += 1
+                callback(timer[2])
+
+
+def check(timers=2000, ticks=5000, seed=3):
+    """Fire random timers, some cancelled or rescheduled, and compare the
+    ticks they fire on with plain countdowns. Returns True if all match.
+    """
+    import random
+    rng = random.Random(seed)
+    wheel = TimerWheel()
+    fired = {}
+    expected = {}
+    handles = {}
+
+    def fire(name):
+        fired[name] = wheel.tick
+
+    countdowns = {}
+    for name in range(timers):
+        delay = rng.choice((1, 5, 63, 64, 65, 128, rng.randint(1, 3000)))
+        handles[name] = wheel.after(delay, fire, name)
+        countdowns[name] = delay
+    for tick in range(1, ticks + 1):
+        if tick % 100 == 0:
+            # Cancel one timer and restart another
+            name = rng.randint(0, timers - 1)
+            wheel.cancel(handles[name])
+            countdowns.pop(name, None)
+            name = rng.randint(0, timers - 1)
+            if name in countdowns or name not in expected:
+                wheel.cancel(handles[name])
+                delay = rng.randint(1, 500)
+                handles[name] = wheel.after(delay, fire, name)
+                countdowns[name] = delay
+                fired.pop(name, None)
+        for name in list(countdowns):
+            countdowns[name] -= 1
+            if countdowns[name] == 0:
+                expected[name] = tick
+                del countdowns[name]
+        wheel.advance()
+    wrong = sum(fired.get(name) != tick for name, tick in expected.items())
+    wrong += sum(name not in expected for name in fired)
+    print("%d timers fired, %d pending, %d wrong" % (
+        wheel.fired, wheel.pending, wrong))
+    return wrong == 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check() else 1)
@@ -0,0 +1,167 @@
+"""
+Game Loop Tracer
+Records when every part of the game loop starts and ends, frame by frame
+
+Averages hide the odd slow frame. The tracer keeps the most recent
+begin/end events of each subsystem (the same PROBE_* spans the allocation
+tracker measures), the end of every tick and garbage collections in a
+preallocated ring buffer, and exports them as Chrome trace-event JSON.
+Open the file in chrome://tracing or https://ui.perfetto.dev to see each
+frame on a timeline.
+
+Turn it on with TRACE = True in main.py. On a desktop Python the trace is
+written to trace.json when the game quits; on the Picosystem it is
+printed over serial when B is pressed and when the game quits - copy it
+from the serial console into a .json file.
+"""
+
+import gc
+import sys
+from array import array
+
+import picosystem
+from profiler import NAMES
+
+CAPACITY = 4096         # Events kept (the oldest are overwritten)
+SLOW_FRAME_US = 20000   # Frames taking longer than this get counted
+TRACE_PATH = 'trace.json'
+
+# Event phases, in the low 2 bits of an event code
+BEGIN = 0
+END = 1
+TICK = 2
+VALUE = 3   # Holds the tick number of the TICK event before it
+
+GC = len(NAMES)     # Event name index for garbage collections
+EVENT_NAMES = NAMES + ("gc",)
+
+
+class Tracer:
+    """Probe that records a timeline of spans into a ring buffer"""
+
+    def __init__(self, capacity=CAPACITY, slow_frame_us=SLOW_FRAME_US,
+                 path=TRACE_PATH):
+        self.capacity = capacity
+        self.slow_frame_us = slow_frame_us
+        self.path = path
+        self.times = array('l', [0] * capacity)   # us since the tracer started
+        self.codes = bytearray(capacity)          # name << 2 | phase
+        self.count = 0                            # Events ever recorded
+        self.start_us = picosystem.time_us()
+        self.last_tick_us = 0
+        self.frames = 0
+        self.slow_frames = 0
+        self.worst_frame_us = 0
+        self.worst_tick = -1
+
+        if hasattr(gc, 'mem_alloc'):
+            # MicroPython can't report collections, so spot the heap shrinking
+            self.last_alloc = gc.mem_alloc()
+            self.gc_callback = None
+        else:
+            self.last_alloc = None
+            self.gc_callback = self._gc_callback
+            gc.callbacks.append(self.gc_callback)
+
+    def _record(self, code, time_us):
+        """Add one event to the ring"""
+        i = self.count % self.capacity
+        self.times[i] = time_us
+        self.codes[i] = code
+        self.count += 1
+
+    def _gc_callback(self, phase, info):
+        """gc.callbacks hook: CPython's collections as spans"""
+        self._record(GC << 2 | (BEGIN if phase == 'start' else END),
+                     picosystem.time_us() - self.start_us)
+
+    def begin(self, subsystem):
+        """A subsystem starts"""
+        self._record(subsystem << 2 | BEGIN,
+                     picosystem.time_us() - self.start_us)
+
+    def end(self, subsystem):
+        """A subsystem finishes"""
+        now = picosystem.time_us() - self.start_us
+        self._record(subsystem << 2 | END, now)
+        if self.last_alloc is not None:
+            alloc = gc.mem_alloc()
+            if alloc < self.last_alloc:
+                # Collected somewhere since the last check: no duration known
+                self._record(GC << 2 | BEGIN, now)
+                self._record(GC << 2 | END, now)
+            self.last_alloc = alloc
+
+    def end_tick(self, tick):
+        """Mark the end of a tick and keep track of slow frames"""
+        now = picosystem.time_us() - self.start_us
+        if self.frames:
+            frame_us = now - self.last_tick_us
+            if frame_us > self.slow_frame_us:
+                self.slow_frames += 1
+            if frame_us > self.worst_frame_us:
+                self.worst_frame_us = frame_us
+                self.worst_tick = tick
+        self.frames += 1
+        self.last_tick_us = now
+        self._record(TICK, now)
+        self._record(VALUE, tick)
+
+    def events(self):
+        """Recorded events, oldest first, as (name, phase, time or tick)
+
+        Starts at the first complete tick still in the ring, so no span
+        is missing its beginning.
+        """
+        first = max(0, self.count - self.capacity)
+        started = False
+        for n in range(first, self.count):
+            i = n % self.capacity
+            code = self.codes[i]
+            phase = code & 3
+            if not started:
+                # Wait for a TICK whose VALUE is still in the ring
+                if phase != TICK or n + 1 == self.count:
+                    continue
+                started = True
+            yield EVENT_NAMES[code >> 2] if phase < TICK else "tick", \
+                phase, self.times[i]
+
+    def export(self, out=None):
+        """Write the trace as Chrome trace-event JSON (default: serial)"""
+        if out is None:
+            out = sys.stdout
+        out.write('{"traceEvents":[\n')
+        separator = ''
+        tick_us = 0
+        for name, phase, value in self.events():
+            if phase == TICK:
+                tick_us = value
+                continue
+            if phase == VALUE:
+                line = ('{"name":"tick %d","ph":"i","s":"g","ts":%d,'
+                        '"pid":0,"tid":0}' % (value, tick_us))
+            else:
+                line = '{"name":"%s","ph":"%s","ts":%d,"pid":0,"tid":0}' % (
+                    name, "B" if phase == BEGIN else "E", value)
+            out.write(separator + line)
+            separator = ',\n'
+        out.write('\n],"displayTimeUnit":"ms"}\n')
+
+    def report(self):
+        """Print a summary, and export the trace (to a file on CPython)"""
+        print("Trace: %d frames, %d slower than %dus, worst %dus at tick %d" % (
+            self.frames, self.slow_frames, self.slow_frame_us,
+            self.worst_frame_us, self.worst_tick))
+        if sys.implementation.name == 'micropython':
+            self.export()
+            return
+        with open(self.path, 'w') as f:
+            self.export(f)
+        print("Trace written to %s" % self.path)
+
+    def close(self):
+        """Stop listening for garbage collections"""
+        if self.gc_callback:
+            gc.callbacks.remove(self.gc_callback)
+            self.gc_callback = None